@@ -0,0 +1,612 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+音频处理 - English Teleprompter
+===============================================================================
+本模块只包含纯Python的音频数据处理逻辑，不依赖Kivy，
+可以在录音线程、解码线程或无界面的环境中直接使用。
+
+- AudioRingBuffer：预分配的音频环形缓冲区（录音线程与解码线程之间零分配交接）
+- VoiceActivityDetector：语音活动检测（静音不送入解码器）
+- AudioPipeline：可配置的预处理链（重采样、高通滤波、自动增益），逐级计时
+
+NumPy可用时使用向量化计算；不可用时（如未打包NumPy的APK）VAD退回纯Python实现，
+预处理链需要NumPy，不可用时不启用。NumPy在第一次处理音频时才导入，不拖慢应用启动。
+===============================================================================
+"""
+
+import math
+import time
+import threading
+import importlib.util
+from collections import deque
+
+# NumPy是否已安装（只查找不导入；导入耗时较长，推迟到第一次使用时）
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+np = None
+
+
+def load_numpy():
+    """
+    导入NumPy（首次调用时导入）
+    
+    返回：
+        numpy模块；不可用时返回None
+    """
+    global np, NUMPY_AVAILABLE
+    if np is None and NUMPY_AVAILABLE:
+        try:
+            import numpy
+        except ImportError:
+            NUMPY_AVAILABLE = False
+            return None
+        np = numpy
+    return np
+
+
+# =============================================================================
+# 音频环形缓冲区
+# =============================================================================
+class AudioRingBuffer:
+    """
+    预分配的音频环形缓冲区
+    
+    功能：
+    - 启动时一次性分配slot_count个固定大小的音频块（bytearray）
+    - 录音线程把数据复制进空闲块，解码线程直接读取块内数据，用完归还
+    - 没有空闲块时覆盖最旧的未读块（背压：丢弃旧音频，录音永不阻塞）
+    
+    用法：
+        写入：write(data)
+        读取：slot = get(); data = view(slot); ...; release(slot)
+    """
+    
+    def __init__(self, slot_count, slot_bytes):
+        """
+        初始化缓冲区
+        
+        参数：
+            slot_count: 音频块数量（至少3块：写入中、读取中、排队中各一块）
+            slot_bytes: 每块的字节数
+        """
+        slot_count = max(3, slot_count)
+        self.slot_count = slot_count
+        self.slot_bytes = slot_bytes
+        self._buffers = [bytearray(slot_bytes) for _ in range(slot_count)]
+        self._views = [memoryview(buffer) for buffer in self._buffers]
+        self._lengths = [0] * slot_count
+        self._stamps = [0.0] * slot_count       # 每块的写入时间（time.monotonic()）
+        self._free = deque(range(slot_count))   # 空闲块
+        self._ready = deque()                   # 已写入、等待读取的块（按时间顺序）
+        self._cond = threading.Condition()
+        self._closed = False
+        
+        # 运行统计
+        self.written = 0        # 已写入的块数
+        self.dropped = 0        # 被覆盖（丢弃）的块数
+        self.max_depth = 0      # 排队深度峰值
+    
+    @property
+    def depth(self):
+        """当前排队等待读取的块数"""
+        return len(self._ready)
+    
+    def write(self, data):
+        """
+        写入一段音频（录音线程调用，永不阻塞）
+        
+        超过块大小的数据会拆成多块写入
+        
+        参数：
+            data: 支持缓冲区协议的音频数据（bytes/bytearray/memoryview等）
+        """
+        now = time.monotonic()
+        source = memoryview(data).cast('B')
+        offset = 0
+        total = len(source)
+        while offset < total:
+            size = min(self.slot_bytes, total - offset)
+            with self._cond:
+                if self._closed:
+                    return
+                if self._free:
+                    slot = self._free.popleft()
+                else:
+                    # 没有空闲块：覆盖最旧的未读块
+                    slot = self._ready.popleft()
+                    self.dropped += 1
+            
+            # 复制在锁外进行；该块此时只属于写入方
+            self._views[slot][:size] = source[offset:offset + size]
+            offset += size
+            
+            with self._cond:
+                self._lengths[slot] = size
+                self._stamps[slot] = now
+                self._ready.append(slot)
+                self.written += 1
+                if len(self._ready) > self.max_depth:
+                    self.max_depth = len(self._ready)
+                self._cond.notify()
+    
+    def get(self, timeout=None):
+        """
+        取出最早写入的一块（解码线程调用，无数据时等待）
+        
+        参数：
+            timeout: 最长等待秒数，None表示一直等待
+        
+        返回：
+            块编号；缓冲区已关闭或等待超时时返回None
+        """
+        with self._cond:
+            while not self._ready:
+                if self._closed:
+                    return None
+                if not self._cond.wait(timeout):
+                    return None
+            return self._ready.popleft()
+    
+    def view(self, slot):
+        """
+        获取块内的有效数据（不复制）
+        
+        写满的块直接返回底层bytearray，未写满的块返回memoryview切片
+        
+        参数：
+            slot: get()返回的块编号
+        """
+        size = self._lengths[slot]
+        if size == self.slot_bytes:
+            return self._buffers[slot]
+        return self._views[slot][:size]
+    
+    def stamp(self, slot):
+        """块的写入时间（time.monotonic()秒，即录音回调交出这块音频的时刻）"""
+        return self._stamps[slot]
+    
+    def release(self, slot):
+        """归还已处理完的块"""
+        with self._cond:
+            self._free.append(slot)
+    
+    def clear(self):
+        """丢弃所有未读数据并重新打开缓冲区"""
+        with self._cond:
+            while self._ready:
+                self._free.append(self._ready.popleft())
+            self._closed = False
+    
+    def close(self):
+        """关闭缓冲区，唤醒等待中的读取方"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+# =============================================================================
+# 语音活动检测
+# =============================================================================
+class VoiceActivityDetector:
+    """
+    语音活动检测（VAD）
+    
+    功能：
+    - 把每个音频块切成短帧，按帧计算能量（RMS）和过零率（ZCR）
+    - 能量够高、且不是"低能量高过零率"的噪声帧视为语音帧
+    - 块内有足够多语音帧即为语音块；语音结束后保持hangover_chunks块（拖尾平滑），
+      避免词与词之间的短暂停顿把一句话切断
+    - 噪声底自适应：每块都更新，RMS低于噪声底时快速下降、高于时缓慢上升
+      （语音块上升得更慢，长时间说话不会把噪声底抬高），实际阈值取
+      max(energy_threshold, 噪声底 × noise_ratio)；energy_threshold只是很低的绝对下限，
+      音量很小的蓝牙SCO输入也能按相对噪声的高低判断语音
+    
+    状态：
+    - 'speech'：语音（onset为True表示刚从静音切换为语音）
+    - 'hangover'：语音刚结束的拖尾，仍送入解码器
+    - 'silence'：静音，不送入解码器
+    """
+    
+    SPEECH = 'speech'
+    HANGOVER = 'hangover'
+    SILENCE = 'silence'
+    
+    def __init__(self, energy_threshold=40.0, zcr_threshold=0.35,
+                 noise_ratio=3.0, frame_ms=20, sample_rate=16000,
+                 min_speech_frames=3, hangover_chunks=3,
+                 noise_fall=0.5, noise_rise=0.1, speech_rise=0.001):
+        """
+        初始化检测器
+        
+        参数：
+            energy_threshold: 语音帧的最低RMS（16位采样单位，绝对下限）
+            zcr_threshold: 过零率高于该值且能量不足两倍阈值的帧视为噪声
+            noise_ratio: 自适应阈值相对噪声底的倍数
+            noise_fall: RMS低于噪声底时，噪声底向其靠拢的比例（快速下降）
+            noise_rise: 非语音块RMS高于噪声底时，噪声底向其靠拢的比例
+            speech_rise: 语音块RMS高于噪声底时的上升比例（很慢，环境噪声变大后
+                被当成语音的噪声块最终也会抬高噪声底）
+            frame_ms: 分帧长度（毫秒）
+            sample_rate: 采样率
+            min_speech_frames: 一个块内至少有几帧语音才算语音块
+            hangover_chunks: 语音结束后继续保持语音状态的块数
+        """
+        self.energy_threshold = energy_threshold
+        self.zcr_threshold = zcr_threshold
+        self.noise_ratio = noise_ratio
+        self.frame_length = max(1, sample_rate * frame_ms // 1000)
+        self.min_speech_frames = min_speech_frames
+        self.hangover_chunks = hangover_chunks
+        self.noise_fall = noise_fall
+        self.noise_rise = noise_rise
+        self.speech_rise = speech_rise
+        self.reset()
+    
+    def reset(self):
+        """重置检测状态"""
+        self.state = self.SILENCE
+        self.onset = False          # 本块是否为语音起点
+        self.noise_floor = 0.0      # 自适应噪声底（RMS）
+        self._hangover = 0          # 剩余拖尾块数
+        self.last_rms = 0.0         # 最近一块的RMS（调试用）
+    
+    @property
+    def threshold(self):
+        """当前生效的能量阈值"""
+        return max(self.energy_threshold, self.noise_floor * self.noise_ratio)
+    
+    def process(self, audio_data):
+        """
+        检测一个音频块
+        
+        参数：
+            audio_data: 16位PCM音频数据（bytes/bytearray/memoryview）
+        
+        返回：
+            'speech' / 'hangover' / 'silence'
+        """
+        speech_frames, rms = self._analyze(audio_data)
+        if self.noise_floor == 0.0 and rms > 0.0:
+            # 第一块：先以它的RMS作为噪声底再判断（开头是语音时，下一次停顿噪声底就会快速回落）
+            self.noise_floor = rms
+            speech_frames, rms = self._analyze(audio_data)
+        self.last_rms = rms
+        is_speech = speech_frames >= self.min_speech_frames
+        
+        # 噪声底：下降快、上升慢，语音块上升得更慢
+        floor = self.noise_floor
+        if rms < floor:
+            self.noise_floor = floor + (rms - floor) * self.noise_fall
+        else:
+            rate = self.speech_rise if is_speech else self.noise_rise
+            self.noise_floor = floor + (rms - floor) * rate
+        
+        was_silent = self.state == self.SILENCE
+        if is_speech:
+            self.state = self.SPEECH
+            self._hangover = self.hangover_chunks
+        else:
+            if self._hangover > 0:
+                self._hangover -= 1
+                self.state = self.HANGOVER
+            else:
+                self.state = self.SILENCE
+        
+        self.onset = is_speech and was_silent
+        return self.state
+    
+    def _analyze(self, audio_data):
+        """
+        分帧计算能量和过零率
+        
+        返回：
+            (语音帧数, 整块RMS)
+        """
+        threshold = self.threshold
+        if load_numpy() is not None:
+            samples = np.frombuffer(audio_data, dtype=np.int16)
+            if samples.size == 0:
+                return 0, 0.0
+            usable = samples.size // self.frame_length * self.frame_length
+            if usable == 0:
+                frames = samples.reshape(1, -1).astype(np.float32)
+            else:
+                frames = samples[:usable].reshape(-1, self.frame_length).astype(np.float32)
+            
+            energy = np.sqrt(np.mean(frames * frames, axis=1))
+            signs = np.signbit(frames)
+            zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+            
+            speech = (energy >= threshold) & (
+                (zcr <= self.zcr_threshold) | (energy >= 2 * threshold))
+            rms = float(np.sqrt(np.mean(energy * energy)))
+            return int(np.count_nonzero(speech)), rms
+        
+        # 纯Python实现（无NumPy时）
+        samples = memoryview(audio_data).cast('B').cast('h')
+        total = len(samples)
+        if total == 0:
+            return 0, 0.0
+        
+        speech_frames = 0
+        total_square = 0.0
+        length = min(self.frame_length, total)
+        for start in range(0, total - length + 1, length):
+            frame = samples[start:start + length]
+            square = 0
+            crossings = 0
+            previous = frame[0]
+            for value in frame:
+                square += value * value
+                if (value < 0) != (previous < 0):
+                    crossings += 1
+                previous = value
+            total_square += square
+            energy = math.sqrt(square / length)
+            zcr = crossings / length
+            if energy >= threshold and (zcr <= self.zcr_threshold or energy >= 2 * threshold):
+                speech_frames += 1
+        return speech_frames, math.sqrt(total_square / total)
+
+# =============================================================================
+# 音频预处理链
+# =============================================================================
+class Resampler:
+    """
+    重采样（线性插值）
+    
+    把蓝牙SCO耳机常见的8kHz（或44.1k/48kHz）音频转换为Vosk需要的16kHz，
+    块与块之间保持插值相位连续；降采样时先做盒式低通，减少混叠，
+    低通跨块保留窗口历史（与HighPassFilter相同），块边界不会被补零拉低
+    """
+    
+    name = 'resample'
+    
+    def __init__(self, input_rate, output_rate=16000):
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.step = input_rate / output_rate     # 每个输出采样对应的输入采样数
+        # 降采样时盒式低通的窗口长度（1表示不滤波）
+        self.width = int(round(self.step)) if self.step > 1.0 else 1
+        self._kernel = np.full(self.width, 1.0 / self.width, dtype=np.float32)
+        self.reset()
+    
+    def reset(self):
+        self._last = None       # 上一块的最后一个采样（跨块插值用）
+        self._next = 0.0        # 下一个输出采样在当前输入中的位置
+        self._history = np.zeros(self.width - 1, dtype=np.float32)  # 低通窗口历史
+    
+    def process(self, samples):
+        if self.input_rate == self.output_rate or samples.size == 0:
+            return samples
+        
+        if self.width > 1:
+            # 降采样：盒式低通（接上一块末尾的width-1个采样，只取完整窗口）
+            extended = np.concatenate((self._history, samples))
+            self._history = extended[-(self.width - 1):]
+            samples = np.convolve(extended, self._kernel, mode='valid')
+        
+        if self._last is None:
+            source = samples
+        else:
+            source = np.concatenate(([self._last], samples))
+        last_index = source.size - 1
+        
+        count = int(math.floor((last_index - self._next) / self.step)) + 1
+        if count <= 0:
+            self._next -= source.size - 1
+            self._last = samples[-1]
+            return samples[:0]
+        
+        positions = self._next + self.step * np.arange(count)
+        output = np.interp(positions, np.arange(source.size), source).astype(np.float32)
+        
+        # 下一块的第0个采样是本块最后一个采样
+        self._next = positions[-1] + self.step - last_index
+        self._last = samples[-1]
+        return output
+
+
+class HighPassFilter:
+    """
+    高通滤波（去直流偏移和低频噪声）
+    
+    输出 = 输入 - 滑动平均，滑动窗口长度约为 采样率 / 截止频率，
+    用累积和一次算出整块的滑动平均，跨块保留窗口历史
+    """
+    
+    name = 'highpass'
+    
+    def __init__(self, cutoff_hz=80, sample_rate=16000):
+        self.window = max(2, int(round(sample_rate / cutoff_hz)))
+        self.reset()
+    
+    def reset(self):
+        self._history = np.zeros(self.window - 1, dtype=np.float32)
+    
+    def process(self, samples):
+        if samples.size == 0:
+            return samples
+        
+        extended = np.concatenate((self._history, samples))
+        cumulative = np.concatenate(([0.0], np.cumsum(extended, dtype=np.float64)))
+        moving_average = (cumulative[self.window:] - cumulative[:-self.window]) / self.window
+        self._history = extended[-(self.window - 1):]
+        return (samples - moving_average).astype(np.float32)
+
+
+class AutomaticGainControl:
+    """
+    自动增益控制
+    
+    把语音音量调整到target_rms附近：声音变大时快速降低增益（attack），
+    变小时缓慢提高增益（release）；低于噪声门限的块保持增益不变，避免放大底噪。
+    块内增益线性渐变，避免增益跳变产生爆音
+    """
+    
+    name = 'agc'
+    
+    def __init__(self, target_rms=3000.0, max_gain=20.0, min_gain=0.5,
+                 noise_gate=80.0, attack=0.5, release=0.05):
+        self.target_rms = target_rms
+        self.max_gain = max_gain
+        self.min_gain = min_gain
+        self.noise_gate = noise_gate
+        self.attack = attack
+        self.release = release
+        self.reset()
+    
+    def reset(self):
+        self.gain = 1.0
+    
+    def process(self, samples):
+        if samples.size == 0:
+            return samples
+        
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        previous = self.gain
+        if rms >= self.noise_gate:
+            desired = min(self.max_gain, max(self.min_gain, self.target_rms / rms))
+            rate = self.attack if desired < previous else self.release
+            self.gain = previous + (desired - previous) * rate
+        
+        if previous == self.gain:
+            return samples * self.gain
+        return samples * np.linspace(previous, self.gain, samples.size, dtype=np.float32)
+
+
+class AudioPipeline:
+    """
+    音频预处理链
+    
+    功能：
+    - 按顺序执行若干预处理阶段（每个阶段提供process(samples)和reset()）
+    - 16位整数只在入口转换为浮点一次、在出口转换回16位一次，
+      入口/出口缓冲区预先分配，只在块变大时重新分配
+    - 记录每个阶段每块的CPU耗时，整条链超过budget_ms时计入超时次数
+    """
+    
+    def __init__(self, stages, budget_ms=5.0, input_rate=16000):
+        """
+        初始化预处理链
+        
+        参数：
+            stages: 预处理阶段列表
+            budget_ms: 每块音频允许的总处理时间（毫秒）
+            input_rate: 输入音频的采样率
+        """
+        self.stages = list(stages)
+        self.budget_ms = budget_ms
+        self.input_rate = input_rate
+        self.reset()
+    
+    @classmethod
+    def default(cls, input_rate, output_rate=16000, budget_ms=5.0, enhance=True):
+        """
+        创建默认预处理链：重采样（需要时）-> 高通滤波 -> 自动增益
+        
+        参数：
+            input_rate: 麦克风实际采样率
+            output_rate: 解码器需要的采样率
+            budget_ms: 每块音频允许的总处理时间（毫秒）
+            enhance: 是否加入高通滤波和自动增益（为False时只做重采样）
+        
+        返回：
+            AudioPipeline；NumPy不可用时返回None
+        """
+        if load_numpy() is None:
+            print("[警告] NumPy不可用，音频预处理未启用")
+            return None
+        
+        stages = []
+        if input_rate != output_rate:
+            stages.append(Resampler(input_rate, output_rate))
+        if enhance:
+            stages.append(HighPassFilter(sample_rate=output_rate))
+            stages.append(AutomaticGainControl())
+        return cls(stages, budget_ms, input_rate)
+    
+    def reset(self):
+        """重置所有阶段的状态和计时统计"""
+        load_numpy()  # 在其他进程中反序列化后，第一次使用前导入
+        for stage in self.stages:
+            stage.reset()
+        self.chunks = 0                                     # 已处理块数
+        self.over_budget = 0                                # 超出预算的块数
+        self.stage_total = {stage.name: 0.0 for stage in self.stages}  # 各阶段累计耗时（秒）
+        self.stage_max = {stage.name: 0.0 for stage in self.stages}    # 各阶段单块最大耗时（秒）
+        self.last_ms = 0.0                                  # 最近一块的总耗时（毫秒）
+        self._input = np.empty(0, dtype=np.float32)         # 入口浮点缓冲区
+        self._output = np.empty(0, dtype=np.int16)          # 出口16位缓冲区
+    
+    def format_stats(self):
+        """把耗时统计格式化为一行文字"""
+        stats = self.get_stats()
+        stages = ', '.join(
+            f"{name} {item['mean_ms']:.2f}/{item['max_ms']:.2f}ms"
+            for name, item in stats['stages'].items()
+        )
+        return (f"{stats['chunks']}块，{stages}（平均/最大），"
+                f"超出{stats['budget_ms']:.1f}ms预算{stats['over_budget']}次")
+    
+    def process(self, audio_data):
+        """
+        处理一块音频
+        
+        参数：
+            audio_data: 16位PCM音频数据（bytes/bytearray/memoryview）
+        
+        返回：
+            处理后的16位PCM音频数据（memoryview，指向内部缓冲区，下次调用前有效）
+        """
+        started = time.perf_counter()
+        source = np.frombuffer(audio_data, dtype=np.int16)
+        if self._input.size < source.size:
+            self._input = np.empty(source.size, dtype=np.float32)
+        samples = self._input[:source.size]
+        samples[:] = source
+        
+        for stage in self.stages:
+            stage_start = time.perf_counter()
+            samples = stage.process(samples)
+            elapsed = time.perf_counter() - stage_start
+            self.stage_total[stage.name] += elapsed
+            if elapsed > self.stage_max[stage.name]:
+                self.stage_max[stage.name] = elapsed
+        
+        # 重采样后块大小可能变化，出口缓冲区按需增大（留出余量，避免反复重新分配）
+        if self._output.size < samples.size:
+            self._output = np.empty(samples.size + samples.size // 8 + 1, dtype=np.int16)
+        output = self._output[:samples.size]
+        np.clip(samples, -32768, 32767, out=samples)
+        output[:] = samples
+        output = memoryview(output).cast('B')
+        
+        self.chunks += 1
+        self.last_ms = (time.perf_counter() - started) * 1000
+        if self.last_ms > self.budget_ms:
+            self.over_budget += 1
+        return output
+    
+    def get_stats(self):
+        """
+        获取各阶段耗时统计
+        
+        返回：
+            {"chunks", "over_budget", "budget_ms", "last_ms",
+             "stages": {阶段名: {"mean_ms", "max_ms"}}}
+        """
+        chunks = max(1, self.chunks)
+        return {
+            'chunks': self.chunks,
+            'over_budget': self.over_budget,
+            'budget_ms': self.budget_ms,
+            'last_ms': self.last_ms,
+            'stages': {
+                name: {
+                    'mean_ms': self.stage_total[name] / chunks * 1000,
+                    'max_ms': self.stage_max[name] * 1000,
+                }
+                for name in self.stage_total
+            },
+        }
+
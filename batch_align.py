@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+批量对齐录音与文案（后期制作用，不需要Kivy）
+===============================================================================
+- 把录好的多条WAV（每条是一次完整的朗读）送入VoskRecognizer，
+  收集最终结果的单词时间戳（SetWords），逐词送入与界面相同的全文对齐器
+- 每句的开始/结束时间取该句被对齐上的第一个/最后一个关键词；
+  重读（对齐位置回退）时以最后一遍为准
+- 输出SRT字幕和JSON，多个文件分给进程池并行处理，吞吐量随CPU核数增长
+
+文案查找顺序（未用 --script 指定时）：
+    take1.wav -> take1.script.txt（会话录制文件）-> take1.txt
+
+输出（默认与WAV同目录，可用 --output-dir 指定）：
+    take1.srt           只包含对齐上的句子
+    take1.align.json    每句的开始/结束时间（未对齐的句子为null）和处理统计
+
+运行方式（在仓库根目录，需要Vosk库和模型）：
+    python batch_align.py takes/ --script script.txt --model ./vosk-model-small-en-us-0.15
+    python batch_align.py take1.wav take2.wav --jobs 4 --format srt
+===============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from text_processor import TextProcessor, ScriptAligner
+from audio_processing import AudioPipeline
+from speech_engine import SharedVoskModel, VoskRecognizer, VOSK_AVAILABLE
+from session_replay import load_wav
+
+
+# =============================================================================
+# 单词时间戳 -> 句子时间
+# =============================================================================
+def sentence_times(aligner, words):
+    """
+    把带时间戳的识别单词逐个送入对齐器，得到每句的朗读时间段
+    
+    参数：
+        aligner: ScriptAligner（从第一句开始）
+        words: Vosk单词时间戳列表 [{"word", "start", "end", "conf"}]
+    
+    返回：
+        {句子索引: {"start", "end", "words", "conf"}}，只包含对齐上的句子
+    """
+    spans = {}
+    previous = -1   # 上一个对齐上的全文位置
+    history = []    # 已送入对齐器的关键词（与对齐器处理的单词一一对应）
+    stale = set()   # 回退重读后，之后各句旧的计时（再次读到时重新计时）
+    for entry in words:
+        keywords = TextProcessor.extract_keywords(entry.get('word', ''))
+        if not keywords:
+            continue
+        
+        history.append(entry)
+        aligner.matched = None
+        aligner.update(keywords)
+        if aligner.matched is None:
+            continue
+        
+        sentence = aligner.word_sentence[aligner.matched]
+        span = spans.get(sentence)
+        if aligner.matched < previous:
+            # 回退重读：以这一遍为准重新计时；回退需连续命中几个词才被接受，
+            # 开始时间取这条匹配链的第一个词
+            first = history[-min(aligner.matched_run, len(history))]
+            span = spans[sentence] = {'start': first['start'], 'end': entry['end'],
+                                      'words': 0, 'conf': 0.0}
+            stale.update(index for index in spans if index > sentence)
+        elif span is None or sentence in stale:
+            span = spans[sentence] = {'start': entry['start'], 'end': entry['end'],
+                                      'words': 0, 'conf': 0.0}
+            stale.discard(sentence)
+        span['end'] = max(span['end'], entry['end'])
+        span['words'] += 1
+        span['conf'] += entry.get('conf', 1.0)
+        previous = aligner.matched
+    
+    for span in spans.values():
+        span['conf'] = round(span['conf'] / span['words'], 3)
+    return spans
+
+
+def build_cues(sentences, spans):
+    """
+    按开始时间排列对齐上的句子，生成互不重叠的字幕条目
+    
+    返回：
+        [{"sentence"(从1开始), "start", "end", "text", "words", "conf"}]
+    """
+    cues = []
+    for index in sorted(spans, key=lambda i: spans[i]['start']):
+        span = spans[index]
+        cues.append({
+            'sentence': index + 1,
+            'start': round(span['start'], 3),
+            'end': round(span['end'], 3),
+            'text': sentences[index]['text'],
+            'words': span['words'],
+            'conf': span['conf'],
+        })
+    
+    # 重读等情况下相邻两句可能重叠：前一句截止到后一句开始
+    for cue, following in zip(cues, cues[1:]):
+        if cue['end'] > following['start']:
+            cue['end'] = following['start']
+    return cues
+
+
+def srt_time(seconds):
+    """秒数 -> SRT时间格式 00:00:00,000"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    seconds, millis = divmod(millis, 1000)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}'
+
+
+def write_srt(cues, path):
+    """把字幕条目写成SRT文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for number, cue in enumerate(cues, 1):
+            f.write(f"{number}\n{srt_time(cue['start'])} --> {srt_time(cue['end'])}\n"
+                    f"{cue['text']}\n\n")
+
+
+# =============================================================================
+# 单个文件的对齐（在进程池的工作进程中运行）
+# =============================================================================
+def init_worker(model_path):
+    """工作进程初始化：每个进程只加载一次模型，之后处理的所有文件共用"""
+    if model_path:
+        SharedVoskModel.custom_path = model_path
+    SharedVoskModel.load()
+
+
+@functools.lru_cache(maxsize=8)
+def load_script(path):
+    """
+    读取并编译文案（同一进程内多条录音共用一份文案时只解析一次）
+    
+    返回：
+        (CompiledScript, KeywordIndex)
+    """
+    with open(path, encoding='utf-8') as f:
+        sentences = TextProcessor.compile_script(f.read())
+    if not sentences:
+        raise ValueError(f'文案为空: {path}')
+    return sentences, TextProcessor.build_index(sentences)
+
+
+def align_take(wav_path, script_path, chunk_ms=1000, use_grammar=False,
+               use_preprocessing=False):
+    """
+    对齐一条录音
+    
+    不启用静音检测：静音块不送入Vosk会使单词时间戳与录音时间错开
+    
+    参数：
+        wav_path: 16位单声道WAV路径
+        script_path: 文案文本文件
+        chunk_ms: 每次送入的音频时长（毫秒）
+        use_grammar: 是否使用文案语法识别器
+        use_preprocessing: 是否启用高通滤波和自动增益（非16kHz录音总会重采样）
+    
+    返回：
+        对齐报告字典（wav, script, audio_seconds, wall_seconds, rtf, sentences, cues）
+    """
+    start = time.perf_counter()
+    sentences, index = load_script(script_path)
+    pcm, sample_rate = load_wav(wav_path)
+    
+    recognizer = VoskRecognizer(use_grammar=use_grammar)
+    if not recognizer.load_model():
+        raise RuntimeError('Vosk模型不可用，无法对齐')
+    recognizer.set_script(sentences)
+    if use_preprocessing or sample_rate != 16000:
+        recognizer.pipeline = AudioPipeline.default(sample_rate, enhance=use_preprocessing)
+        if recognizer.pipeline is None and sample_rate != 16000:
+            raise RuntimeError(f'{sample_rate}Hz录音需要NumPy重采样')
+    recognizer.reset()
+    recognizer.word_timings = []
+    
+    chunk_bytes = sample_rate * chunk_ms // 1000 * 2
+    view = memoryview(pcm)
+    results = recognizer.result_queue
+    for offset in range(0, len(pcm), chunk_bytes):
+        recognizer.decode_chunk(view[offset:offset + chunk_bytes])
+        # 只需要单词时间戳，识别文本直接丢弃
+        while not results.empty():
+            results.get_nowait()
+    recognizer.flush()
+    
+    aligner = ScriptAligner(sentences, index=index)
+    cues = build_cues(sentences, sentence_times(aligner, recognizer.word_timings))
+    
+    wall_seconds = time.perf_counter() - start
+    audio_seconds = len(pcm) / 2 / sample_rate
+    return {
+        'wav': wav_path,
+        'script': script_path,
+        'audio_seconds': round(audio_seconds, 3),
+        'wall_seconds': round(wall_seconds, 3),
+        'rtf': round(wall_seconds / audio_seconds, 4) if audio_seconds else None,
+        'sentences': len(sentences),
+        'recognized_words': len(recognizer.word_timings),
+        'cues': cues,
+    }
+
+
+def run_task(task):
+    """
+    进程池任务：对齐一条录音并写出结果文件
+    
+    出错时返回带error字段的报告，不影响其他文件
+    """
+    wav_path, script_path, output_base, formats, options = task
+    try:
+        report = align_take(wav_path, script_path, **options)
+    except (RuntimeError, ValueError, OSError, EOFError, wave.Error) as e:
+        return {'wav': wav_path, 'error': str(e)}
+    
+    report['outputs'] = []
+    if 'srt' in formats:
+        write_srt(report['cues'], output_base + '.srt')
+        report['outputs'].append(output_base + '.srt')
+    if 'json' in formats:
+        aligned = {cue['sentence']: cue for cue in report['cues']}
+        sentences, _ = load_script(script_path)
+        data = dict(report, sentences=[
+            aligned.get(number, {'sentence': number, 'start': None, 'end': None,
+                                 'text': sentence['text']})
+            for number, sentence in enumerate(sentences, 1)
+        ])
+        del data['cues'], data['outputs']
+        with open(output_base + '.align.json', 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        report['outputs'].append(output_base + '.align.json')
+    return report
+
+
+# =============================================================================
+# 命令行
+# =============================================================================
+def run_pool(executor, tasks):
+    """
+    把任务分给进程池，按完成顺序逐个产出报告
+    
+    工作进程异常退出（如BrokenProcessPool）时，受影响的录音记为失败，不中断整批
+    """
+    futures = {executor.submit(run_task, task): task for task in tasks}
+    for future in as_completed(futures):
+        try:
+            yield future.result()
+        except Exception as e:
+            yield {'wav': futures[future][0], 'error': f'工作进程异常: {e!r}'}
+
+
+def find_wavs(paths):
+    """展开命令行参数：目录取其中所有.wav（按文件名排序）"""
+    wavs = []
+    for path in paths:
+        if os.path.isdir(path):
+            wavs += sorted(os.path.join(path, name) for name in os.listdir(path)
+                           if name.lower().endswith('.wav'))
+        else:
+            wavs.append(path)
+    return wavs
+
+
+def find_script(wav_path, script=None):
+    """确定录音对应的文案文件，找不到时返回None"""
+    if script:
+        return script
+    base = os.path.splitext(wav_path)[0]
+    for candidate in (base + '.script.txt', base + '.txt'):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量对齐录音与文案，输出每句的时间（SRT/JSON）')
+    parser.add_argument('wavs', nargs='+', help='16位单声道WAV文件或包含WAV的目录')
+    parser.add_argument('--script', help='所有录音共用的文案（默认按录音文件名查找）')
+    parser.add_argument('--model', help='Vosk模型目录（默认使用应用的模型路径）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='并行进程数')
+    parser.add_argument('--format', choices=['srt', 'json', 'both'], default='both',
+                        help='输出格式')
+    parser.add_argument('--output-dir', help='输出目录（默认与录音同目录）')
+    parser.add_argument('--chunk-ms', type=int, default=1000, help='每次送入的音频时长（毫秒）')
+    parser.add_argument('--grammar', action='store_true', help='使用文案语法识别器')
+    parser.add_argument('--preprocess', action='store_true', help='启用音频预处理（需要NumPy）')
+    args = parser.parse_args()
+    
+    if not VOSK_AVAILABLE:
+        print("[错误] Vosk库不可用，无法对齐")
+        return 1
+    if args.model:
+        SharedVoskModel.custom_path = args.model
+    if not os.path.exists(SharedVoskModel.model_path()):
+        print(f"[错误] 模型不存在: {SharedVoskModel.model_path()}，请用 --model 指定")
+        return 1
+    
+    formats = ('srt', 'json') if args.format == 'both' else (args.format,)
+    options = {
+        'chunk_ms': args.chunk_ms,
+        'use_grammar': args.grammar,
+        'use_preprocessing': args.preprocess,
+    }
+    tasks = []
+    for wav in find_wavs(args.wavs):
+        script = find_script(wav, args.script)
+        if script is None:
+            print(f"[警告] 找不到文案，已跳过: {wav}")
+            continue
+        directory = args.output_dir or os.path.dirname(wav)
+        output_base = os.path.join(directory, os.path.splitext(os.path.basename(wav))[0])
+        tasks.append((wav, script, output_base, formats, options))
+    if not tasks:
+        print("[错误] 没有可对齐的录音")
+        return 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    
+    jobs = max(1, min(args.jobs, len(tasks)))
+    print(f"[信息] 对齐{len(tasks)}条录音，{jobs}个进程")
+    start = time.perf_counter()
+    
+    if jobs == 1:
+        init_worker(SharedVoskModel.model_path())
+        reports = map(run_task, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                       initargs=(SharedVoskModel.model_path(),))
+        reports = run_pool(executor, tasks)
+    
+    failed = 0
+    audio_seconds = 0.0
+    try:
+        for report in reports:
+            if 'error' in report:
+                failed += 1
+                print(f"[错误] {report['wav']}: {report['error']}")
+                continue
+            audio_seconds += report['audio_seconds']
+            print(f"[成功] {report['wav']}: 对齐{len(report['cues'])}/{report['sentences']}句，"
+                  f"音频{report['audio_seconds']:.1f}秒，RTF={report['rtf']:.3f} -> "
+                  f"{', '.join(report['outputs'])}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    wall_seconds = time.perf_counter() - start
+    print("=" * 60)
+    print(f"完成 {len(tasks) - failed}/{len(tasks)} 条，音频共{audio_seconds:.1f}秒，"
+          f"耗时{wall_seconds:.1f}秒（{audio_seconds / wall_seconds:.1f}倍实时）")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
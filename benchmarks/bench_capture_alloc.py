@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+录音路径内存分配基准
+===============================================================================
+对比旧的录音路径（每块新建列表/数组并tobytes()复制）与
+预分配缓冲区 + AudioRingBuffer 的新路径，统计每个音频块的内存分配量和耗时。
+
+运行方式（在仓库根目录）：
+    python benchmarks/bench_capture_alloc.py
+===============================================================================
+"""
+
+import os
+import sys
+import time
+import array
+import queue
+import tracemalloc
+
+# 允许直接以脚本方式运行：把仓库根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processing import AudioRingBuffer
+
+CHUNK_SIZE = 4000       # 每块采样点数（约250ms）
+CHUNKS = 2000           # 测试块数
+
+
+def fake_read(buffer, offset, size):
+    """模拟AudioRecord.read()：数据已在缓冲区中，返回读取的采样点数"""
+    return size
+
+
+def old_path():
+    """旧路径：每块新建数组、切片并tobytes()，经队列交给解码方"""
+    pending = queue.Queue()
+    
+    def step():
+        buffer = array.array('h', [0] * CHUNK_SIZE)
+        read_size = fake_read(buffer, 0, CHUNK_SIZE)
+        pending.put(buffer[:read_size].tobytes())
+        data = pending.get()
+        return len(data)
+    return step
+
+
+def new_path():
+    """新路径：预分配读取缓冲区，memoryview写入预分配的环形缓冲区"""
+    ring = AudioRingBuffer(16, CHUNK_SIZE * 2)
+    buffer = array.array('h', bytes(CHUNK_SIZE * 2))
+    view = memoryview(buffer).cast('B')
+    
+    def step():
+        read_size = fake_read(buffer, 0, CHUNK_SIZE)
+        ring.write(view[:read_size * 2])
+        slot = ring.get()
+        size = len(ring.view(slot))
+        ring.release(slot)
+        return size
+    return step
+
+
+def measure(name, factory):
+    """统计稳定运行时每块的峰值内存分配和耗时（不含初始化）"""
+    step = factory()
+    for _ in range(10):  # 预热
+        step()
+    
+    tracemalloc.start()
+    peaks = []
+    for _ in range(100):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        step()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    
+    start = time.perf_counter()
+    for _ in range(CHUNKS):
+        step()
+    per_chunk_us = (time.perf_counter() - start) / CHUNKS * 1e6
+    
+    peak = sorted(peaks)[len(peaks) // 2]
+    print(f"{name:<8} | 每块分配峰值 {peak:>8} 字节 | 每块耗时 {per_chunk_us:7.1f}us")
+    return peak
+
+
+def main():
+    print("=" * 60)
+    print(f"录音路径内存分配（每块{CHUNK_SIZE}个采样点）")
+    print("=" * 60)
+    old = measure('旧路径', old_path)
+    new = measure('新路径', new_path)
+    print("=" * 60)
+    print(f"每块分配减少 {old - new} 字节")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
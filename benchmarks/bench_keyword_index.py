@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+KeywordIndex 性能基准
+===============================================================================
+验证倒排索引在长文案（5000句以上）上单次重新定位耗时低于1毫秒。
+
+运行方式（在仓库根目录）：
+    python benchmarks/bench_keyword_index.py
+    python benchmarks/bench_keyword_index.py --sentences 5000 20000 --queries 5000
+===============================================================================
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# 允许直接以脚本方式运行：把仓库根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_processor import TextProcessor
+
+# 音节表，用于拼出大量互不相同的伪英文单词
+SYLLABLES = [
+    'ba', 'con', 'der', 'fi', 'gra', 'hol', 'im', 'jus', 'ka', 'lem',
+    'mor', 'nat', 'op', 'pre', 'qua', 'ris', 'sta', 'tem', 'un', 'vol',
+    'wen', 'xi', 'yor', 'zan', 'ment', 'tion', 'ly', 'ing', 'ous', 'er',
+]
+
+STOP_WORDS = ['the', 'and', 'to', 'of', 'we', 'this', 'is', 'in', 'for', 'it']
+
+
+def make_vocabulary(size, rng):
+    """生成size个互不相同的伪英文单词"""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_script(sentence_total, rng, vocabulary_size=8000):
+    """
+    生成测试文案
+    
+    单词频率服从Zipf分布（少数词很常见、大多数词很罕见），与真实文案接近
+    """
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+    
+    sentences = []
+    for _ in range(sentence_total):
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(6, 14))
+        for _ in range(rng.randint(2, 5)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(STOP_WORDS))
+        sentences.append(' '.join(words).capitalize() + rng.choice('.!?'))
+    return ' '.join(sentences)
+
+
+def make_queries(sentences, total, rng, window=12):
+    """
+    从随机句子截取识别窗口，并混入识别错误和即兴插入的词
+    
+    返回：
+        [(目标句子索引, 识别关键词列表)]
+    """
+    queries = []
+    for _ in range(total):
+        target = rng.randrange(len(sentences))
+        words = list(sentences[target]['keywords'])
+        # 跨到下一句，模拟识别窗口横跨两句
+        if target + 1 < len(sentences):
+            words += sentences[target + 1]['keywords'][:3]
+        words = [w for w in words if rng.random() > 0.2]              # 漏识别
+        words += [rng.choice(sentences[rng.randrange(len(sentences))]['keywords'] or ['um'])
+                  for _ in range(2)]                                   # 插入词
+        queries.append((target, words[-window:]))
+    return queries
+
+
+def percentile(sorted_values, fraction):
+    """从已排序的列表中取分位数"""
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def run(sentence_total, query_total, seed):
+    """对一种文案规模运行基准并打印结果"""
+    rng = random.Random(seed)
+    text = make_script(sentence_total, rng)
+    
+    start = time.perf_counter()
+    sentences = TextProcessor.split_sentences(text)
+    parse_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    index = TextProcessor.build_index(sentences)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    queries = make_queries(sentences, query_total, rng)
+    timings = []
+    hits = 0
+    for target, words in queries:
+        start = time.perf_counter()
+        found = index.best(words)
+        timings.append((time.perf_counter() - start) * 1000)
+        if found is not None and abs(found[0] - target) <= 1:
+            hits += 1
+    timings.sort()
+    
+    p99 = percentile(timings, 0.99)
+    print(f"{len(sentences):>7}句 | 拆分 {parse_ms:8.1f}ms | 建索引 {build_ms:7.1f}ms | "
+          f"查询 p50 {percentile(timings, 0.5):.3f}ms  p99 {p99:.3f}ms  "
+          f"max {timings[-1]:.3f}ms | 命中率 {hits / len(queries):.1%}")
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description='KeywordIndex性能基准')
+    parser.add_argument('--sentences', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help='测试的文案句子数')
+    parser.add_argument('--queries', type=int, default=2000, help='每种规模的查询次数')
+    parser.add_argument('--seed', type=int, default=1234, help='随机种子')
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("KeywordIndex 重新定位基准（目标：p99 < 1ms）")
+    print("=" * 60)
+    worst = max(run(total, args.queries, args.seed) for total in args.sentences)
+    print("=" * 60)
+    print(f"[{'通过' if worst < 1.0 else '未通过'}] 最差p99 = {worst:.3f}ms")
+    return 0 if worst < 1.0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
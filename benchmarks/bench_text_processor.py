@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+TextProcessor 性能基准
+===============================================================================
+覆盖 split_sentences / compile_script / extract_keywords / match_keywords / _edit_distance：
+- 文案规模从10句到50000句
+- 带识别错误（漏词、错拼、插入词）的识别缓冲区，长度从5到100个词
+
+每项报告吞吐量（ops/sec）、单次耗时p50/p99和单次调用的峰值内存，
+结果同时写入JSON（带提交哈希），可用 --compare 与另一次提交的结果对比。
+只导入text_processor，不需要Kivy。
+
+运行方式（在仓库根目录）：
+    python benchmarks/bench_text_processor.py
+    python benchmarks/bench_text_processor.py --sentences 10 1000 --budget 0.2
+    python benchmarks/bench_text_processor.py --compare benchmarks/results/text_processor-abc1234.json
+===============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+# 允许直接以脚本方式运行：把仓库根目录加入导入路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from text_processor import TextProcessor
+from bench_keyword_index import make_script
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+FILLERS = ['um', 'uh', 'so', 'like', 'okay', 'yeah']
+
+
+# =============================================================================
+# 测试数据
+# =============================================================================
+def misspell(word, rng):
+    """模拟识别错误：替换、删除或插入一个字母"""
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word))
+    letter = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + letter + word[i + 1:]
+    if kind == 1:
+        return word[:i] + word[i + 1:]
+    return word[:i] + letter + word[i:]
+
+
+def make_buffers(sentences, length, total, rng):
+    """
+    生成带噪声的识别缓冲区
+    
+    从随机位置截取length个连续单词，15%漏识别、10%错拼、每10个词插入一个口头语
+    
+    返回：
+        [(识别文本, 缓冲区所在句子的关键词, 匹配阈值, 关键词的发音键)]
+    """
+    buffers = []
+    for _ in range(total):
+        target = rng.randrange(len(sentences))
+        words = []
+        index = target
+        while len(words) < length and index < len(sentences):
+            words += sentences[index]['text'].lower().split()
+            index += 1
+        heard = []
+        for word in words[:length]:
+            roll = rng.random()
+            if roll < 0.15:
+                continue
+            heard.append(misspell(word, rng) if roll < 0.25 else word)
+            if rng.random() < 0.1:
+                heard.append(rng.choice(FILLERS))
+        sentence = sentences[target]
+        buffers.append((' '.join(heard), sentence['keywords'], 0.5, sentence['phonetic']))
+    return buffers
+
+
+def make_word_pairs(sentences, total, rng, kind):
+    """
+    生成编辑距离的输入
+    
+    kind:
+        near: 单词与其错拼（匹配时最常见的情况）
+        random: 两个随机单词
+        phrase: 两段约40个字符的短语（长字符串的最坏情况）
+    """
+    words = [w for s in sentences for w in s['keywords']] or ['teleprompter']
+    pairs = []
+    for _ in range(total):
+        if kind == 'near':
+            word = rng.choice(words)
+            pairs.append((word, misspell(word, rng)))
+        elif kind == 'random':
+            pairs.append((rng.choice(words), rng.choice(words)))
+        else:
+            left = ' '.join(rng.choice(words) for _ in range(6))[:40]
+            right = ' '.join(rng.choice(words) for _ in range(6))[:40]
+            pairs.append((left, right))
+    return pairs
+
+
+# =============================================================================
+# 测量
+# =============================================================================
+def percentile(sorted_values, fraction):
+    """从已排序的列表中取分位数"""
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def measure(func, inputs, budget, min_calls=5, max_calls=200000):
+    """
+    循环调用func(*inputs[i])，统计耗时和峰值内存
+    
+    先预热（让各级缓存进入稳定状态），再计时运行至少min_calls次、
+    且总耗时不少于budget秒；最后在tracemalloc下单独测峰值内存
+    （tracemalloc会拖慢运行，不与计时混在一起）
+    
+    返回：
+        {"calls", "ops_per_sec", "p50_us", "p99_us", "peak_kb"}
+    """
+    for args in inputs[:min_calls]:
+        func(*args)
+    
+    timings = []
+    total = 0.0
+    calls = 0
+    while calls < max_calls and (calls < min_calls or total < budget):
+        args = inputs[calls % len(inputs)]
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+        calls += 1
+    timings.sort()
+    
+    peak = 0
+    tracemalloc.start()
+    for args in inputs[:min_calls]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func(*args)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    
+    return {
+        'calls': calls,
+        'ops_per_sec': round(calls / total, 1),
+        'p50_us': round(percentile(timings, 0.5) * 1e6, 2),
+        'p99_us': round(percentile(timings, 0.99) * 1e6, 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def report(results, name, case, stats):
+    """记录并打印一项结果"""
+    stats = dict(stats, function=name, case=case)
+    results.append(stats)
+    print(f"{name:<16} {case:<14} | {stats['ops_per_sec']:>12,.0f} ops/s | "
+          f"p50 {stats['p50_us']:>11,.1f}us  p99 {stats['p99_us']:>11,.1f}us | "
+          f"峰值 {stats['peak_kb']:>9,.1f}KB")
+
+
+def run(sizes, buffer_lengths, budget, seed):
+    """运行全部基准，返回结果列表"""
+    results = []
+    rng = random.Random(seed)
+    scripts = {size: make_script(size, rng) for size in sizes}
+    
+    # 拆分句子：每种文案规模
+    for size in sizes:
+        stats = measure(TextProcessor.split_sentences, [(scripts[size],)], budget, min_calls=3)
+        report(results, 'split_sentences', f'{size}句', stats)
+    for size in sizes:
+        stats = measure(TextProcessor.compile_script, [(scripts[size],)], budget, min_calls=3)
+        report(results, 'compile_script', f'{size}句', stats)
+    
+    # 以下各项都基于最大的文案取样
+    sentences = TextProcessor.split_sentences(scripts[max(sizes)])
+    samples = [(s['text'],) for s in rng.sample(sentences, min(2000, len(sentences)))]
+    report(results, 'extract_keywords', '单句', measure(TextProcessor.extract_keywords, samples, budget))
+    
+    for length in buffer_lengths:
+        buffers = make_buffers(sentences, length, 500, rng)
+        stats = measure(TextProcessor.match_keywords, buffers, budget)
+        report(results, 'match_keywords', f'{length}词缓冲', stats)
+    
+    for kind in ('near', 'random', 'phrase'):
+        pairs = make_word_pairs(sentences, 2000, rng, kind)
+        report(results, '_edit_distance', kind, measure(TextProcessor._edit_distance, pairs, budget))
+    
+    return results
+
+
+# =============================================================================
+# 结果保存与对比
+# =============================================================================
+def git_commit():
+    """当前提交的短哈希（不在git仓库中时返回unknown）"""
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10)
+        return output.stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path, sizes):
+    """
+    与之前保存的结果对比，打印吞吐量和p99的变化
+    
+    match_keywords等项从最大的文案取样，文案规模不同时样本不同，只能粗略对比
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('sentences') != sizes:
+        print(f"[警告] 文案规模不同（{baseline.get('sentences')} vs {sizes}），对比仅供参考")
+    previous = {(r['function'], r['case']): r for r in baseline['results']}
+    
+    print("=" * 60)
+    print(f"对比 {baseline_path}（提交 {baseline.get('commit', '?')}）")
+    print("=" * 60)
+    for stats in results:
+        old = previous.get((stats['function'], stats['case']))
+        if old is None:
+            continue
+        speed = stats['ops_per_sec'] / old['ops_per_sec'] if old['ops_per_sec'] else 0
+        p99 = stats['p99_us'] / old['p99_us'] if old['p99_us'] else 0
+        flag = '  <- 变慢' if speed < 0.9 else ''
+        print(f"{stats['function']:<16} {stats['case']:<14} | 吞吐量 x{speed:5.2f} | p99 x{p99:5.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TextProcessor性能基准')
+    parser.add_argument('--sentences', type=int, nargs='+', default=[10, 100, 1000, 10000, 50000],
+                        help='测试的文案句子数')
+    parser.add_argument('--buffer-words', type=int, nargs='+', default=[5, 20, 50, 100],
+                        help='识别缓冲区长度（单词数）')
+    parser.add_argument('--budget', type=float, default=1.0, help='每项至少计时的秒数')
+    parser.add_argument('--seed', type=int, default=1234, help='随机种子')
+    parser.add_argument('--output', help='结果JSON路径（默认benchmarks/results/text_processor-<提交>.json）')
+    parser.add_argument('--compare', help='与之前保存的结果JSON对比')
+    args = parser.parse_args()
+    
+    commit = git_commit()
+    print("=" * 60)
+    print(f"TextProcessor 基准（提交 {commit}，Python {platform.python_version()}）")
+    print("=" * 60)
+    sizes = sorted(args.sentences)
+    results = run(sizes, args.buffer_words, args.budget, args.seed)
+    
+    output = args.output or os.path.join(RESULTS_DIR, f'text_processor-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'benchmark': 'text_processor',
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sentences': sizes,
+            'buffer_words': args.buffer_words,
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print("=" * 60)
+    print(f"[成功] 结果已写入 {output}")
+    
+    if args.compare:
+        compare(results, args.compare, sizes)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,7 +11,7 @@ source.dir = .
 source.main = main.py
 source.include_exts = py,png,jpg,kv,atlas,json,fst,conf,bin,txt,md,scorer
 source.include_patterns = vosk-model-small-en-us-0.15/*
-source.exclude_dirs = tests,bin,.git,.github,__pycache__,.venv,.buildozer
+source.exclude_dirs = tests,benchmarks,bin,.git,.github,__pycache__,.venv,.buildozer
 
 orientation = portrait
 fullscreen = 0
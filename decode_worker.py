@@ -0,0 +1,624 @@
+# -*- coding: utf-8 -*-
+"""
+独立进程中的Vosk解码（不依赖Kivy）
+
+默认情况下Vosk解码线程、录音回调和Kivy界面共用一个解释器和GIL，
+AcceptWaveform的突发耗时会造成界面掉帧。本模块把解码放到独立的工作进程：
+
+    录音线程 ──写入──> 共享内存环形缓冲区 ──读取──> 工作进程（VoskRecognizer）
+         └──门铃管道（每块一个字节）──────────────────┘          │
+    UI线程 <── result_queue <── 接收线程 <── stdout（每行一条JSON）┘
+
+- 音频通过multiprocessing.shared_memory传递，不经过管道复制
+- 工作进程用subprocess启动（不用multiprocessing的spawn，避免在子进程中
+  重新导入main.py而创建Kivy窗口）；会话配置用pickle经stdin发送
+- 工作进程崩溃时自动重启（界面不需要重启），重启次数超过上限后报告失败
+- 依赖POSIX的管道文件描述符传递：安卓和Windows上不可用，应使用线程模式
+
+单独运行（由ProcessVoskRecognizer启动，不需要手动运行）：
+    python decode_worker.py --ring <共享内存名> --slots 16 --slot-bytes 8000 --doorbell <fd> --model <模型目录>
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import select
+import struct
+import argparse
+import threading
+import subprocess
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+
+from speech_engine import IS_ANDROID, VOSK_AVAILABLE, SharedVoskModel, VoskRecognizer
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+# 父进程 -> 工作进程的命令（stdin）
+COMMAND_START = b's'    # 开始会话，后跟4字节长度和pickle的会话配置
+COMMAND_END = b'e'      # 结束会话（重置解码状态，之后的音频丢弃）
+COMMAND_QUIT = b'q'     # 退出
+
+
+# =============================================================================
+# 共享内存环形缓冲区
+# =============================================================================
+class SharedAudioRing:
+    """
+    跨进程的单写单读音频环形缓冲区
+    
+    内存布局（均为8字节对齐）：
+        [写入计数 q] [每块序号 q × N] [每块长度 q × N] [每块写入时间 d × N] [音频数据 N × 块大小]
+    
+    - 写入方（父进程录音线程）是头部的唯一修改者：先把块序号置为-1，
+      写入数据，再写入长度、时间和序号，最后增加写入计数
+    - 读取方（工作进程）只在本地记录读取位置；复制数据前后各检查一次块序号，
+      期间被覆盖则视为丢弃（与AudioRingBuffer相同：落后时丢弃最旧的音频）
+    - 两个进程之间没有锁，任一方崩溃都不会让另一方卡住
+    """
+    
+    def __init__(self, shm, slot_count, slot_bytes, owner):
+        self.shm = shm
+        self.slot_count = slot_count
+        self.slot_bytes = slot_bytes
+        self.owner = owner          # 创建方负责删除共享内存
+        
+        buf = shm.buf
+        n = slot_count
+        self._count = buf[0:8].cast('q')
+        self._seqs = buf[8:8 + 8 * n].cast('q')
+        self._lengths = buf[8 + 8 * n:8 + 16 * n].cast('q')
+        self._stamps = buf[8 + 16 * n:8 + 24 * n].cast('d')
+        self._data = buf[8 + 24 * n:8 + 24 * n + n * slot_bytes]
+        
+        self.read_count = 0     # 读取方：下一块要读的序号
+        self.dropped = 0        # 读取方：丢弃的块数
+    
+    @staticmethod
+    def size(slot_count, slot_bytes):
+        """共享内存的总字节数"""
+        return 8 + 24 * slot_count + slot_count * slot_bytes
+    
+    @classmethod
+    def create(cls, slot_count, slot_bytes):
+        """创建新的共享内存（父进程调用）"""
+        shm = shared_memory.SharedMemory(create=True, size=cls.size(slot_count, slot_bytes))
+        ring = cls(shm, slot_count, slot_bytes, owner=True)
+        ring._count[0] = 0
+        for slot in range(slot_count):
+            ring._seqs[slot] = -1
+        return ring
+    
+    @classmethod
+    def attach(cls, name, slot_count, slot_bytes):
+        """连接父进程创建的共享内存（工作进程调用）"""
+        shm = shared_memory.SharedMemory(name=name)
+        # 工作进程只是使用者：退出（包括崩溃后重启）时不能让资源跟踪器删除共享内存
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return cls(shm, slot_count, slot_bytes, owner=False)
+    
+    @property
+    def name(self):
+        return self.shm.name
+    
+    @property
+    def written(self):
+        """已写入的块数"""
+        return self._count[0]
+    
+    @property
+    def depth(self):
+        """读取方尚未读取的块数"""
+        return min(self.slot_count, self.written - self.read_count)
+    
+    # ---- 写入方 ----
+    def write(self, data):
+        """
+        写入一段音频（父进程录音线程调用，永不阻塞）
+        
+        超过块大小的数据会拆成多块写入
+        """
+        now = time.monotonic()
+        source = memoryview(data).cast('B')
+        offset = 0
+        total = len(source)
+        slot_bytes = self.slot_bytes
+        while offset < total:
+            size = min(slot_bytes, total - offset)
+            sequence = self._count[0]
+            slot = sequence % self.slot_count
+            start = slot * slot_bytes
+            
+            self._seqs[slot] = -1  # 写入中
+            self._data[start:start + size] = source[offset:offset + size]
+            self._lengths[slot] = size
+            self._stamps[slot] = now
+            self._seqs[slot] = sequence
+            self._count[0] = sequence + 1
+            offset += size
+    
+    # ---- 读取方 ----
+    def read(self, out):
+        """
+        读取下一块音频（工作进程调用）
+        
+        参数：
+            out: 至少slot_bytes字节的可写缓冲区
+        
+        返回：
+            (长度, 写入时间)；没有新数据时返回None
+        """
+        while True:
+            written = self._count[0]
+            if self.read_count >= written:
+                return None
+            if written - self.read_count > self.slot_count:
+                # 落后超过一圈：最旧的块已被覆盖
+                skipped = written - self.slot_count - self.read_count
+                self.dropped += skipped
+                self.read_count += skipped
+            
+            sequence = self.read_count
+            slot = sequence % self.slot_count
+            self.read_count += 1
+            if self._seqs[slot] != sequence:
+                self.dropped += 1
+                continue
+            
+            size = self._lengths[slot]
+            stamp = self._stamps[slot]
+            start = slot * self.slot_bytes
+            out[:size] = self._data[start:start + size]
+            if self._seqs[slot] != sequence:
+                # 复制期间被写入方覆盖
+                self.dropped += 1
+                continue
+            return size, stamp
+    
+    def skip(self):
+        """丢弃所有未读数据（从最新的音频开始读）"""
+        self.read_count = self._count[0]
+    
+    def close(self):
+        """断开共享内存（创建方同时删除）"""
+        for view in (self._count, self._seqs, self._lengths, self._stamps, self._data):
+            view.release()
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# =============================================================================
+# 父进程：工作进程模式的识别器
+# =============================================================================
+class ProcessVoskRecognizer(VoskRecognizer):
+    """
+    在独立进程中解码的识别器（接口与VoskRecognizer相同）
+    
+    - feed()把音频写入共享内存并敲一下门铃，录音线程不会被阻塞
+    - 接收线程读取工作进程的结果，经result_queue/on_result交给UI，
+      延迟追踪的时间戳随结果一起传回（两个进程共用同一个单调时钟）
+    - pipeline/vad/use_grammar/文案在start()时作为会话配置发给工作进程
+    - 工作进程在会话之间保持运行，模型只加载一次；崩溃后自动重启
+    - 工作进程加载自己的模型，内存占用比线程模式多一份模型
+    
+    on_status(status, message)在接收线程中调用，涉及UI时需自行切回主线程；
+    status: loading / ready / restarting / failed
+    """
+    
+    MAX_RESTARTS = 3        # 每次会话最多自动重启的次数
+    out_of_process = True
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ring = None            # SharedAudioRing
+        self.process = None         # 工作进程（subprocess.Popen）
+        self.on_status = None       # 工作进程状态回调
+        self.restarts = 0           # 本次会话的重启次数
+        self.worker_stats = {}      # 工作进程报告的统计
+        self._doorbell = None       # 门铃管道的写入端（整个对象生命周期内不变）
+        self._doorbell_read = None  # 门铃管道的读取端（每次启动工作进程时传给它）
+        self._script = None         # 当前文案（发送给工作进程用于构建语法）
+        self._command_lock = threading.Lock()
+        self._closing = False
+    
+    @staticmethod
+    def supported():
+        """当前平台能否使用工作进程模式"""
+        return (VOSK_AVAILABLE and shared_memory is not None
+                and not IS_ANDROID and os.name == 'posix')
+    
+    def load_model(self):
+        """
+        检查工作进程能否加载模型（模型本身在工作进程中加载）
+        
+        返回：
+            True: Vosk可用且模型目录存在
+        """
+        if not self.vosk_available:
+            print("[警告] Vosk库不可用，切换到手动模式")
+            return False
+        
+        model_path = SharedVoskModel.model_path()
+        if not os.path.exists(model_path):
+            print(f"[错误] 模型不存在: {model_path}")
+            return False
+        
+        self.model = model_path  # 工作进程模式下记录模型目录
+        return True
+    
+    def set_script(self, sentences):
+        """记录当前文案，start()时发送给工作进程"""
+        self._script = sentences
+    
+    def _report(self, status, message):
+        """报告工作进程状态"""
+        print(f"[解码进程] {message}")
+        if self.on_status:
+            try:
+                self.on_status(status, message)
+            except Exception as e:
+                print(f"[错误] 解码进程状态回调失败: {e}")
+    
+    # ---- 工作进程管理 ----
+    def _spawn(self):
+        """启动工作进程"""
+        if self.ring is None:
+            self.ring = SharedAudioRing.create(self.audio_buffer.slot_count,
+                                               self.audio_buffer.slot_bytes)
+        
+        # 门铃管道只创建一次，重启时把同一个读取端传给新的工作进程：
+        # 录音线程可能正要写入门铃，关闭写入端后文件号可能被别处复用
+        if self._doorbell is None:
+            self._doorbell_read, self._doorbell = os.pipe()
+            os.set_blocking(self._doorbell, False)  # 门铃满了直接丢弃，不阻塞录音线程
+        read_fd = self._doorbell_read
+        command = [
+            sys.executable, WORKER_SCRIPT,
+            '--ring', self.ring.name,
+            '--slots', str(self.ring.slot_count),
+            '--slot-bytes', str(self.ring.slot_bytes),
+            '--doorbell', str(read_fd),
+            '--model', os.path.abspath(self.model),
+        ]
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   pass_fds=(read_fd,),
+                                   cwd=os.path.dirname(WORKER_SCRIPT))
+        self.process = process
+        threading.Thread(target=self._receive_loop, args=(process,), daemon=True).start()
+        self._report('loading', f'解码进程已启动（pid {process.pid}），正在加载模型')
+    
+    def _worker_alive(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def _command(self, command, payload=None):
+        """向工作进程发送一条命令（进程已退出时忽略）"""
+        process = self.process
+        if process is None:
+            return
+        data = command
+        if payload is not None:
+            data += struct.pack('<I', len(payload)) + payload
+        with self._command_lock:
+            try:
+                process.stdin.write(data)
+                process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                pass  # 进程已退出，由接收线程处理
+    
+    def _send_session(self):
+        """把会话配置发送给工作进程"""
+        if self.pipeline is not None:
+            self.pipeline.reset()
+        if self.vad is not None:
+            self.vad.reset()
+        config = {
+            'sentences': self._script if self.use_grammar else None,
+            'use_grammar': self.use_grammar,
+            'pipeline': self.pipeline,
+            'vad': self.vad,
+        }
+        self._command(COMMAND_START, pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL))
+    
+    def _receive_loop(self, process):
+        """读取工作进程的输出（接收线程，每个工作进程一个）"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                # 工作进程重定向日志之前的输出（如导入时的提示），原样转出
+                print(f"[解码进程] {line.decode('utf-8', 'replace').rstrip()}")
+                continue
+            self._handle(message)
+        
+        code = process.wait()
+        if process is not self.process or self._closing:
+            return
+        self._on_worker_exit(code)
+    
+    def _handle(self, message):
+        """处理工作进程发来的一条消息"""
+        kind = message.get('type')
+        if kind == 'chunk':
+            self.worker_stats = message['stats']
+            if not self.is_running:
+                return
+            tracer = self.tracer
+            if tracer is not None:
+                tracer.decoded(message['capture'], message['start'], message['end'])
+            self._chunk_capture = message['capture']
+            self._chunk_start = message['start']
+            for result in message['results']:
+                self._post(result)
+        elif kind == 'speech_start':
+            if self.is_running and self.on_speech_start:
+                self.on_speech_start()
+        elif kind == 'status':
+            self._report(message['status'], message['message'])
+    
+    def _on_worker_exit(self, code):
+        """工作进程意外退出：在重启上限内自动重启，并恢复当前会话"""
+        self.restarts += 1
+        if self.restarts > self.MAX_RESTARTS:
+            self._report('failed', f'解码进程反复退出（退出码{code}），已停止重启')
+            return
+        
+        self._report('restarting', f'解码进程意外退出（退出码{code}），'
+                                   f'正在重启（第{self.restarts}次）')
+        try:
+            self._spawn()
+        except OSError as e:
+            self._report('failed', f'重启解码进程失败: {e}')
+            return
+        if self.is_running:
+            self._send_session()
+    
+    # ---- 识别器接口 ----
+    def start(self):
+        """
+        开始一次会话（工作进程未运行时先启动）
+        
+        返回：
+            True: 会话已开始；False: 工作进程启动失败
+        """
+        if self.is_running:
+            return True
+        
+        self.reset()
+        self.restarts = 0
+        self.is_running = True
+        if not self._worker_alive():
+            try:
+                self._spawn()
+            except OSError as e:
+                self.is_running = False
+                self._report('failed', f'启动解码进程失败: {e}')
+                return False
+        self._send_session()
+        return True
+    
+    def stop(self):
+        """结束会话（工作进程保持运行，下次会话无需重新加载模型）"""
+        if not self.is_running:
+            return
+        
+        self.is_running = False
+        self._command(COMMAND_END)
+        stats = self.worker_stats
+        print(f"[信息] 解码会话已结束（已解码{stats.get('processed', 0)}块，"
+              f"丢弃{stats.get('dropped', 0)}块，重启{self.restarts}次）")
+    
+    def close(self):
+        """结束会话并退出工作进程，释放共享内存（应用退出、录音已停止后调用）"""
+        self.stop()
+        self._closing = True
+        process = self.process
+        if process is not None:
+            self._command(COMMAND_QUIT)
+            try:
+                process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            self.process = None
+        if self._doorbell is not None:
+            os.close(self._doorbell)
+            os.close(self._doorbell_read)
+            self._doorbell = None
+            self._doorbell_read = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+    
+    def feed(self, audio_data):
+        """
+        放入一块音频（录音线程调用，永不阻塞）
+        
+        写入共享内存后向门铃管道写一个字节唤醒工作进程；
+        管道已满说明工作进程还有未处理的门铃，直接忽略
+        """
+        ring = self.ring
+        if ring is None:
+            return
+        ring.write(audio_data)
+        try:
+            os.write(self._doorbell, b'a')
+        except (BlockingIOError, OSError, TypeError):
+            pass
+    
+    @property
+    def queue_depth(self):
+        """工作进程尚未读取的音频块数"""
+        return self.worker_stats.get('depth', 0)
+    
+    def get_stats(self):
+        """获取解码统计信息（来自工作进程最近一次报告）"""
+        stats = self.worker_stats
+        return {
+            'queue_depth': stats.get('depth', 0),
+            'max_queue_depth': stats.get('max_depth', 0),
+            'processed': stats.get('processed', 0),
+            'dropped': stats.get('dropped', 0),
+            'skipped_silence': stats.get('skipped', 0),
+            'speech_onsets': stats.get('onsets', 0),
+            'pipeline': stats.get('pipeline'),
+            'restarts': self.restarts,
+        }
+
+
+# =============================================================================
+# 工作进程
+# =============================================================================
+def read_exact(fd, size):
+    """从文件描述符读取恰好size字节（对方关闭时返回None）"""
+    chunks = []
+    while size:
+        data = os.read(fd, size)
+        if not data:
+            return None
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+class Worker:
+    """工作进程的主循环：等待门铃或命令，解码共享内存中的音频"""
+    
+    def __init__(self, ring, doorbell, channel):
+        self.ring = ring
+        self.doorbell = doorbell
+        self.channel = channel
+        self.commands = sys.stdin.fileno()
+        self.recognizer = VoskRecognizer()
+        self.recognizer.on_speech_start = lambda: self.send({'type': 'speech_start'})
+        self.active = False
+        self.max_depth = 0
+        self.audio = bytearray(ring.slot_bytes)
+        self.audio_view = memoryview(self.audio)
+    
+    def send(self, message):
+        """向父进程发送一条消息（每行一条JSON）"""
+        self.channel.write(json.dumps(message) + '\n')
+        self.channel.flush()
+    
+    def status(self, status, message):
+        self.send({'type': 'status', 'status': status, 'message': message})
+    
+    def run(self):
+        """主循环，返回退出码"""
+        start = time.monotonic()
+        if not self.recognizer.load_model():
+            self.status('failed', '工作进程加载模型失败')
+            return 1
+        self.status('ready', f'模型加载完成（{time.monotonic() - start:.1f}秒）')
+        
+        while True:
+            readable, _, _ = select.select([self.commands, self.doorbell], [], [])
+            if self.doorbell in readable:
+                if not os.read(self.doorbell, 4096):
+                    return 0  # 父进程已退出
+                self.drain()
+            if self.commands in readable:
+                command = os.read(self.commands, 1)
+                if not command or command == COMMAND_QUIT:
+                    return 0
+                if command == COMMAND_START:
+                    header = read_exact(self.commands, 4)
+                    payload = header and read_exact(self.commands, struct.unpack('<I', header)[0])
+                    if payload is None:
+                        return 0
+                    self.start_session(pickle.loads(payload))
+                elif command == COMMAND_END:
+                    self.end_session()
+    
+    def start_session(self, config):
+        """按父进程发来的配置开始会话"""
+        recognizer = self.recognizer
+        recognizer.use_grammar = config['use_grammar']
+        recognizer.pipeline = config['pipeline']
+        recognizer.vad = config['vad']
+        recognizer.set_script(config['sentences'])
+        recognizer.reset()
+        self.ring.skip()  # 会话开始前的音频不解码
+        self.active = True
+    
+    def end_session(self):
+        """结束会话：丢弃未说完的句子"""
+        self.active = False
+        self.recognizer.flush()
+        if self.recognizer.pipeline is not None:
+            print(f"[信息] 音频预处理耗时：{self.recognizer.pipeline.format_stats()}")
+    
+    def drain(self):
+        """解码共享内存中所有未读的音频块"""
+        if not self.active:
+            self.ring.skip()
+            return
+        
+        recognizer = self.recognizer
+        ring = self.ring
+        while True:
+            self.max_depth = max(self.max_depth, ring.depth)
+            item = ring.read(self.audio)
+            if item is None:
+                break
+            size, capture = item
+            start = time.monotonic()
+            recognizer.decode_chunk(self.audio_view[:size])
+            end = time.monotonic()
+            
+            results = []
+            while not recognizer.result_queue.empty():
+                results.append(recognizer.result_queue.get_nowait())
+            self.send({
+                'type': 'chunk',
+                'capture': capture,
+                'start': start,
+                'end': end,
+                'results': results,
+                'stats': {
+                    'depth': ring.depth,
+                    'max_depth': self.max_depth,
+                    'processed': recognizer.processed_chunks,
+                    'dropped': ring.dropped,
+                    'skipped': recognizer.skipped_chunks,
+                    'onsets': recognizer.speech_onsets,
+                    'pipeline': recognizer.pipeline.get_stats() if recognizer.pipeline else None,
+                },
+            })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vosk解码工作进程')
+    parser.add_argument('--ring', required=True, help='共享内存名')
+    parser.add_argument('--slots', type=int, required=True, help='音频块数量')
+    parser.add_argument('--slot-bytes', type=int, required=True, help='每块字节数')
+    parser.add_argument('--doorbell', type=int, required=True, help='门铃管道的读取端')
+    parser.add_argument('--model', required=True, help='Vosk模型目录')
+    args = parser.parse_args()
+    
+    # stdout留给结果通道，日志输出改到stderr
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    sys.stdout = sys.stderr
+    
+    SharedVoskModel.custom_path = args.model
+    ring = SharedAudioRing.attach(args.ring, args.slots, args.slot_bytes)
+    worker = Worker(ring, args.doorbell, channel)
+    try:
+        return worker.run()
+    finally:
+        ring.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
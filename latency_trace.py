@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+识别延迟追踪（纯Python，不依赖Kivy）
+
+每个音频块和每条识别结果在各阶段打上单调时钟时间戳：
+    采集(capture) → 解码开始 → 解码结束/结果发布 → UI取出并匹配 → 翻页显示 → 下一帧渲染
+
+分阶段的耗时累积到内存中的直方图（固定桶，不随会话变长而增长），
+会话结束时输出，也可在提词界面的调试浮层中实时查看。
+
+StartupTimer记录应用冷启动各阶段（导入、构建界面、首帧）的耗时。
+"""
+
+import json
+import time
+import threading
+from collections import deque
+
+
+class LatencyHistogram:
+    """
+    固定桶的延迟直方图
+    
+    桶边界按1-2-5递增（毫秒），记录次数、总和、最大值，
+    分位数按桶上界近似
+    """
+    
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)  # 最后一个桶：超过最大边界
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def add(self, seconds):
+        """记录一次耗时（秒）"""
+        ms = seconds * 1000.0
+        bucket = 0
+        bounds = self.BOUNDS_MS
+        while bucket < len(bounds) and ms > bounds[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+    
+    @property
+    def mean_ms(self):
+        """平均耗时（毫秒）"""
+        return self.total_ms / self.count if self.count else 0.0
+    
+    def percentile(self, fraction):
+        """近似分位数（毫秒）：返回所在桶的上界（最后一个桶返回最大值）"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if bucket < len(self.BOUNDS_MS):
+                    return min(float(self.BOUNDS_MS[bucket]), self.max_ms)
+                break
+        return self.max_ms
+    
+    def to_dict(self):
+        """导出为可序列化的字典"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean_ms, 2),
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'bounds_ms': list(self.BOUNDS_MS),
+            'counts': list(self.counts),
+        }
+
+
+class ResultTrace:
+    """一条识别结果经过各阶段的时间戳（time.monotonic()秒）"""
+    
+    __slots__ = ('capture', 'decode_start', 'decode_end', 'taken', 'matched', 'shown')
+    
+    def __init__(self, capture, decode_start, decode_end):
+        self.capture = capture            # 产生该结果的音频块写入缓冲区的时间
+        self.decode_start = decode_start  # 该块开始解码
+        self.decode_end = decode_end      # 结果发布
+        self.taken = 0.0                  # UI线程取出结果
+        self.matched = 0.0                # 对齐及翻页处理完毕
+        self.shown = 0.0                  # 调用_show_current_sentence()
+
+
+class LatencyTracer:
+    """
+    分阶段延迟追踪器
+    
+    阶段：
+    - queue:   采集 → 解码开始（在缓冲区中排队）
+    - decode:  解码开始 → 解码结束（每个音频块，含预处理和静音检测）
+    - deliver: 结果发布 → UI线程取出
+    - match:   UI取出 → 对齐及翻页处理完毕
+    - render:  开始更新字幕 → 下一帧（Kivy重新渲染字幕标签）
+    - total:   采集 → 翻页后的下一帧（只统计引起翻页的结果）
+    
+    解码线程调用decoded()/result_posted()，UI线程调用take_result()及之后的方法；
+    结果按发布顺序取出，与result_queue一一对应
+    """
+    
+    STAGES = ('queue', 'decode', 'deliver', 'match', 'render', 'total')
+    
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self._pending = deque()   # 已发布、UI尚未取出的结果时间戳
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+    
+    def reset(self):
+        """清空所有统计（开始新的会话时调用）"""
+        with self._lock:
+            self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+            self._pending.clear()
+            self.started = time.monotonic()
+    
+    def record(self, stage, seconds):
+        """把一次耗时记入某阶段的直方图"""
+        if seconds >= 0:
+            self.histograms[stage].add(seconds)
+    
+    # ---- 解码线程 ----
+    def decoded(self, capture, decode_start, decode_end):
+        """一个音频块解码完成"""
+        self.record('queue', decode_start - capture)
+        self.record('decode', decode_end - decode_start)
+    
+    def result_posted(self, capture, decode_start):
+        """一条识别结果即将放入result_queue（需在放入之前调用）"""
+        trace = ResultTrace(capture, decode_start, time.monotonic())
+        with self._lock:
+            self._pending.append(trace)
+    
+    # ---- UI线程 ----
+    def take_result(self):
+        """
+        UI线程从result_queue取出一条结果后调用
+        
+        返回：
+            该结果的ResultTrace（没有对应记录时返回None）
+        """
+        with self._lock:
+            trace = self._pending.popleft() if self._pending else None
+        if trace is not None:
+            trace.taken = time.monotonic()
+            self.record('deliver', trace.taken - trace.decode_end)
+        return trace
+    
+    def matched(self, trace):
+        """该结果的对齐及翻页处理完毕"""
+        trace.matched = time.monotonic()
+        self.record('match', trace.matched - trace.taken)
+    
+    def shown(self, trace):
+        """该结果引起翻页，开始更新字幕"""
+        trace.shown = time.monotonic()
+    
+    def rendered(self, trace):
+        """翻页后的下一帧已开始（字幕已重新渲染）"""
+        now = time.monotonic()
+        self.record('render', now - trace.shown)
+        self.record('total', now - trace.capture)
+    
+    # ---- 输出 ----
+    def summary(self):
+        """
+        各阶段统计
+        
+        返回：
+            {阶段: LatencyHistogram.to_dict()}
+        """
+        return {stage: histogram.to_dict() for stage, histogram in self.histograms.items()}
+    
+    def format_overlay(self):
+        """调试浮层用的紧凑文本（每阶段一行：p50/p90/max）"""
+        lines = []
+        for stage in self.STAGES:
+            h = self.histograms[stage]
+            if h.count:
+                lines.append(f'{stage:<8} p50 {h.percentile(0.5):>5.0f}  '
+                             f'p90 {h.percentile(0.9):>5.0f}  max {h.max_ms:>6.0f} ms  n={h.count}')
+        return '\n'.join(lines) or 'latency: no data yet'
+    
+    def dump(self, path=None):
+        """
+        输出会话的延迟统计
+        
+        参数：
+            path: 同时写入的JSON文件路径（可选）
+        """
+        print("[信息] 识别延迟（毫秒）：")
+        for stage in self.STAGES:
+            h = self.histograms[stage]
+            if h.count:
+                print(f"    {stage:<8} 次数 {h.count:>6}  平均 {h.mean_ms:8.1f}  p50 ≤{h.percentile(0.5):6.0f}  "
+                      f"p90 ≤{h.percentile(0.9):6.0f}  p99 ≤{h.percentile(0.99):6.0f}  最大 {h.max_ms:8.1f}")
+        
+        if path:
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'duration_seconds': round(time.monotonic() - self.started, 1),
+                        'stages': self.summary(),
+                    }, f, indent=2)
+            except OSError as e:
+                print(f"[警告] 写入延迟统计失败: {e}")
+
+
+class StartupTimer:
+    """
+    冷启动分阶段计时
+    
+    依次调用mark(阶段名)，每个阶段的耗时是距上一个标记的时间；
+    首帧显示后调用report()输出
+    """
+    
+    def __init__(self, begin=None):
+        """
+        参数：
+            begin: 计时起点（time.perf_counter()，默认为现在）
+        """
+        self.begin = time.perf_counter() if begin is None else begin
+        self.marks = []     # [(阶段名, 结束时间)]
+    
+    def mark(self, phase, at=None):
+        """记录一个阶段结束（at默认为现在）"""
+        self.marks.append((phase, time.perf_counter() if at is None else at))
+    
+    def phases(self):
+        """
+        返回：
+            [(阶段名, 耗时毫秒)]
+        """
+        result = []
+        previous = self.begin
+        for phase, end in self.marks:
+            result.append((phase, (end - previous) * 1000.0))
+            previous = end
+        return result
+    
+    @property
+    def total_ms(self):
+        """起点到最后一个标记的总耗时（毫秒）"""
+        return (self.marks[-1][1] - self.begin) * 1000.0 if self.marks else 0.0
+    
+    def report(self, path=None):
+        """
+        输出各阶段耗时
+        
+        参数：
+            path: 同时写入的JSON文件路径（可选）
+        """
+        phases = self.phases()
+        print(f"[信息] 启动耗时 {self.total_ms:.0f}ms：" +
+              '，'.join(f"{phase} {ms:.0f}ms" for phase, ms in phases))
+        
+        if path:
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'total_ms': round(self.total_ms, 1),
+                        'phases': {phase: round(ms, 1) for phase, ms in phases},
+                    }, f, indent=2)
+            except OSError as e:
+                print(f"[警告] 写入启动耗时失败: {e}")
@@ -8,7 +8,7 @@
 功能说明：
 1. 支持英文文案输入/粘贴，自动拆分句子并提取关键词
 2. 蓝牙麦克风离线语音识别（使用Vosk引擎）
-3. 句子级关键词匹配触发字幕滚动
+3. 全文流式对齐，跟随朗读位置自动滚动字幕（支持跳读）
 4. 支持暂停/继续、滑动调节速度、调整字体大小
 5. 适配安卓平板竖屏，全程离线运行
 
@@ -28,32 +28,57 @@ import json
 import re
 import queue
 import threading
+import math
+import time
 from pathlib import Path
+from collections import OrderedDict
+
+# 冷启动计时从导入Kivy之前开始
+STARTUP_BEGIN = time.perf_counter()
 
 # Kivy配置必须在导入其他Kivy模块之前设置
 os.environ['KIVY_AUDIO'] = 'sdl2'  # 使用SDL2音频后端
 
+# 下面的Kivy模块编辑界面也要用，留在模块级导入：句子预览（SentencePreview）本身就是
+# RecycleView，而ScrollView、Label已经导入了kivy.animation和kivy.core.text，
+# 改成局部导入不会缩短冷启动。只有编辑界面不用的Popup、Slider在创建时才导入。
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
+from kivy.uix.widget import Widget
 from kivy.uix.button import Button
-from kivy.uix.slider import Slider
 from kivy.uix.textinput import TextInput
-from kivy.uix.popup import Popup
 from kivy.uix.screenmanager import ScreenManager, Screen
-from kivy.clock import Clock
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.animation import Animation
+from kivy.clock import Clock, mainthread
 from kivy.core.window import Window
-from kivy.utils import platform
+from kivy.core.text import Label as CoreLabel
+from kivy.utils import platform, escape_markup
 from kivy.properties import (
     StringProperty, 
     NumericProperty, 
-    BooleanProperty,
-    ListProperty
+    BooleanProperty
 )
 from kivy.graphics import Color, Rectangle
 from kivy.metrics import dp, sp
 
+KIVY_IMPORTED = time.perf_counter()
+
+# 项目内模块（纯Python，不依赖Kivy；Vosk和NumPy在第一次使用时才导入）
+from text_processor import TextProcessor, ScriptAligner, RecognitionWindow
+from audio_processing import VoiceActivityDetector, AudioPipeline
+from speech_engine import SharedVoskModel, VoskRecognizer
+from session_replay import SessionRecorder
+from latency_trace import LatencyTracer, StartupTimer
+from script_cache import ScriptCache
+
+STARTUP = StartupTimer(STARTUP_BEGIN)
+STARTUP.mark('import_kivy', KIVY_IMPORTED)
+STARTUP.mark('import_modules')
+
 # =============================================================================
 # 安卓平台特定导入和权限申请
 # =============================================================================
@@ -77,132 +102,6 @@ if platform == 'android':
     AudioManager = autoclass('android.media.AudioManager')
     Context = autoclass('android.content.Context')
 
-# =============================================================================
-# Vosk语音识别引擎封装类
-# =============================================================================
-# 【重要修复】Vosk是C++原生库，无法通过python-for-android直接编译
-# 当前采用"优雅降级"策略：vosk不可用时，自动切换到手动模式
-# 后续可通过vosk-android AAR包集成真正的语音识别功能
-# =============================================================================
-
-# 尝试导入Vosk（可能不可用）
-VOSK_AVAILABLE = False
-try:
-    from vosk import Model as VoskModel, KaldiRecognizer
-    VOSK_AVAILABLE = True
-    print("[信息] Vosk库加载成功")
-except ImportError:
-    print("[警告] Vosk库未安装或不可用，将使用手动模式")
-    VoskModel = None
-    KaldiRecognizer = None
-
-class VoskRecognizer:
-    """
-    Vosk离线语音识别器封装类
-    
-    功能：
-    - 自动下载/加载vosk-model-small-en-us-0.15模型
-    - 处理音频流并返回识别结果
-    - 每2-3秒更新一次识别结果
-    
-    【降级说明】
-    如果Vosk库不可用（如在Android上未正确集成），
-    load_model()会返回False，应用自动切换到手动翻页模式
-    """
-    
-    def __init__(self):
-        """初始化识别器"""
-        self.model = None           # Vosk模型对象
-        self.recognizer = None      # Vosk识别器对象
-        self.is_running = False     # 识别是否正在运行
-        self.result_queue = queue.Queue()  # 识别结果队列
-        self.audio_queue = queue.Queue()   # 音频数据队列
-        self.vosk_available = VOSK_AVAILABLE  # Vosk是否可用
-        
-    def load_model(self):
-        """
-        加载Vosk语音识别模型
-        
-        模型路径说明：
-        - 安卓：存放在应用私有目录
-        - 其他平台：存放在当前目录
-        
-        返回：
-        - True: 模型加载成功
-        - False: 模型加载失败（Vosk不可用或模型文件缺失）
-        """
-        # 【降级检查】如果Vosk库不可用，直接返回False
-        if not self.vosk_available:
-            print("[警告] Vosk库不可用，切换到手动模式")
-            return False
-            
-        try:
-            # 确定模型路径
-            if platform == 'android':
-                # 安卓平台使用应用私有存储
-                try:
-                    from android.storage import app_storage_path
-                    model_path = os.path.join(app_storage_path(), 'vosk-model-small-en-us-0.15')
-                except ImportError:
-                    # 如果android.storage不可用，使用备用路径
-                    model_path = '/data/data/org.teleprompter.teleprompter/files/vosk-model-small-en-us-0.15'
-            else:
-                # 其他平台使用当前目录
-                model_path = './vosk-model-small-en-us-0.15'
-            
-            # 检查模型是否存在
-            if not os.path.exists(model_path):
-                print(f"[警告] 模型不存在: {model_path}")
-                print("[提示] 请下载模型: https://alphacephei.com/vosk/models")
-                return False
-            
-            # 加载模型
-            print(f"[信息] 正在加载Vosk模型: {model_path}")
-            self.model = VoskModel(model_path)
-            
-            # 创建识别器，采样率16000Hz（标准语音识别采样率）
-            self.recognizer = KaldiRecognizer(self.model, 16000)
-            self.recognizer.SetWords(True)  # 启用单词级别识别
-            
-            print("[成功] Vosk模型加载完成！")
-            return True
-            
-        except Exception as e:
-            print(f"[错误] 加载模型失败: {e}")
-            return False
-    
-    def process_audio(self, audio_data):
-        """
-        处理音频数据并返回识别结果
-        
-        参数：
-            audio_data: 16位PCM音频数据（bytes）
-            
-        返回：
-            识别到的文本（如果有），否则返回None
-        """
-        if self.recognizer is None:
-            return None
-            
-        try:
-            # 将音频数据送入识别器
-            if self.recognizer.AcceptWaveform(audio_data):
-                # 获取完整识别结果
-                result = json.loads(self.recognizer.Result())
-                text = result.get('text', '').strip()
-                if text:
-                    return text
-            else:
-                # 获取部分识别结果（实时反馈）
-                partial = json.loads(self.recognizer.PartialResult())
-                text = partial.get('partial', '').strip()
-                if text:
-                    return f"[部分] {text}"
-        except Exception as e:
-            print(f"[错误] 音频处理失败: {e}")
-            
-        return None
-
 # =============================================================================
 # 音频录制类（支持蓝牙麦克风）
 # =============================================================================
@@ -214,14 +113,17 @@ class AudioRecorder:
     - 自动检测并使用蓝牙麦克风
     - 16000Hz采样率，单声道，16位深度
     - 后台线程持续录制
+    - 设备直接输出16位整数，读取缓冲区预先分配并反复使用
     """
     
-    def __init__(self, callback=None):
+    def __init__(self, callback=None, sample_rate=16000):
         """
         初始化录制器
         
         参数：
-            callback: 音频数据回调函数
+            callback: 音频数据回调函数 callback(memoryview)
+                      memoryview只在回调期间有效，需要保留时请复制
+            sample_rate: 麦克风采样率（非16000Hz时由预处理链重采样）
         """
         self.callback = callback    # 音频数据回调
         self.is_recording = False   # 是否正在录制
@@ -229,9 +131,9 @@ class AudioRecorder:
         self.thread = None          # 录制线程
         
         # 音频参数配置
-        self.sample_rate = 16000    # 采样率（Vosk推荐16000Hz）
-        self.channels = 1           # 单声道
-        self.chunk_size = 4000      # 每次读取的采样点数（约250ms）
+        self.sample_rate = sample_rate    # 采样率（Vosk推荐16000Hz）
+        self.channels = 1                 # 单声道
+        self.chunk_size = sample_rate // 4  # 每次读取的采样点数（约250ms）
         
     def start(self):
         """开始录制音频"""
@@ -295,22 +197,20 @@ class AudioRecorder:
     
     def _android_record_loop(self):
         """安卓录音循环（后台线程）"""
-        from jnius import autoclass
         import array
         
+        # 预分配读取缓冲区，循环中反复使用（不再每次创建列表和bytes）
+        buffer = array.array('h', bytes(self.chunk_size * 2))
+        view = memoryview(buffer).cast('B')
+        
         while self.is_recording and self.stream:
             try:
-                # 创建缓冲区
-                buffer = array.array('h', [0] * self.chunk_size)
-                
                 # 读取音频数据
                 read_size = self.stream.read(buffer, 0, self.chunk_size)
                 
-                if read_size > 0:
-                    # 转换为bytes并回调
-                    audio_bytes = buffer[:read_size].tobytes()
-                    if self.callback:
-                        self.callback(audio_bytes)
+                if read_size > 0 and self.callback:
+                    # 以memoryview交给回调，不复制
+                    self.callback(view[:read_size * 2])
                         
             except Exception as e:
                 print(f"[错误] 录音读取失败: {e}")
@@ -326,15 +226,14 @@ class AudioRecorder:
                 if status:
                     print(f"[警告] 音频状态: {status}")
                 if self.callback:
-                    # 转换为16位整数格式
-                    audio_data = (indata * 32767).astype('int16').tobytes()
-                    self.callback(audio_data)
+                    # 设备直接输出16位整数，以memoryview交给回调，不做转换和复制
+                    self.callback(memoryview(indata)[:frames * 2 * self.channels])
             
-            # 创建输入流
-            self.stream = sd.InputStream(
+            # 创建原始输入流（int16，不经过NumPy）
+            self.stream = sd.RawInputStream(
                 samplerate=self.sample_rate,
                 channels=self.channels,
-                dtype='float32',
+                dtype='int16',
                 blocksize=self.chunk_size,
                 callback=audio_callback
             )
@@ -368,174 +267,390 @@ class AudioRecorder:
         print("[信息] 录音已停止")
 
 # =============================================================================
-# 文本处理工具类
+# 句子预览列表（虚拟化，只为可见行创建控件）
 # =============================================================================
-class TextProcessor:
+class SentencePreviewRow(RecycleDataViewBehavior, Label):
     """
-    文本处理工具类
+    预览列表中的一行：句子序号、开头部分和前几个关键词
     
-    功能：
-    - 将文本拆分为句子
-    - 提取每句的关键词（用于匹配）
-    - 容错处理（忽略标点、大小写，容忍拼写错误）
+    行控件在滚动时循环复用，文字在行变为可见时才从文案中生成
     """
     
-    @staticmethod
-    def split_sentences(text):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.font_size = sp(14)
+        self.color = (0.5, 0.8, 0.5, 1)
+        self.halign = 'left'
+        self.valign = 'middle'
+        self.bind(size=self._update_text_size)
+    
+    def _update_text_size(self, *args):
+        """按行宽度排版"""
+        self.text_size = self.size
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """行被分配给第index句时调用"""
+        if rv.script is None:
+            self.text = rv.message
+        else:
+            sentence = rv.script[index]
+            keywords = ', '.join(sentence.keywords[:5])  # 最多显示5个关键词
+            self.text = f"{index + 1}. {sentence.text[:50]}...\n   Keywords: {keywords}"
+        return super().refresh_view_attrs(rv, index, data)
+
+class SentencePreview(RecycleView):
+    """
+    句子预览列表
+    
+    基于RecycleView：无论文案多长，只为屏幕上可见的几行创建控件和纹理，
+    预览的渲染开销与文案长度无关
+    """
+    
+    ROW_HEIGHT = 44  # 每行高度（dp），两行文字
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.script = None      # 当前预览的文案（CompiledScript）
+        self.message = ''       # 没有文案时显示的提示
+        self.viewclass = SentencePreviewRow
+        
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(self.ROW_HEIGHT)),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+    
+    def set_script(self, script, keep_scroll=False):
         """
-        将文本拆分为句子列表
+        预览一份文案
         
         参数：
-            text: 原始文本
-            
-        返回：
-            句子列表 [{"text": "原句", "keywords": ["关键词"]}]
+            script: CompiledScript（没有句子时显示提示）
+            keep_scroll: 保持当前滚动位置（边输入边更新预览时）
         """
-        if not text:
-            return []
-        
-        # 使用正则表达式按句子结束符拆分
-        # 保留句号、问号、感叹号作为分隔
-        sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-        
-        result = []
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if sentence:
-                keywords = TextProcessor.extract_keywords(sentence)
-                result.append({
-                    'text': sentence,
-                    'keywords': keywords
-                })
-        
-        return result
+        if not script:
+            self.show_message('[No sentences found]')
+            return
+        self.script = script
+        # 行数据只占位，文字在行可见时才生成
+        if len(self.data) != len(script):
+            self.data = [{} for _ in range(len(script))]
+        self.refresh_from_data()  # 行数相同时data不会触发刷新
+        if not keep_scroll:
+            self.scroll_y = 1
+    
+    def show_message(self, message):
+        """显示一行提示文字"""
+        self.script = None
+        self.message = message
+        self.data = [{}]
+        self.refresh_from_data()  # data不变时不会自动刷新
+
+# =============================================================================
+# 字幕纹理缓存（预渲染接下来的几句）
+# =============================================================================
+class SubtitleTextureCache:
+    """
+    字幕纹理缓存
+    
+    以(文字, 字号, 宽度)为键缓存排版好的纹理，按最近使用淘汰；
+    翻页时后面几句在空闲帧中逐句预渲染，翻页只需换一张纹理，
+    不必在翻页那一帧重新排版和光栅化大字号文字
+    """
+    
+    MAX_ENTRIES = 16  # 最多缓存的纹理数（72sp整屏宽的纹理每张约1-2MB显存）
+    
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._textures = OrderedDict()  # (文字, 字号, 宽度) -> Texture
+        self._pending = []              # 等待预渲染的(文字, 字号, 宽度)
+        self._prefetch_event = None
+        self.hits = 0
+        self.misses = 0
     
     @staticmethod
-    def extract_keywords(sentence):
+    def render(text, font_size, width):
+        """排版并光栅化一段文字（与原字幕标签相同的样式）"""
+        label = CoreLabel(
+            text=text,
+            font_size=font_size,
+            bold=True,
+            color=(1, 1, 1, 1),
+            halign='center',
+            valign='middle',
+            text_size=(width, None)
+        )
+        label.refresh()
+        return label.texture
+    
+    def get(self, text, font_size, width):
         """
-        从句子中提取关键词
-        
-        规则：
-        - 移除常见停用词（a, the, is, are等）
-        - 提取长度>=3的单词
-        - 转为小写便于匹配
+        取得文字的纹理，未缓存时立即渲染
         
-        参数：
-            sentence: 句子文本
-            
         返回：
-            关键词列表
+            Texture（空文字时返回None）
         """
-        # 常见英文停用词列表
-        stop_words = {
-            'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been',
-            'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
-            'would', 'could', 'should', 'may', 'might', 'must', 'shall',
-            'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in',
-            'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into',
-            'through', 'during', 'before', 'after', 'above', 'below',
-            'between', 'under', 'again', 'further', 'then', 'once',
-            'here', 'there', 'when', 'where', 'why', 'how', 'all',
-            'each', 'few', 'more', 'most', 'other', 'some', 'such',
-            'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than',
-            'too', 'very', 'just', 'and', 'but', 'if', 'or', 'because',
-            'until', 'while', 'although', 'though', 'this', 'that',
-            'these', 'those', 'it', 'its', 'i', 'you', 'he', 'she',
-            'we', 'they', 'my', 'your', 'his', 'her', 'our', 'their'
-        }
-        
-        # 提取单词（只保留字母）
-        words = re.findall(r'[a-zA-Z]+', sentence)
-        
-        # 过滤：移除停用词，保留长度>=3的单词
-        keywords = [
-            word.lower() 
-            for word in words 
-            if word.lower() not in stop_words and len(word) >= 3
-        ]
-        
-        return keywords
+        if not text:
+            return None
+        key = (text, font_size, int(width))
+        texture = self._textures.get(key)
+        if texture is not None:
+            self._textures.move_to_end(key)
+            self.hits += 1
+            return texture
+        
+        self.misses += 1
+        texture = self.render(text, font_size, key[2])
+        self._store(key, texture)
+        return texture
     
-    @staticmethod
-    def match_keywords(recognized_text, target_keywords, threshold=0.5):
+    def _store(self, key, texture):
+        self._textures[key] = texture
+        self._textures.move_to_end(key)
+        while len(self._textures) > self.max_entries:
+            self._textures.popitem(last=False)
+    
+    def prefetch(self, texts, font_size, width):
         """
-        检查识别文本是否匹配目标关键词
+        在之后的空闲帧中预渲染几段文字（每帧一段，避免单帧卡顿）
         
-        参数：
-            recognized_text: 语音识别结果
-            target_keywords: 目标句子的关键词列表
-            threshold: 匹配阈值（匹配到的关键词比例）
-            
-        返回：
-            是否匹配成功
+        新的请求取代尚未完成的旧请求
         """
-        if not target_keywords:
-            return False
-            
-        # 提取识别文本中的单词
-        recognized_words = set(
-            word.lower() 
-            for word in re.findall(r'[a-zA-Z]+', recognized_text)
-        )
-        
-        # 计算匹配的关键词数量
-        matched = sum(
-            1 for kw in target_keywords 
-            if kw in recognized_words or 
-               any(TextProcessor.fuzzy_match(kw, rw) for rw in recognized_words)
+        width = int(width)
+        self._pending = [(text, font_size, width) for text in texts
+                         if text and (text, font_size, width) not in self._textures]
+        if self._pending and self._prefetch_event is None:
+            self._prefetch_event = Clock.schedule_once(self._prefetch_next)
+    
+    def _prefetch_next(self, dt):
+        """预渲染一段，还有剩余时下一帧继续"""
+        self._prefetch_event = None
+        if not self._pending:
+            return
+        key = self._pending.pop(0)
+        if key not in self._textures:
+            self._store(key, self.render(*key))
+        if self._pending:
+            self._prefetch_event = Clock.schedule_once(self._prefetch_next)
+    
+    def clear(self):
+        """清空缓存（释放纹理）"""
+        self._pending = []
+        if self._prefetch_event is not None:
+            self._prefetch_event.cancel()
+            self._prefetch_event = None
+        self._textures.clear()
+
+class SubtitleView(Widget):
+    """
+    字幕显示区域：把缓存中的纹理居中绘制，不持有自己的文字排版
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.texture = None
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self._rect = Rectangle(size=(0, 0))
+        self.bind(pos=self._update_rect, size=self._update_rect)
+    
+    def show(self, texture):
+        """显示一张纹理（None表示清空）"""
+        self.texture = texture
+        self._rect.texture = texture
+        self._update_rect()
+    
+    def _update_rect(self, *args):
+        """纹理按原尺寸居中"""
+        texture = self.texture
+        if texture is None:
+            self._rect.size = (0, 0)
+            return
+        width, height = texture.size
+        self._rect.size = (width, height)
+        self._rect.pos = (self.center_x - width / 2, self.center_y - height / 2)
+
+# =============================================================================
+# 连续滚动的全文视图（虚拟化）
+# =============================================================================
+class ScriptRow(RecycleDataViewBehavior, Label):
+    """
+    全文视图中的一句
+    
+    已读过的句子变暗，当前句子中已读到的部分高亮；
+    行控件循环复用，只有可见的几行持有纹理
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.markup = True
+        self.halign = 'center'
+        self.valign = 'middle'
+        self.bind(size=self._update_text_size)
+    
+    def _update_text_size(self, *args):
+        """按行宽度换行"""
+        self.text_size = (self.width - dp(20), self.height)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """行被分配给第index句时调用"""
+        self.font_size = rv.row_font_size
+        self.text = rv.row_markup(index)
+        return super().refresh_view_attrs(rv, index, data)
+
+class ScriptScrollView(RecycleView):
+    """
+    连续滚动的全文视图
+    
+    - 基于RecycleView，几千句的文案也只为可见行创建控件和纹理
+    - 行高按字数估算（不逐句排版测量），切换句子时用动画平滑滚动
+    - 当前句子显示在视图上方约三分之一处，已读到的单词高亮
+    """
+    
+    ANCHOR = 0.3            # 当前句子在视图中的位置（距顶部的比例）
+    SCROLL_DURATION = 0.35  # 滚动动画时长（秒）
+    
+    SPOKEN_COLOR = 'ffd54f'     # 当前句已读部分
+    CURRENT_COLOR = 'ffffff'    # 当前句未读部分
+    UPCOMING_COLOR = 'a0a0a8'   # 后面的句子
+    DONE_COLOR = '5a5a60'       # 已读过的句子
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.script = None          # CompiledScript
+        self.current = 0            # 当前句子索引
+        self.spoken = 0             # 当前句子已读到的关键词个数
+        self.row_font_size = sp(36)
+        self._offsets = [0.0]       # 每行顶部到全文顶部的距离（前缀和），末项为总高度
+        self._layout_width = 0
+        self.viewclass = ScriptRow
+        self.do_scroll_x = False
+        
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(60)),
+            default_size_hint=(1, None),
+            key_size='size',
+            size_hint_y=None
         )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.bind(width=self._on_width)
+    
+    def set_script(self, script, font_size):
+        """
+        显示一份文案
         
-        # 计算匹配率
-        match_ratio = matched / len(target_keywords)
+        参数：
+            script: CompiledScript
+            font_size: 字体大小（像素）
+        """
+        self.script = script
+        self.row_font_size = font_size
+        self.current = 0
+        self.spoken = 0
+        self._relayout()
+        self.scroll_to(0, animate=False)
+    
+    def set_font_size(self, font_size):
+        """修改字体大小（重新估算行高）"""
+        if font_size == self.row_font_size:
+            return
+        self.row_font_size = font_size
+        self._relayout()
+        self.scroll_to(self.current, animate=False)
+    
+    def _on_width(self, *args):
+        """宽度变化时重新估算行高"""
+        if self.script is not None and abs(self.width - self._layout_width) > 1:
+            self._relayout()
+            self.scroll_to(self.current, animate=False)
+    
+    def _row_height(self, text, width):
+        """按字数估算一句排版后的高度（平均字宽约为字号的0.5倍）"""
+        font_size = self.row_font_size
+        chars_per_line = max(1, int((width - dp(20)) / (font_size * 0.5)))
+        lines = max(1, math.ceil(len(text) * 1.1 / chars_per_line))
+        return lines * font_size * 1.25 + dp(24)
+    
+    def _relayout(self):
+        """重新计算每行高度和位置"""
+        script = self.script
+        if script is None:
+            self.data = []
+            return
         
-        return match_ratio >= threshold
+        width = self.width if self.width > 100 else Window.width
+        self._layout_width = self.width
+        data = []
+        offsets = [0.0]
+        total = 0.0
+        for sentence in script:
+            height = self._row_height(sentence.text, width)
+            data.append({'size': (None, height)})
+            total += height
+            offsets.append(total)
+        self._offsets = offsets
+        self.data = data
+        self.refresh_from_data()
     
-    @staticmethod
-    def fuzzy_match(word1, word2, max_distance=2):
+    def row_markup(self, index):
+        """生成第index句的显示文本（带颜色标记）"""
+        text = self.script[index].text
+        if index < self.current:
+            return f'[color={self.DONE_COLOR}]{escape_markup(text)}[/color]'
+        if index > self.current:
+            return f'[color={self.UPCOMING_COLOR}]{escape_markup(text)}[/color]'
+        
+        split = 0
+        if self.spoken:
+            ends = TextProcessor.keyword_ends(text)
+            split = ends[min(self.spoken, len(ends)) - 1] if ends else 0
+        return (f'[b][color={self.SPOKEN_COLOR}]{escape_markup(text[:split])}[/color]'
+                f'[color={self.CURRENT_COLOR}]{escape_markup(text[split:])}[/color][/b]')
+    
+    def set_current(self, index, spoken=0):
         """
-        模糊匹配两个单词（容忍拼写错误）
+        更新当前句子和已读进度
         
-        使用编辑距离算法，允许最多max_distance个字符的差异
+        句子变化时平滑滚动；只有已读进度变化时只重绘可见行
         
         参数：
-            word1, word2: 待比较的单词
-            max_distance: 最大允许编辑距离
-            
-        返回：
-            是否匹配
+            index: 当前句子索引
+            spoken: 当前句子已读到的关键词个数
         """
-        if abs(len(word1) - len(word2)) > max_distance:
-            return False
-            
-        # 简化的编辑距离计算
-        if len(word1) < 4 or len(word2) < 4:
-            # 短单词要求完全匹配
-            return word1 == word2
-        
-        # 计算编辑距离
-        distance = TextProcessor._edit_distance(word1, word2)
-        return distance <= max_distance
+        if self.script is None:
+            return
+        moved = index != self.current
+        if not moved and spoken == self.spoken:
+            return
+        self.current = index
+        self.spoken = spoken
+        self.refresh_from_data()
+        if moved:
+            self.scroll_to(index)
     
-    @staticmethod
-    def _edit_distance(s1, s2):
-        """计算两个字符串的编辑距离（Levenshtein距离）"""
-        if len(s1) < len(s2):
-            return TextProcessor._edit_distance(s2, s1)
-        
-        if len(s2) == 0:
-            return len(s1)
-        
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-        
-        return previous_row[-1]
+    def scroll_to(self, index, animate=True):
+        """把第index句滚动到视图上方约三分之一处"""
+        if self.script is None or not self._offsets:
+            return
+        total = self._offsets[-1]
+        viewport = self.height
+        if total <= viewport:
+            target = 1.0
+        else:
+            index = max(0, min(index, len(self._offsets) - 2))
+            top = self._offsets[index] - viewport * self.ANCHOR
+            target = 1.0 - max(0.0, min(1.0, top / (total - viewport)))
+        
+        Animation.cancel_all(self, 'scroll_y')
+        if animate:
+            Animation(scroll_y=target, d=self.SCROLL_DURATION, t='out_cubic').start(self)
+        else:
+            self.scroll_y = target
 
 # =============================================================================
 # 文本输入界面（Screen 1）
@@ -550,9 +665,14 @@ class TextInputScreen(Screen):
     - 跳转到提词界面
     """
     
+    LIVE_PARSE_DELAY = 0.4  # 停止输入多久后更新预览（秒）
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = 'input'
+        self.live_script = None  # 编辑器内容的实时解析结果（CompiledScript）
+        # 输入时不逐键解析，停顿后只重新拆分编辑位置附近的句子
+        self._live_trigger = Clock.create_trigger(self._live_parse, self.LIVE_PARSE_DELAY)
         self._build_ui()
     
     def _build_ui(self):
@@ -587,6 +707,20 @@ class TextInputScreen(Screen):
         )
         layout.add_widget(hint)
         
+        # 语音模型加载状态
+        self.model_label = Label(
+            text='',
+            font_size=sp(12),
+            size_hint_y=None,
+            height=dp(20),
+            color=(0.5, 0.6, 0.7, 1)
+        )
+        app = App.get_running_app()
+        if app is not None:
+            self.model_label.text = app.model_status
+            app.bind(model_status=self.model_label.setter('text'))
+        layout.add_widget(self.model_label)
+        
         # 文本输入框
         self.text_input = TextInput(
             hint_text='Enter your English script here...\n\nExample:\nWelcome to our channel. Today we will discuss something important. Please subscribe and like this video.',
@@ -598,6 +732,7 @@ class TextInputScreen(Screen):
             padding=[dp(15), dp(15), dp(15), dp(15)],
             multiline=True
         )
+        self.text_input.bind(text=self._on_text_change)
         layout.add_widget(self.text_input)
         
         # 句子预览区域
@@ -610,20 +745,10 @@ class TextInputScreen(Screen):
         )
         layout.add_widget(preview_label)
         
-        # 预览滚动区
-        preview_scroll = ScrollView(size_hint_y=0.2)
-        self.preview_text = Label(
-            text='[Sentences will appear here after parsing]',
-            font_size=sp(14),
-            size_hint_y=None,
-            color=(0.5, 0.8, 0.5, 1),
-            text_size=(None, None),
-            halign='left',
-            valign='top'
-        )
-        self.preview_text.bind(texture_size=self._update_preview_size)
-        preview_scroll.add_widget(self.preview_text)
-        layout.add_widget(preview_scroll)
+        # 预览列表（虚拟化，长文案也只渲染可见行）
+        self.preview_list = SentencePreview(size_hint_y=0.2)
+        self.preview_list.show_message('[Sentences will appear here after parsing]')
+        layout.add_widget(self.preview_list)
         
         # 按钮区域
         btn_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(60), spacing=dp(15))
@@ -656,38 +781,53 @@ class TextInputScreen(Screen):
         self.rect.size = self.children[0].size
         self.rect.pos = self.children[0].pos
     
-    def _update_preview_size(self, *args):
-        """更新预览文本大小"""
-        self.preview_text.height = self.preview_text.texture_size[1]
-        self.preview_text.text_size = (self.preview_text.width, None)
+    def _on_text_change(self, *args):
+        """文本变化：重新开始计时，停止输入后再更新预览"""
+        self._live_trigger.cancel()
+        self._live_trigger()
+    
+    def _live_parse(self, *args):
+        """
+        实时更新解析结果和预览
+        
+        在上一次的结果上增量解析：只重新拆分编辑位置附近的句子，
+        长文案每次停顿的开销与编辑范围有关，而不是与全文长度有关
+        """
+        self._live_trigger.cancel()
+        text = self.text_input.text.strip()
+        if not text:
+            self.live_script = None
+            self.preview_list.show_message('[Sentences will appear here after parsing]')
+            return
+        
+        if self.live_script is None:
+            self.live_script = TextProcessor.compile_script(text)
+        else:
+            self.live_script = self.live_script.reparse(text)
+        self.preview_list.set_script(self.live_script, keep_scroll=True)
     
     def _on_parse(self, *args):
         """解析文本"""
         text = self.text_input.text.strip()
         if not text:
-            self.preview_text.text = '[Please enter some text first]'
+            self.preview_list.show_message('[Please enter some text first]')
             return
         
-        # 拆分句子
-        sentences = TextProcessor.split_sentences(text)
-        
-        # 显示预览
-        preview_lines = []
-        for i, sent in enumerate(sentences, 1):
-            keywords_str = ', '.join(sent['keywords'][:5])  # 最多显示5个关键词
-            preview_lines.append(f"{i}. {sent['text'][:50]}...")
-            preview_lines.append(f"   Keywords: {keywords_str}")
-        
-        self.preview_text.text = '\n'.join(preview_lines) or '[No sentences found]'
+        # 拆分句子（编译为紧凑的文案对象；同一文案直接从缓存读取，
+        # 未缓存时沿用编辑器的实时解析结果）
+        self._live_parse()
+        app = App.get_running_app()
+        sentences = app.load_script(text, self.live_script)
         
-        # 保存解析结果到App
-        App.get_running_app().sentences = sentences
+        # 显示预览（列表只渲染可见行）
+        self.preview_list.set_script(sentences)
     
     def _on_start(self, *args):
         """开始提词"""
         text = self.text_input.text.strip()
         if not text:
             # 显示提示
+            from kivy.uix.popup import Popup
             popup = Popup(
                 title='Notice',
                 content=Label(text='Please enter some text first!'),
@@ -696,11 +836,12 @@ class TextInputScreen(Screen):
             popup.open()
             return
         
-        # 确保文本已解析
-        sentences = TextProcessor.split_sentences(text)
-        App.get_running_app().sentences = sentences
+        # 确保文本已解析（刚点过Parse时直接复用内存中的结果）
+        self._live_parse()
+        App.get_running_app().load_script(text, self.live_script)
         
-        # 切换到提词界面
+        # 切换到提词界面（首次使用时创建）
+        App.get_running_app().get_teleprompter()
         self.manager.current = 'teleprompter'
 
 # =============================================================================
@@ -723,6 +864,19 @@ class TeleprompterScreen(Screen):
     is_paused = BooleanProperty(False)     # 是否暂停
     font_size = NumericProperty(36)        # 字体大小
     recognition_text = StringProperty('')  # 识别结果显示
+    use_partial_results = BooleanProperty(True)  # 是否用部分识别结果提前翻页
+    use_grammar = BooleanProperty(False)         # 是否用文案词表限制识别范围
+    use_vad = BooleanProperty(True)              # 是否跳过静音（不送入解码器）
+    use_preprocessing = BooleanProperty(False)   # 是否启用高通滤波和自动增益（需要NumPy；输入质量差时开启）
+    input_sample_rate = NumericProperty(16000)   # 麦克风采样率（蓝牙SCO耳机常为8000）
+    record_session = BooleanProperty(False)      # 是否录制原始音频和识别事件（用于离线回放）
+    trace_latency = BooleanProperty(True)        # 是否追踪各阶段识别延迟（会话结束时输出）
+    show_latency_overlay = BooleanProperty(False) # 是否显示延迟调试浮层
+    scroll_mode = BooleanProperty(False)         # 是否以连续滚动的全文视图显示
+    decode_in_process = BooleanProperty(False)   # 是否在独立进程中解码（桌面平台；不支持时使用解码线程）
+    
+    PREFETCH_SENTENCES = 3  # 预渲染当前句之后的句数
+    FONT_DEBOUNCE = 0.15    # 字体滑块停止拖动多久后才重新渲染（秒）
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -731,7 +885,20 @@ class TeleprompterScreen(Screen):
         # 语音识别相关
         self.recognizer = VoskRecognizer()
         self.recorder = None
-        self.recognition_buffer = []  # 识别结果缓冲
+        self.session_recorder = None  # 会话录制器（record_session为True时创建）
+        self.tracer = LatencyTracer()  # 分阶段延迟追踪
+        self._trace = None             # 正在处理的识别结果的时间戳
+        
+        # 解码线程产生新结果时触发，在UI线程的下一帧处理（多条结果合并为一次）
+        self._result_trigger = Clock.create_trigger(self._process_recognition)
+        self.recognizer.on_result = self._result_trigger
+        self.recognition_window = RecognitionWindow()  # 最近识别的单词（定长窗口）
+        self.aligner = None           # 全文流式对齐器
+        
+        # 字幕纹理缓存：翻页时换纹理，不在翻页那一帧重新光栅化
+        self.subtitle_cache = SubtitleTextureCache()
+        # 拖动字体滑块时只在停下后应用一次字号，不为每个中间值重新渲染
+        self._font_trigger = Clock.create_trigger(self._apply_font_size, self.FONT_DEBOUNCE)
         
         self._build_ui()
     
@@ -782,22 +949,34 @@ class TeleprompterScreen(Screen):
         
         layout.add_widget(top_bar)
         
-        # 主字幕显示区域
-        subtitle_container = BoxLayout(orientation='vertical', size_hint_y=0.5)
-        
-        # 当前句子标签（大字体、居中）
-        self.subtitle_label = Label(
-            text='Ready to start...',
-            font_size=sp(self.font_size),
-            color=(1, 1, 1, 1),
+        # 延迟调试浮层（show_latency_overlay为True时显示）
+        self.latency_label = Label(
+            text='',
+            font_size=sp(11),
+            size_hint_y=None,
+            height=0,
+            opacity=0,
+            color=(0.9, 0.8, 0.3, 1),
             text_size=(Window.width - dp(40), None),
-            halign='center',
-            valign='middle',
-            bold=True
+            halign='left'
         )
+        self.bind(show_latency_overlay=self._update_latency_visibility)
+        layout.add_widget(self.latency_label)
+        
+        # 主字幕显示区域（单句模式显示subtitle_view，滚动模式显示script_view）
+        self.subtitle_container = subtitle_container = BoxLayout(orientation='vertical', size_hint_y=0.5)
+        
+        # 当前句子（大字体、居中，纹理来自subtitle_cache）
+        self.subtitle_view = SubtitleView()
+        self.subtitle_view.bind(width=self._update_subtitle)
         self.bind(current_sentence=self._update_subtitle)
         self.bind(font_size=self._update_font_size)
-        subtitle_container.add_widget(self.subtitle_label)
+        subtitle_container.add_widget(self.subtitle_view)
+        self.current_sentence = 'Ready to start...'
+        
+        # 连续滚动的全文视图（切换到滚动模式时才放入布局）
+        self.script_view = ScriptScrollView()
+        self.bind(scroll_mode=self._update_scroll_mode)
         
         layout.add_widget(subtitle_container)
         
@@ -846,6 +1025,7 @@ class TeleprompterScreen(Screen):
         controls = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(120), spacing=dp(5))
         
         # 字体大小滑块
+        from kivy.uix.slider import Slider
         font_row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(50))
         font_label = Label(
             text='Font Size:',
@@ -894,6 +1074,17 @@ class TeleprompterScreen(Screen):
         next_btn.bind(on_press=self._next_sentence)
         manual_row.add_widget(next_btn)
         
+        # 单句/滚动模式切换
+        self.mode_btn = Button(
+            text='☰ Scroll',
+            font_size=sp(16),
+            size_hint_x=0.6,
+            background_color=(0.3, 0.5, 0.7, 1),
+            background_normal=''
+        )
+        self.mode_btn.bind(on_press=self._toggle_scroll_mode)
+        manual_row.add_widget(self.mode_btn)
+        
         controls.add_widget(manual_row)
         layout.add_widget(controls)
         
@@ -904,13 +1095,76 @@ class TeleprompterScreen(Screen):
         self.rect.size = self.children[0].size
         self.rect.pos = self.children[0].pos
     
+    def _subtitle_width(self):
+        """字幕排版宽度（布局完成前按窗口宽度估计）"""
+        width = self.subtitle_view.width
+        return width - dp(10) if width > 100 else Window.width - dp(40)
+    
     def _update_subtitle(self, *args):
-        """更新字幕显示"""
-        self.subtitle_label.text = self.current_sentence
+        """更新字幕显示（命中缓存时只是换一张纹理）"""
+        texture = self.subtitle_cache.get(self.current_sentence, sp(self.font_size), self._subtitle_width())
+        self.subtitle_view.show(texture)
+    
+    def _prefetch_subtitles(self):
+        """在空闲帧中预渲染接下来的几句"""
+        sentences = getattr(App.get_running_app(), 'sentences', None)
+        if not sentences or self.scroll_mode:
+            return
+        start = self.current_index + 1
+        end = min(len(sentences), start + self.PREFETCH_SENTENCES)
+        texts = [sentences[i]['text'] for i in range(start, end)]
+        self.subtitle_cache.prefetch(texts, sp(self.font_size), self._subtitle_width())
     
     def _update_font_size(self, *args):
-        """更新字体大小"""
-        self.subtitle_label.font_size = sp(self.font_size)
+        """更新字体大小（旧字号的纹理不再使用，清空缓存）"""
+        self.subtitle_cache.clear()
+        self._update_subtitle()
+        self._prefetch_subtitles()
+        self.script_view.set_font_size(sp(self.font_size))
+    
+    def _toggle_scroll_mode(self, *args):
+        """切换单句/滚动模式"""
+        self.scroll_mode = not self.scroll_mode
+    
+    def _update_scroll_mode(self, *args):
+        """在字幕区域中换入单句标签或全文视图"""
+        container = self.subtitle_container
+        container.clear_widgets()
+        if self.scroll_mode:
+            container.add_widget(self.script_view)
+            self.mode_btn.text = '▭ Single'
+            self.next_label.opacity = 0
+            app = App.get_running_app()
+            sentences = getattr(app, 'sentences', None)
+            if sentences:
+                if self.script_view.script is not sentences:
+                    self.script_view.set_script(sentences, sp(self.font_size))
+                self._update_script_view()
+                self.script_view.scroll_to(self.script_view.current, animate=False)
+        else:
+            container.add_widget(self.subtitle_view)
+            self.mode_btn.text = '☰ Scroll'
+            self.next_label.opacity = 1
+    
+    def _update_script_view(self):
+        """滚动模式下同步当前句子和已读进度（句子未变时只更新高亮）"""
+        if not self.scroll_mode or self.script_view.script is None:
+            return
+        spoken = self.aligner.spoken_count(self.current_index) if self.aligner is not None else 0
+        self.script_view.set_current(self.current_index, spoken)
+    
+    def _update_latency_visibility(self, *args):
+        """显示/隐藏延迟调试浮层"""
+        visible = self.show_latency_overlay
+        self.latency_label.height = dp(90) if visible else 0
+        self.latency_label.opacity = 1 if visible else 0
+        Clock.unschedule(self._update_latency_overlay)
+        if visible and self.recognizer.tracer is not None:
+            Clock.schedule_interval(self._update_latency_overlay, 1.0)
+    
+    def _update_latency_overlay(self, dt):
+        """刷新延迟调试浮层"""
+        self.latency_label.text = self.tracer.format_overlay()
     
     def _update_rec_text(self, *args):
         """更新识别文本显示"""
@@ -925,6 +1179,11 @@ class TeleprompterScreen(Screen):
         # 获取句子列表
         app = App.get_running_app()
         if hasattr(app, 'sentences') and app.sentences:
+            # 为当前文案创建全文对齐器
+            self.aligner = ScriptAligner(app.sentences, index=app.keyword_index)
+            self.recognition_window.clear()
+            if self.scroll_mode:
+                self.script_view.set_script(app.sentences, sp(self.font_size))
             self._show_current_sentence()
             
             # 启动语音识别
@@ -935,9 +1194,17 @@ class TeleprompterScreen(Screen):
     def on_leave(self):
         """离开界面时调用"""
         self._stop_recognition()
+        self._font_trigger.cancel()
+        self.subtitle_cache.clear()
     
     def _show_current_sentence(self):
         """显示当前句子"""
+        trace = self._trace
+        if trace is not None:
+            # 由识别结果引起的翻页：记录时间，下一帧（字幕已重新渲染）时结束计时
+            self.tracer.shown(trace)
+            Clock.schedule_once(lambda dt: self.tracer.rendered(trace))
+        
         app = App.get_running_app()
         sentences = getattr(app, 'sentences', [])
         
@@ -954,79 +1221,274 @@ class TeleprompterScreen(Screen):
         else:
             self.current_sentence = 'End of script!'
             self.next_label.text = ''
+        
+        self._prefetch_subtitles()
+        self._update_script_view()
     
     def _start_recognition(self):
         """启动语音识别"""
-        # 加载Vosk模型
+        self._select_recognizer()
+        
+        # 上次停止时解码线程可能还在Vosk中解码：等它退出后才能修改识别器
+        if not self.recognizer.wait_stopped():
+            self.recognition_text = '[Decoder busy - tap Start again]'
+            return
+        
+        # 工作进程模式：模型在工作进程中加载
+        if self.recognizer.out_of_process and not self.recognizer.model:
+            if not self.recognizer.load_model():
+                self.recognition_text = '[Model not loaded - Manual mode]'
+                return
+        
+        # 从共享模型创建识别器；模型还在后台加载时，等加载完成再启动
         if not self.recognizer.model:
+            status = SharedVoskModel.status
+            if status == 'unavailable':
+                self.recognition_text = '[Model not loaded - Manual mode]'
+                return
+            if status != 'ready':
+                self.recognition_text = '[Loading speech model...]'
+                SharedVoskModel.load_async()
+                SharedVoskModel.add_listener(self._on_model_status)
+                return
+            
             model_loaded = self.recognizer.load_model()
             if not model_loaded:
                 self.recognition_text = '[Model not loaded - Manual mode]'
                 return
         
-        # 创建录音器
-        self.recorder = AudioRecorder(callback=self._on_audio_data)
-        self.recorder.start()
+        # 预处理：非16kHz输入重采样到16kHz；开启use_preprocessing时再去直流、自动增益，
+        # 干净的16kHz输入不经过预处理链，音频原样送入解码器
+        sample_rate = int(self.input_sample_rate)
+        if self.use_preprocessing or sample_rate != 16000:
+            self.recognizer.pipeline = AudioPipeline.default(
+                sample_rate, enhance=self.use_preprocessing)
+        else:
+            self.recognizer.pipeline = None
+        if self.recognizer.pipeline is None and sample_rate != 16000:
+            # 没有预处理链就无法重采样，只能按16kHz录音
+            print(f"[警告] 无法重采样{sample_rate}Hz音频，改用16000Hz录音")
+            sample_rate = 16000
+        
+        # 静音检测：长时间停顿时不占用解码器CPU
+        if self.use_vad and self.recognizer.vad is None:
+            self.recognizer.vad = VoiceActivityDetector()
+        elif not self.use_vad:
+            self.recognizer.vad = None
+        
+        # 按当前文案选择识别器（文案语法识别器按文案哈希缓存）
+        self.recognizer.use_grammar = self.use_grammar
+        self.recognizer.set_script(App.get_running_app().sentences)
+        
+        # 会话录制：原始音频和识别事件写入应用数据目录
+        if self.record_session:
+            app = App.get_running_app()
+            self.session_recorder = SessionRecorder(
+                os.path.join(app.user_data_dir, 'sessions'), sample_rate=sample_rate)
+            self.session_recorder.start(app.sentences)
+            self.recognizer.on_speech_start = lambda: self._log_event('speech_start')
+        
+        # 延迟追踪：每个音频块和识别结果在各阶段打时间戳
+        if self.trace_latency:
+            self.tracer.reset()
+            self.recognizer.tracer = self.tracer
+            self._update_latency_visibility()
+        else:
+            self.recognizer.tracer = None
         
-        # 启动识别结果处理定时器（每2秒检查一次）
-        Clock.schedule_interval(self._process_recognition, 2.0)
+        # 启动解码线程，再创建录音器（录音回调只负责入队）
+        if not self.recognizer.start():
+            self.recognition_text = '[Decoder busy - tap Start again]'
+            return
+        self.recorder = AudioRecorder(callback=self._on_audio_data, sample_rate=sample_rate)
+        self.recorder.start()
         
         self.recognition_text = 'Listening... (Bluetooth Mic)'
     
+    def _select_recognizer(self):
+        """按decode_in_process选择解码线程或工作进程模式的识别器"""
+        use_process = False
+        if self.decode_in_process:
+            from decode_worker import ProcessVoskRecognizer  # 只在需要时导入
+            use_process = ProcessVoskRecognizer.supported()
+            if not use_process:
+                print("[提示] 当前平台不支持独立进程解码，使用解码线程")
+        if use_process == self.recognizer.out_of_process:
+            return
+        
+        if self.recognizer.out_of_process:
+            self.recognizer.close()
+        if use_process:
+            recognizer = ProcessVoskRecognizer()
+            recognizer.on_status = self._on_decoder_status
+        else:
+            recognizer = VoskRecognizer()
+        recognizer.on_result = self._result_trigger
+        self.recognizer = recognizer
+    
+    @mainthread
+    def _on_decoder_status(self, status, message):
+        """解码进程状态变化（切回UI线程执行）"""
+        if not self.recognizer.is_running:
+            return
+        if status == 'loading':
+            self.recognition_text = '[Starting decoder...]'
+        elif status == 'ready':
+            self.recognition_text = 'Listening... (Bluetooth Mic)'
+        elif status == 'restarting':
+            self.recognition_text = '[Decoder crashed - restarting...]'
+        elif status == 'failed':
+            self.recognition_text = '[Decoder failed - Manual mode]'
+    
+    @mainthread
+    def _on_model_status(self, status, message):
+        """共享模型加载状态变化（切回UI线程执行）"""
+        if status in ('idle', 'loading'):
+            return
+        
+        SharedVoskModel.remove_listener(self._on_model_status)
+        # 已离开提词界面或已在识别，不再启动
+        if self.manager is None or self.manager.current != self.name or self.recorder:
+            return
+        
+        if status == 'ready':
+            self._start_recognition()
+        else:
+            self.recognition_text = '[Model not loaded - Manual mode]'
+    
     def _stop_recognition(self):
         """停止语音识别"""
+        SharedVoskModel.remove_listener(self._on_model_status)
         if self.recorder:
             self.recorder.stop()
             self.recorder = None
         
-        Clock.unschedule(self._process_recognition)
+        self.recognizer.stop()
+        self._result_trigger.cancel()
+        
+        # 输出本次会话的延迟统计
+        Clock.unschedule(self._update_latency_overlay)
+        if self.recognizer.tracer is not None:
+            self.recognizer.tracer = None
+            self._trace = None
+            path = os.path.join(App.get_running_app().user_data_dir, 'latency-last.json')
+            self.tracer.dump(path)
+        
+        if self.session_recorder:
+            self.session_recorder.stop()
+            self.session_recorder = None
+            self.recognizer.on_speech_start = None
+    
+    def _log_event(self, event, **fields):
+        """录制会话时记录一条事件（未录制时忽略）"""
+        session_recorder = self.session_recorder
+        if session_recorder is not None:
+            session_recorder.log_event(event, **fields)
     
     def _on_audio_data(self, audio_data):
         """
-        音频数据回调
+        音频数据回调（录音线程）
+        
+        只把音频复制进解码缓冲区，解码在独立线程中进行
         
         参数：
-            audio_data: PCM音频数据
+            audio_data: PCM音频数据（memoryview，只在回调期间有效）
         """
         if self.is_paused:
             return
-            
-        # 处理音频并获取识别结果
-        result = self.recognizer.process_audio(audio_data)
         
-        if result and not result.startswith('[部分]'):
-            # 将完整识别结果加入缓冲
-            self.recognition_buffer.append(result)
+        if self.session_recorder is not None:
+            self.session_recorder.write_audio(audio_data)
+        self.recognizer.feed(audio_data)
+    
+    def _process_recognition(self, *args):
+        """
+        处理识别结果（事件驱动）
+        
+        解码线程每产生一条结果就触发一次，在下一帧的UI线程中执行，
+        逐条取出结果并立即匹配，不再等待定时轮询
+        """
+        prefix = VoskRecognizer.PARTIAL_PREFIX
+        tracer = self.recognizer.tracer
+        while True:
+            try:
+                result = self.recognizer.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            # 每条结果都要取出对应的时间戳（包括暂停时丢弃的），保持一一对应
+            trace = tracer.take_result() if tracer is not None else None
+            if self.is_paused:
+                continue
+            
+            self._trace = trace
+            try:
+                if result.startswith(prefix):
+                    text = result[len(prefix):].strip()
+                    self._log_event('partial', text=text)
+                    if self.use_partial_results:
+                        self._match_partial(text)
+                else:
+                    self._log_event('final', text=result)
+                    self._match_result(result)
+            finally:
+                self._trace = None
+            if trace is not None:
+                tracer.matched(trace)
     
-    def _process_recognition(self, dt):
+    def _match_partial(self, text):
         """
-        处理识别结果（定时器回调）
+        用部分识别结果提前翻页（一句话尚未说完）
+        
+        对齐器内置迟滞：候选句子需连续多次一致才前进，且一句话内不回退；
+        最终结果到达后由_match_result()修正位置
         
-        每2-3秒执行一次，检查缓冲区的识别结果
-        如果匹配当前句子的关键词，触发滚动
+        参数：
+            text: 部分识别结果文本
         """
-        if self.is_paused or not self.recognition_buffer:
+        self.recognition_text = self.recognition_window.preview(text)  # 只显示最后100个字符
+        
+        if self.aligner is None:
             return
         
-        # 合并缓冲区的识别结果
-        combined_text = ' '.join(self.recognition_buffer)
-        self.recognition_text = combined_text[-100:]  # 只显示最后100个字符
+        target_index = self.aligner.feed_partial(text)
+        if target_index != self.current_index:
+            print(f"[匹配] 部分结果对齐到第{target_index + 1}句")
+            self._log_event('advance', sentence=target_index + 1, source='partial')
+            self.current_index = target_index
+            self._show_current_sentence()
+        else:
+            self._update_script_view()
+    
+    def _match_result(self, text):
+        """
+        把一条完整识别结果送入全文对齐器
         
-        # 获取当前句子的关键词
-        app = App.get_running_app()
-        sentences = getattr(app, 'sentences', [])
+        对齐位置所在的句子变化时，直接跳转到该句；
+        如果之前用部分结果提前翻过页，以最终结果为准修正位置
         
-        if 0 <= self.current_index < len(sentences):
-            current_keywords = sentences[self.current_index]['keywords']
+        参数：
+            text: 识别结果文本
+        """
+        # 将完整识别结果加入窗口（只保留最近的单词，开销与窗口大小有关）
+        self.recognition_window.add_text(text)
+        self.recognition_text = self.recognition_window.text  # 只显示最后100个字符
+        
+        if self.aligner is None:
+            return
+        
+        target_index = self.aligner.feed_text(text)
+        
+        if target_index != self.current_index:
+            # 对齐位置所在句子变化，直接跳转（可一次前进多句）
+            print(f"[匹配] 对齐到第{target_index + 1}句")
+            self._log_event('advance', sentence=target_index + 1, source='final')
+            self.current_index = target_index
+            self._show_current_sentence()
             
-            # 检查是否匹配
-            if TextProcessor.match_keywords(combined_text, current_keywords, threshold=0.4):
-                # 匹配成功，滚动到下一句
-                print(f"[匹配] 关键词匹配成功，滚动到下一句")
-                self._next_sentence()
-                
-                # 清空缓冲区
-                self.recognition_buffer = []
+            # 清空窗口
+            self.recognition_window.clear()
+        else:
+            self._update_script_view()
     
     def _toggle_pause(self, *args):
         """切换暂停状态"""
@@ -1036,22 +1498,29 @@ class TeleprompterScreen(Screen):
             self.pause_btn.text = '▶ Resume'
             self.pause_btn.background_color = (0.3, 0.7, 0.4, 1)
             self.recognition_text = '[PAUSED]'
+            self._log_event('pause')
         else:
             self.pause_btn.text = '⏸ Pause'
             self.pause_btn.background_color = (0.8, 0.6, 0.2, 1)
             self.recognition_text = 'Listening...'
+            self._log_event('resume')
     
     def _on_font_change(self, slider, value):
-        """字体大小滑块变化"""
-        self.font_size = int(value)
+        """字体大小滑块变化（数值立即显示，字号在停止拖动后才应用）"""
         self.font_value.text = str(int(value))
+        self._font_trigger.cancel()
+        self._font_trigger()
+    
+    def _apply_font_size(self, *args):
+        """应用字体滑块的最终数值"""
+        self.font_size = int(self.font_slider.value)
     
     def _prev_sentence(self, *args):
         """上一句"""
         if self.current_index > 0:
             self.current_index -= 1
             self._show_current_sentence()
-            self.recognition_buffer = []
+            self._sync_aligner()
     
     def _next_sentence(self, *args):
         """下一句"""
@@ -1061,7 +1530,15 @@ class TeleprompterScreen(Screen):
         if self.current_index < len(sentences) - 1:
             self.current_index += 1
             self._show_current_sentence()
-            self.recognition_buffer = []
+            self._sync_aligner()
+    
+    def _sync_aligner(self):
+        """手动翻页后，让对齐器从当前句子重新开始跟踪"""
+        self._log_event('manual', sentence=self.current_index + 1)
+        self.recognition_window.clear()
+        if self.aligner is not None:
+            self.aligner.seek(self.current_index)
+        self._update_script_view()
     
     def _on_back(self, *args):
         """返回上一界面"""
@@ -1082,6 +1559,15 @@ class TeleprompterApp(App):
     # 存储解析后的句子
     sentences = []
     
+    # 句子的关键词倒排索引（用于全文重新定位）
+    keyword_index = None
+    
+    # 语音模型加载状态（显示在文本输入界面）
+    model_status = StringProperty('Speech model: waiting...')
+    
+    # 文案解析结果缓存（应用数据目录，按文案哈希保存）
+    script_cache = None
+    
     def build(self):
         """构建应用界面"""
         # 设置窗口标题
@@ -1091,11 +1577,11 @@ class TeleprompterApp(App):
         if platform != 'android':
             Window.size = (400, 700)  # 模拟平板竖屏
         
-        # 创建屏幕管理器
+        # 创建屏幕管理器（提词界面在首次使用时才创建，见get_teleprompter()）
         sm = ScreenManager()
         sm.add_widget(TextInputScreen())
-        sm.add_widget(TeleprompterScreen())
         
+        STARTUP.mark('build')
         return sm
     
     def on_start(self):
@@ -1106,6 +1592,81 @@ class TeleprompterApp(App):
         print("[提示] 本应用仅属于「teleprompter」仓库")
         print("[提示] 与现有网站仓库无任何关联")
         print("=" * 60)
+        
+        STARTUP.mark('on_start')
+        Window.bind(on_flip=self._on_first_frame)
+    
+    def _on_first_frame(self, *args):
+        """首帧显示后：输出启动耗时，再开始后台工作"""
+        Window.unbind(on_flip=self._on_first_frame)
+        STARTUP.mark('first_frame')
+        STARTUP.report(os.path.join(self.user_data_dir, 'startup-last.json'))
+        
+        # 后台加载语音模型，用户编辑文案时模型已在准备
+        self._model_load_start = time.monotonic()
+        SharedVoskModel.add_listener(self._on_model_status)
+        SharedVoskModel.load_async()
+        
+        # 空闲时预先创建提词界面，点击开始时不再等待
+        Clock.schedule_once(lambda dt: self.get_teleprompter(), 1.0)
+    
+    def get_teleprompter(self):
+        """
+        获取提词界面（首次调用时创建）
+        
+        返回：
+            TeleprompterScreen
+        """
+        sm = self.root
+        if not sm.has_screen('teleprompter'):
+            start = time.perf_counter()
+            sm.add_widget(TeleprompterScreen())
+            print(f"[信息] 提词界面创建耗时{(time.perf_counter() - start) * 1000:.0f}ms")
+        return sm.get_screen('teleprompter')
+    
+    def load_script(self, text, script=None):
+        """
+        解析文案并设为当前文案（编译结果、倒排索引和语法词表都走缓存）
+        
+        参数：
+            text: 文案全文
+            script: 已编译好的同一文案（可选，缓存未命中时直接使用）
+            
+        返回：
+            CompiledScript
+        """
+        if self.script_cache is None:
+            self.script_cache = ScriptCache(os.path.join(self.user_data_dir, 'script_cache'))
+        self.sentences, self.keyword_index = self.script_cache.get_or_parse(text, script)
+        return self.sentences
+    
+    @mainthread
+    def _on_model_status(self, status, message):
+        """共享模型加载状态变化（切回UI线程执行）"""
+        Clock.unschedule(self._tick_model_status)
+        if status == 'loading':
+            # 模型加载没有进度回调，显示已用时间
+            Clock.schedule_interval(self._tick_model_status, 0.5)
+            self._tick_model_status(0)
+        elif status == 'ready':
+            self.model_status = f'Speech model: ready ({SharedVoskModel.load_seconds:.1f}s)'
+        elif status == 'failed':
+            self.model_status = 'Speech model: not found - manual mode'
+        elif status == 'unavailable':
+            self.model_status = 'Speech model: unavailable - manual mode'
+    
+    def on_stop(self):
+        """应用退出时调用：结束解码工作进程"""
+        if not self.root.has_screen('teleprompter'):
+            return
+        recognizer = self.root.get_screen('teleprompter').recognizer
+        if recognizer.out_of_process:
+            recognizer.close()
+    
+    def _tick_model_status(self, dt):
+        """刷新模型加载已用时间"""
+        elapsed = time.monotonic() - self._model_load_start
+        self.model_status = f'Speech model: loading... {elapsed:.0f}s'
 
 # =============================================================================
 # 程序入口
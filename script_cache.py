@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+文案解析结果的磁盘缓存（纯Python，不依赖Kivy）
+
+以文案全文的SHA-1为键，把编译后的文案（CompiledScript）、关键词倒排索引
+和语音识别语法词表一起序列化到缓存目录；再次打开同一文案时直接读取，
+无需重新拆分句子、提取关键词、建索引。
+
+缓存总大小超过上限时按最近使用时间（文件修改时间）淘汰最旧的条目。
+缓存目录位于应用私有存储中，只读写本应用自己生成的文件。
+"""
+
+import os
+import time
+import pickle
+import hashlib
+from collections import OrderedDict
+
+from text_processor import TextProcessor
+
+
+class ScriptCache:
+    """
+    文案缓存
+    
+    - 内存中保留最近几份文案（解析后紧接着开始提词时不再读盘）
+    - 磁盘上每份文案一个文件：<哈希>.script
+    - 格式版本变化或文件损坏时视为未命中，并删除该文件
+    """
+    
+    VERSION = 2             # 缓存格式版本，CompiledScript/KeywordIndex结构变化时递增
+    SUFFIX = '.script'
+    MEMORY_ENTRIES = 2      # 内存中保留的文案份数
+    
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        """
+        参数：
+            directory: 缓存目录（不存在时自动创建）
+            max_bytes: 磁盘缓存总大小上限（字节）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()    # 哈希 -> (CompiledScript, KeywordIndex)
+        self.hits = 0                   # 命中次数（内存或磁盘）
+        self.misses = 0                 # 未命中（重新解析）次数
+    
+    @staticmethod
+    def key(text):
+        """文案的缓存键（全文SHA-1）"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+    
+    def get_or_parse(self, text, script=None):
+        """
+        取得文案的解析结果：先查内存，再查磁盘，都没有时解析并写入缓存
+        
+        参数：
+            text: 文案全文
+            script: 已编译好的同一文案（如编辑器实时解析的结果），未命中时直接使用
+        
+        返回：
+            (CompiledScript, KeywordIndex)
+        """
+        key = self.key(text)
+        start = time.perf_counter()
+        
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        entry = self.load(key)
+        if entry is not None:
+            self.hits += 1
+            print(f"[信息] 文案缓存命中：{len(entry[0])}句，"
+                  f"读取耗时{(time.perf_counter() - start) * 1000:.1f}ms")
+        else:
+            self.misses += 1
+            if script is None or script.text != text:
+                script = TextProcessor.compile_script(text)
+            index = TextProcessor.build_index(script)
+            script.grammar_vocabulary()  # 一并缓存语音识别语法词表
+            entry = (script, index)
+            print(f"[信息] 文案解析完成：{len(script)}句，"
+                  f"耗时{(time.perf_counter() - start) * 1000:.1f}ms")
+            self.store(key, entry)
+        
+        self._remember(key, entry)
+        return entry
+    
+    def _remember(self, key, entry):
+        """放入内存缓存"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+    
+    def load(self, key):
+        """
+        从磁盘读取一份缓存
+        
+        返回：
+            (CompiledScript, KeywordIndex)；不存在、版本不符或损坏时返回None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                version, script, index = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[警告] 文案缓存损坏，已忽略: {e}")
+            self._remove(path)
+            return None
+        
+        if version != self.VERSION:
+            self._remove(path)
+            return None
+        
+        # 更新修改时间，作为LRU淘汰的最近使用时间
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return script, index
+    
+    def store(self, key, entry):
+        """写入一份缓存（先写临时文件再替换，写入中断不会留下半个文件）"""
+        script, index = entry
+        path = self._path(key)
+        temp = path + '.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp, 'wb') as f:
+                pickle.dump((self.VERSION, script, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, path)
+        except Exception as e:
+            print(f"[警告] 写入文案缓存失败: {e}")
+            self._remove(temp)
+            return
+        self._evict()
+    
+    def _evict(self):
+        """总大小超过上限时，按最近使用时间从旧到新删除"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(self.SUFFIX)]
+        except OSError:
+            return
+        
+        files = []
+        total = 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            files.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+        
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+    
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        self._memory.clear()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(self.SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+    
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
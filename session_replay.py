@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+会话录制与离线回放
+===============================================================================
+- SessionRecorder：把一次提词会话的原始PCM录成WAV，识别事件写入JSONL
+- replay()：不启动界面，把录好的WAV以CPU允许的最快速度送入
+  VoskRecognizer和全文对齐器，报告实时率、翻页时间线和相对人工标注的延迟
+
+录制文件（同一前缀）：
+    session-20240101-120000.wav            原始16位单声道PCM
+    session-20240101-120000.events.jsonl   识别事件（每行一个JSON）
+    session-20240101-120000.script.txt     本次使用的文案
+
+标注文件（cues）为JSON列表，每项表示“演讲者在time秒开始读第sentence句”：
+    [{"sentence": 1, "time": 0.4}, {"sentence": 2, "time": 5.1}, ...]
+句子编号从1开始（与界面显示一致）。
+
+回放运行方式（在仓库根目录，需要Vosk库和模型）：
+    python session_replay.py session-20240101-120000.wav
+    python session_replay.py take.wav --script script.txt --cues cues.json --json report.json
+===============================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import queue
+import argparse
+import threading
+
+from text_processor import TextProcessor, ScriptAligner
+from audio_processing import VoiceActivityDetector, AudioPipeline
+from speech_engine import SharedVoskModel, VoskRecognizer
+
+
+# =============================================================================
+# 会话录制
+# =============================================================================
+class SessionRecorder:
+    """
+    会话录制器
+    
+    录音线程调用write_audio()只把音频放入队列，由独立的写盘线程写入WAV，
+    不会因磁盘IO拖慢录音；事件可在任意线程调用log_event()记录。
+    
+    每条事件带两个时间戳：
+    - t: 从开始录制起的墙钟时间（秒，单调时钟）
+    - audio_t: 事件发生时已录制的音频时长（秒），回放时用它对齐音频
+    """
+    
+    def __init__(self, directory, sample_rate=16000):
+        """
+        参数：
+            directory: 录制文件保存目录（不存在时自动创建）
+            sample_rate: 录音采样率
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.base_path = None       # 录制文件路径前缀（不含扩展名）
+        self.is_recording = False
+        self.samples = 0            # 已录制的采样点数
+        self._wav = None
+        self._events = None
+        self._audio_queue = queue.SimpleQueue()
+        self._writer = None
+        self._lock = threading.Lock()  # 保护事件文件
+        self._start_time = 0.0
+    
+    @property
+    def audio_seconds(self):
+        """已录制的音频时长（秒）"""
+        return self.samples / self.sample_rate
+    
+    def start(self, sentences=None):
+        """
+        开始录制
+        
+        参数：
+            sentences: 本次使用的句子列表（保存为.script.txt，回放时直接使用）
+        
+        返回：
+            录制文件路径前缀
+        """
+        if self.is_recording:
+            return self.base_path
+        
+        os.makedirs(self.directory, exist_ok=True)
+        name = time.strftime('session-%Y%m%d-%H%M%S')
+        self.base_path = os.path.join(self.directory, name)
+        
+        if sentences:
+            with open(self.base_path + '.script.txt', 'w', encoding='utf-8') as f:
+                f.write('\n'.join(s['text'] for s in sentences))
+        
+        self._wav = wave.open(self.base_path + '.wav', 'wb')
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.sample_rate)
+        self._events = open(self.base_path + '.events.jsonl', 'w', encoding='utf-8')
+        
+        self.samples = 0
+        self._start_time = time.monotonic()
+        self.is_recording = True
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        
+        self.log_event('start', sample_rate=self.sample_rate,
+                       sentences=len(sentences) if sentences else 0)
+        print(f"[信息] 开始录制会话: {self.base_path}")
+        return self.base_path
+    
+    def write_audio(self, audio_data):
+        """
+        记录一块原始音频（录音线程调用，不阻塞）
+        
+        参数：
+            audio_data: 16位PCM音频数据（只在调用期间有效，这里会复制一份）
+        """
+        if not self.is_recording:
+            return
+        self._audio_queue.put(bytes(audio_data))
+        self.samples += len(audio_data) // 2
+    
+    def log_event(self, event, **fields):
+        """
+        记录一条事件
+        
+        参数：
+            event: 事件类型（start/partial/final/advance/manual/pause/resume/speech_start/stop）
+            fields: 事件附带的字段
+        """
+        if not self.is_recording:
+            return
+        
+        record = {
+            'event': event,
+            't': round(time.monotonic() - self._start_time, 4),
+            'audio_t': round(self.audio_seconds, 4),
+        }
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._events.write(line + '\n')
+    
+    def stop(self):
+        """停止录制并关闭文件"""
+        if not self.is_recording:
+            return
+        
+        self.log_event('stop')
+        self.is_recording = False
+        self._audio_queue.put(None)
+        self._writer.join()
+        self._writer = None
+        
+        self._wav.close()
+        with self._lock:
+            self._events.close()
+        self._wav = None
+        self._events = None
+        print(f"[信息] 会话录制完成（{self.audio_seconds:.1f}秒）: {self.base_path}.wav")
+    
+    def _write_loop(self):
+        """写盘循环（后台线程）"""
+        while True:
+            data = self._audio_queue.get()
+            if data is None:
+                break
+            self._wav.writeframes(data)
+
+
+# =============================================================================
+# 离线回放
+# =============================================================================
+def load_wav(path):
+    """
+    读取16位单声道WAV
+    
+    返回：
+        (pcm字节, 采样率)
+    """
+    with wave.open(path, 'rb') as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f'只支持16位单声道WAV: {path}')
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+
+def load_cues(path):
+    """
+    读取人工标注的句子起始时间
+    
+    返回：
+        [(句子索引(从0开始), 时间秒)]，按时间排序
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return sorted((int(cue['sentence']) - 1, float(cue['time'])) for cue in data)
+
+
+def percentile(values, p):
+    """计算百分位数（最近秩法）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def cue_latencies(timeline, cues):
+    """
+    计算每个标注句子的翻页延迟
+    
+    延迟 = 显示位置首次到达（或越过）该句的音频时间 - 标注时间；
+    负数表示提前翻页，从未到达记为漏翻（latency为None）
+    
+    参数：
+        timeline: replay()产生的翻页时间线
+        cues: load_cues()的返回值
+    """
+    results = []
+    for index, cue_time in cues:
+        if index == 0:
+            reached = 0.0  # 第一句一开始就显示
+        else:
+            reached = next((step['time'] for step in timeline if step['sentence'] >= index), None)
+        results.append({
+            'sentence': index + 1,
+            'cue': cue_time,
+            'shown': reached,
+            'latency': None if reached is None else round(reached - cue_time, 3),
+        })
+    return results
+
+
+def replay(wav_path, sentences, cues=None, chunk_ms=250, use_vad=True,
+           use_partial_results=True, use_grammar=False, use_preprocessing=False):
+    """
+    以CPU允许的最快速度回放一段录音，走与界面相同的识别和对齐逻辑
+    
+    参数：
+        wav_path: 16位单声道WAV路径
+        sentences: TextProcessor.compile_script()的结果（或split_sentences()的句子列表）
+        cues: load_cues()的返回值（可选）
+        chunk_ms: 每次送入的音频时长（毫秒，与录音块大小一致）
+        use_vad: 是否启用静音检测
+        use_partial_results: 是否用部分识别结果提前翻页
+        use_grammar: 是否使用文案语法识别器
+        use_preprocessing: 是否启用高通滤波和自动增益（非16kHz录音总会重采样）
+    
+    返回：
+        回放报告字典（audio_seconds, wall_seconds, rtf, timeline, cues, stats）
+    """
+    pcm, sample_rate = load_wav(wav_path)
+    
+    recognizer = VoskRecognizer(use_grammar=use_grammar)
+    if not recognizer.load_model():
+        raise RuntimeError('Vosk模型不可用，无法回放')
+    recognizer.set_script(sentences)
+    
+    if use_preprocessing or sample_rate != 16000:
+        recognizer.pipeline = AudioPipeline.default(sample_rate, enhance=use_preprocessing)
+        if recognizer.pipeline is None and sample_rate != 16000:
+            raise RuntimeError(f'{sample_rate}Hz录音需要NumPy重采样')
+    if use_vad:
+        recognizer.vad = VoiceActivityDetector()
+    recognizer.reset()
+    
+    aligner = ScriptAligner(sentences, index=TextProcessor.build_index(sentences))
+    prefix = VoskRecognizer.PARTIAL_PREFIX
+    timeline = []
+    current = 0
+    
+    chunk_bytes = sample_rate * chunk_ms // 1000 * 2
+    view = memoryview(pcm)
+    decode_seconds = 0.0
+    start = time.perf_counter()
+    
+    for offset in range(0, len(pcm), chunk_bytes):
+        chunk = view[offset:offset + chunk_bytes]
+        # 这块音频录完的时刻，即实时运行时它最早能被处理的时刻
+        audio_time = (offset + len(chunk)) / 2 / sample_rate
+        
+        t0 = time.perf_counter()
+        recognizer.decode_chunk(chunk)
+        if offset + chunk_bytes >= len(pcm):
+            # 录音结束，取出最后一句
+            final = recognizer.flush()
+            if final:
+                recognizer.result_queue.put(final)
+        decode_seconds += time.perf_counter() - t0
+        
+        while not recognizer.result_queue.empty():
+            result = recognizer.result_queue.get_nowait()
+            if result.startswith(prefix):
+                if not use_partial_results:
+                    continue
+                text = result[len(prefix):].strip()
+                target = aligner.feed_partial(text)
+                source = 'partial'
+            else:
+                text = result
+                target = aligner.feed_text(text)
+                source = 'final'
+            
+            if target != current:
+                timeline.append({
+                    'time': round(audio_time, 3),
+                    'sentence': target,
+                    'source': source,
+                    'text': text,
+                })
+                current = target
+    
+    wall_seconds = time.perf_counter() - start
+    audio_seconds = len(pcm) / 2 / sample_rate
+    
+    report = {
+        'wav': wav_path,
+        'audio_seconds': round(audio_seconds, 3),
+        'wall_seconds': round(wall_seconds, 3),
+        'decode_seconds': round(decode_seconds, 3),
+        'rtf': round(wall_seconds / audio_seconds, 4) if audio_seconds else None,
+        'timeline': timeline,
+        'stats': recognizer.get_stats(),
+    }
+    if cues:
+        report['cues'] = cue_latencies(timeline, cues)
+    return report
+
+
+def print_report(report, sentences):
+    """打印回放报告"""
+    print("=" * 60)
+    print(f"回放: {report['wav']}")
+    print("=" * 60)
+    print(f"音频时长 {report['audio_seconds']:.1f}秒，处理耗时 {report['wall_seconds']:.2f}秒，"
+          f"实时率 RTF={report['rtf']:.3f}（{1 / report['rtf']:.1f}倍实时）" if report['rtf']
+          else "音频为空")
+    
+    stats = report['stats']
+    print(f"解码 {stats['processed']}块，静音跳过 {stats['skipped_silence']}块，"
+          f"语音起点 {stats['speech_onsets']}次")
+    
+    print("-" * 60)
+    print("翻页时间线：")
+    for step in report['timeline']:
+        text = sentences[step['sentence']]['text']
+        print(f"  {step['time']:8.2f}s  -> 第{step['sentence'] + 1}句 [{step['source']}] {text[:40]}")
+    
+    cues = report.get('cues')
+    if not cues:
+        return
+    
+    print("-" * 60)
+    print("相对标注的翻页延迟（负数为提前）：")
+    for cue in cues:
+        shown = '漏翻' if cue['latency'] is None else f"{cue['latency']:+.2f}s"
+        print(f"  第{cue['sentence']}句  标注 {cue['cue']:8.2f}s  {shown}")
+    
+    latencies = [cue['latency'] for cue in cues if cue['latency'] is not None]
+    missed = len(cues) - len(latencies)
+    if latencies:
+        print(f"延迟: 平均 {sum(latencies) / len(latencies):+.2f}s  "
+              f"p50 {percentile(latencies, 50):+.2f}s  p90 {percentile(latencies, 90):+.2f}s  "
+              f"最大 {max(latencies):+.2f}s  漏翻 {missed}/{len(cues)}")
+    else:
+        print(f"漏翻 {missed}/{len(cues)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线回放录音，评估识别和翻页')
+    parser.add_argument('wav', help='16位单声道WAV（会话录制文件或其他录音）')
+    parser.add_argument('--script', help='文案文本文件（默认使用会话录制的.script.txt）')
+    parser.add_argument('--cues', help='人工标注的句子起始时间（JSON）')
+    parser.add_argument('--model', help='Vosk模型目录（默认使用应用的模型路径）')
+    parser.add_argument('--chunk-ms', type=int, default=250, help='每次送入的音频时长（毫秒）')
+    parser.add_argument('--no-vad', action='store_true', help='关闭静音检测')
+    parser.add_argument('--no-partial', action='store_true', help='不用部分结果提前翻页')
+    parser.add_argument('--grammar', action='store_true', help='使用文案语法识别器')
+    parser.add_argument('--preprocess', action='store_true', help='启用音频预处理（需要NumPy）')
+    parser.add_argument('--json', help='把完整报告写入JSON文件')
+    args = parser.parse_args()
+    
+    script_path = args.script
+    if script_path is None and args.wav.endswith('.wav'):
+        script_path = args.wav[:-len('.wav')] + '.script.txt'
+    if not script_path or not os.path.exists(script_path):
+        print("[错误] 找不到文案文件，请用 --script 指定")
+        return 1
+    
+    with open(script_path, encoding='utf-8') as f:
+        sentences = TextProcessor.compile_script(f.read())
+    if not sentences:
+        print("[错误] 文案为空")
+        return 1
+    
+    if args.model:
+        SharedVoskModel.custom_path = args.model
+    cues = load_cues(args.cues) if args.cues else None
+    
+    try:
+        report = replay(args.wav, sentences, cues=cues, chunk_ms=args.chunk_ms,
+                        use_vad=not args.no_vad,
+                        use_partial_results=not args.no_partial,
+                        use_grammar=args.grammar,
+                        use_preprocessing=args.preprocess)
+    except (RuntimeError, ValueError) as e:
+        print(f"[错误] {e}")
+        return 1
+    
+    print_report(report, sentences)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[成功] 报告已写入 {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,636 @@
+# -*- coding: utf-8 -*-
+"""
+语音识别引擎（不依赖Kivy）
+
+包含：
+- SharedVoskModel：进程级共享的Vosk模型（后台加载，全进程只加载一次）
+- VoskRecognizer：Vosk识别器封装（环形缓冲区 + 解码线程 + 预处理 + 静音检测）
+
+从main.py中拆出，便于离线回放、批处理等无界面场景直接复用
+"""
+
+import os
+import json
+import hashlib
+import queue
+import threading
+import time
+import importlib.util
+from collections import OrderedDict
+
+from text_processor import TextProcessor
+from audio_processing import AudioRingBuffer, VoiceActivityDetector
+
+# 平台判断（与kivy.utils.platform的安卓判断一致，但不依赖Kivy）
+IS_ANDROID = 'ANDROID_ARGUMENT' in os.environ
+
+# =============================================================================
+# Vosk语音识别引擎封装类
+# =============================================================================
+# 【重要修复】Vosk是C++原生库，无法通过python-for-android直接编译
+# 当前采用"优雅降级"策略：vosk不可用时，自动切换到手动模式
+# 后续可通过vosk-android AAR包集成真正的语音识别功能
+# =============================================================================
+
+# 只检查Vosk是否已安装，不在导入本模块时加载原生库（启动更快，手动模式下完全不加载）；
+# 真正的导入在第一次加载模型时进行（模型在后台线程加载）
+VOSK_AVAILABLE = importlib.util.find_spec('vosk') is not None
+if not VOSK_AVAILABLE:
+    print("[警告] Vosk库未安装或不可用，将使用手动模式")
+VoskModel = None
+KaldiRecognizer = None
+
+def load_vosk():
+    """
+    导入Vosk（首次调用时加载原生库）
+    
+    返回：
+        True: 导入成功；False: 未安装或原生库加载失败
+    """
+    global VOSK_AVAILABLE, VoskModel, KaldiRecognizer
+    if KaldiRecognizer is not None:
+        return True
+    if not VOSK_AVAILABLE:
+        return False
+    
+    start = time.monotonic()
+    try:
+        from vosk import Model, KaldiRecognizer as Recognizer
+    except Exception as e:
+        print(f"[警告] Vosk库加载失败，将使用手动模式: {e}")
+        VOSK_AVAILABLE = False
+        return False
+    VoskModel, KaldiRecognizer = Model, Recognizer
+    print(f"[信息] Vosk库加载成功（{(time.monotonic() - start) * 1000:.0f}ms）")
+    return True
+
+class SharedVoskModel:
+    """
+    进程级共享的Vosk模型
+    
+    功能：
+    - 应用启动时在后台线程加载模型，不阻塞UI
+    - 整个进程只加载一次，所有识别器、所有文案共用同一个模型
+    - 通过监听器报告加载状态（idle/loading/ready/failed/unavailable）
+    
+    监听器在加载线程中被调用，涉及UI时需自行切回主线程
+    """
+    
+    MODEL_NAME = 'vosk-model-small-en-us-0.15'
+    
+    custom_path = None      # 指定模型目录（为None时按平台自动确定）
+    model = None            # 加载完成的Vosk模型
+    status = 'idle'         # 加载状态
+    message = ''            # 状态说明
+    load_seconds = 0.0      # 模型加载耗时（秒）
+    _lock = threading.Lock()        # 保护状态和监听器列表
+    _load_lock = threading.Lock()   # 保证模型只加载一次
+    _thread = None
+    _listeners = []
+    
+    @classmethod
+    def model_path(cls):
+        """
+        确定模型路径
+        
+        - 安卓：存放在应用私有目录
+        - 其他平台：存放在当前目录
+        - 设置了custom_path时直接使用（离线回放等工具使用）
+        """
+        if cls.custom_path:
+            return cls.custom_path
+        if IS_ANDROID:
+            # 安卓平台使用应用私有存储
+            try:
+                from android.storage import app_storage_path
+                return os.path.join(app_storage_path(), cls.MODEL_NAME)
+            except ImportError:
+                # 如果android.storage不可用，使用备用路径
+                return '/data/data/org.teleprompter.teleprompter/files/' + cls.MODEL_NAME
+        # 其他平台使用当前目录
+        return './' + cls.MODEL_NAME
+    
+    @classmethod
+    def add_listener(cls, listener):
+        """注册状态监听器 listener(status, message)，并立即报告当前状态"""
+        with cls._lock:
+            if listener not in cls._listeners:
+                cls._listeners.append(listener)
+            status, message = cls.status, cls.message
+        listener(status, message)
+    
+    @classmethod
+    def remove_listener(cls, listener):
+        """注销状态监听器"""
+        with cls._lock:
+            if listener in cls._listeners:
+                cls._listeners.remove(listener)
+    
+    @classmethod
+    def _report(cls, status, message):
+        """更新状态并通知所有监听器"""
+        with cls._lock:
+            cls.status, cls.message = status, message
+            listeners = list(cls._listeners)
+        print(f"[模型] {message}")
+        for listener in listeners:
+            try:
+                listener(status, message)
+            except Exception as e:
+                print(f"[错误] 模型状态回调失败: {e}")
+    
+    @classmethod
+    def load_async(cls):
+        """在后台线程加载模型（已加载或正在加载时直接返回）"""
+        with cls._lock:
+            if cls.status in ('loading', 'ready', 'unavailable'):
+                return
+            cls.status = 'loading'
+            cls._thread = threading.Thread(target=cls.load, daemon=True)
+            cls._thread.start()
+    
+    @classmethod
+    def load(cls):
+        """
+        加载模型（阻塞，已加载时直接返回）
+        
+        返回：
+            Vosk模型对象；Vosk不可用或模型缺失时返回None
+        """
+        with cls._load_lock:
+            return cls._load_locked()
+    
+    @classmethod
+    def _load_locked(cls):
+        """加载模型（调用者需持有_load_lock）"""
+        if cls.model is not None:
+            return cls.model
+        
+        # 【降级检查】如果Vosk库不可用，直接返回None
+        if not VOSK_AVAILABLE:
+            cls._report('unavailable', 'Vosk库不可用，切换到手动模式')
+            return None
+        
+        model_path = cls.model_path()
+        if not os.path.exists(model_path):
+            print("[提示] 请下载模型: https://alphacephei.com/vosk/models")
+            cls._report('failed', f'模型不存在: {model_path}')
+            return None
+        
+        # 模型存在时才加载Vosk原生库
+        if not load_vosk():
+            cls._report('unavailable', 'Vosk库加载失败，切换到手动模式')
+            return None
+        
+        cls._report('loading', f'正在加载Vosk模型: {model_path}')
+        start = time.monotonic()
+        try:
+            model = VoskModel(model_path)
+        except Exception as e:
+            cls._report('failed', f'加载模型失败: {e}')
+            return None
+        
+        cls.model = model
+        cls.load_seconds = time.monotonic() - start
+        cls._report('ready', f'Vosk模型加载完成（{cls.load_seconds:.1f}秒）')
+        return model
+
+class VoskRecognizer:
+    """
+    Vosk离线语音识别器封装类
+    
+    功能：
+    - 自动下载/加载vosk-model-small-en-us-0.15模型
+    - 处理音频流并返回识别结果
+    - 每产生一条识别结果立即通知（on_result回调）
+    
+    【生产者/消费者】
+    录音线程只调用feed()把音频复制进预分配的环形缓冲区，立即返回；
+    独立的解码线程直接读取缓冲区中的音频块送入Vosk（不再复制），
+    结果放入result_queue并调用on_result。
+    解码跟不上时丢弃最旧的音频块（背压），录音永远不会被阻塞。
+    
+    【预处理】
+    设置pipeline后，解码线程先对音频做预处理（重采样到16kHz、高通滤波、
+    自动增益），再做静音检测和解码。
+    
+    【静音检测】
+    设置vad后，解码线程先做语音活动检测：静音块不送入Vosk，
+    语音结束（拖尾过后）时调用FinalResult()结束本句，
+    语音起点前的一块静音作为前导音频补送，避免切掉第一个词的开头。
+    
+    【文案语法】
+    use_grammar为True时，用文案词表（加[unk]）构建受限语法识别器，
+    解码更快、更准；同一文案的识别器按文案哈希缓存，文案不变时直接复用。
+    
+    【降级说明】
+    如果Vosk库不可用（如在Android上未正确集成），
+    load_model()会返回False，应用自动切换到手动翻页模式
+    """
+    
+    # 部分识别结果的前缀标记
+    PARTIAL_PREFIX = '[部分]'
+    
+    # 是否在独立进程中解码（见decode_worker.ProcessVoskRecognizer）
+    out_of_process = False
+    
+    # 最多缓存的文案语法识别器数量
+    GRAMMAR_CACHE_SIZE = 4
+    
+    def __init__(self, queue_size=16, on_result=None, use_grammar=False,
+                 chunk_bytes=8000):
+        """
+        初始化识别器
+        
+        参数：
+            queue_size: 音频缓冲区容量（音频块数，每块约250ms）
+            chunk_bytes: 每个音频块的字节数（默认4000个16位采样点）
+            on_result: 新结果通知回调（在解码线程中调用，需线程安全）
+            use_grammar: 是否使用文案词表构建受限语法识别器
+        """
+        self.model = None           # Vosk模型对象
+        self.recognizer = None      # Vosk识别器对象
+        self.free_recognizer = None # 自由词表识别器（不受文案限制）
+        self.use_grammar = use_grammar
+        self._grammar_cache = OrderedDict()  # 文案哈希 -> 语法识别器
+        self.is_running = False     # 识别是否正在运行
+        self.result_queue = queue.Queue()  # 识别结果队列
+        self.audio_buffer = AudioRingBuffer(queue_size, chunk_bytes)  # 预分配的环形缓冲区
+        self.vosk_available = VOSK_AVAILABLE  # Vosk是否可用
+        self.worker = None          # 解码线程（超时未退出时保留句柄，直到确认退出）
+        self._stop_event = None     # 当前解码线程的停止信号（每个线程一个）
+        self.on_result = on_result  # 新结果通知回调
+        self._last_partial = ''     # 上一次返回的部分结果
+        self.word_timings = None    # 设为列表时收集最终结果的单词时间戳（批量对齐用）
+        
+        self._accepts_buffers = True  # AcceptWaveform是否接受bytearray/memoryview
+        
+        # 预处理链（为None时音频原样送入）
+        self.pipeline = None        # AudioPipeline
+        
+        # 静音检测（为None时所有音频都送入解码器）
+        self.vad = None             # VoiceActivityDetector
+        self.on_speech_start = None # 检测到语音起点时的回调（在解码线程中调用）
+        self._in_speech = False     # 当前是否处于一句话中
+        self._preroll = bytearray(chunk_bytes)  # 最近一块静音（前导音频）
+        self._preroll_view = memoryview(self._preroll)
+        self._preroll_size = 0
+        
+        # 延迟追踪（为None时不打时间戳）
+        self.tracer = None          # LatencyTracer
+        self._chunk_capture = 0.0   # 当前音频块的采集时间
+        self._chunk_start = 0.0     # 当前音频块的解码开始时间
+        
+        # 运行统计（丢弃数、深度峰值由audio_buffer统计）
+        self.processed_chunks = 0   # 已解码的音频块数
+        self.skipped_chunks = 0     # 静音检测跳过的音频块数
+        self.speech_onsets = 0      # 检测到的语音起点次数
+    
+    def load_model(self):
+        """
+        从进程级共享模型创建识别器
+        
+        模型尚未加载时会阻塞加载（UI线程中应先用SharedVoskModel.load_async()
+        在后台加载，状态变为ready后再调用本方法）
+        
+        返回：
+        - True: 模型加载成功
+        - False: 模型加载失败（Vosk不可用或模型文件缺失）
+        """
+        # 【降级检查】如果Vosk库不可用，直接返回False
+        if not self.vosk_available:
+            print("[警告] Vosk库不可用，切换到手动模式")
+            return False
+        
+        model = SharedVoskModel.load()
+        if model is None:
+            return False
+        
+        try:
+            self.model = model
+            
+            # 创建识别器，采样率16000Hz（标准语音识别采样率）
+            # 识别器只持有解码状态，从已加载的模型创建很快
+            self.recognizer = KaldiRecognizer(self.model, 16000)
+            self.recognizer.SetWords(True)  # 启用单词级别识别
+            self.free_recognizer = self.recognizer
+            
+            print("[成功] 识别器创建完成！")
+            return True
+        
+        except Exception as e:
+            print(f"[错误] 创建识别器失败: {e}")
+            return False
+    
+    def set_script(self, sentences):
+        """
+        根据文案切换识别器（需在解码线程启动前调用）
+        
+        use_grammar为True时使用文案词表构建的语法识别器，
+        同一文案（哈希相同）直接复用缓存；否则使用自由词表识别器
+        
+        参数：
+            sentences: 拆分后的句子列表
+        """
+        if self.model is None:
+            return
+        
+        if not self.use_grammar or not sentences:
+            self.recognizer = self.free_recognizer
+            self.recognizer.Reset()
+            return
+        
+        vocabulary = TextProcessor.script_vocabulary(sentences)
+        script_hash = hashlib.sha1('\n'.join(vocabulary).encode('utf-8')).hexdigest()
+        
+        recognizer = self._grammar_cache.get(script_hash)
+        if recognizer is None:
+            try:
+                # 词表 + [unk]：文案外的词识别为[unk]，不会被强行匹配成文案单词
+                grammar = json.dumps(vocabulary + ['[unk]'])
+                recognizer = KaldiRecognizer(self.model, 16000, grammar)
+                recognizer.SetWords(True)
+            except Exception as e:
+                print(f"[错误] 构建文案语法失败，使用自由词表: {e}")
+                self.recognizer = self.free_recognizer
+                self.recognizer.Reset()
+                return
+            
+            self._grammar_cache[script_hash] = recognizer
+            if len(self._grammar_cache) > self.GRAMMAR_CACHE_SIZE:
+                self._grammar_cache.popitem(last=False)
+            print(f"[信息] 已构建文案语法识别器（{len(vocabulary)}个词）")
+        else:
+            self._grammar_cache.move_to_end(script_hash)
+            recognizer.Reset()
+        
+        self.recognizer = recognizer
+    
+    def reset(self):
+        """清空残留的音频、结果和预处理/静音检测状态（开始新一轮识别前调用）"""
+        self.audio_buffer.clear()
+        while not self.result_queue.empty():
+            try:
+                self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+        
+        if self.pipeline is not None:
+            self.pipeline.reset()
+        if self.vad is not None:
+            self.vad.reset()
+        self._in_speech = False
+        self._preroll_size = 0
+        self._last_partial = ''
+    
+    def start(self):
+        """
+        启动解码线程
+        
+        上一个解码线程还在Vosk中解码（stop()等待超时）时，先再等待它退出；
+        仍未退出则不启动，避免两个线程同时使用同一个Kaldi识别器
+        
+        返回：
+            True: 解码线程正在运行；False: 上一个线程尚未退出，未启动
+        """
+        if self.is_running:
+            return True
+        if not self.wait_stopped():
+            print("[警告] 上一个解码线程尚未退出，暂不启动识别")
+            return False
+        
+        self.reset()
+        self.is_running = True
+        self._stop_event = threading.Event()
+        self.worker = threading.Thread(target=self._decode_loop, args=(self._stop_event,),
+                                       daemon=True)
+        self.worker.start()
+        print("[信息] 解码线程已启动")
+        return True
+    
+    def wait_stopped(self, timeout=1.0):
+        """
+        等待上次stop()后残留的解码线程真正退出（修改识别器、预处理链之前调用）
+        
+        返回：
+            True: 没有残留的解码线程；False: 等待超时，线程仍在解码
+        """
+        if self.is_running or self.worker is None:
+            return True
+        self.worker.join(timeout=timeout)
+        if self.worker.is_alive():
+            return False
+        self.worker = None
+        return True
+    
+    def stop(self):
+        """停止解码线程（最多等待1秒；超时未退出时保留句柄，由下次start()确认）"""
+        if not self.is_running:
+            return
+        
+        self.is_running = False
+        self._stop_event.set()
+        self.audio_buffer.close()  # 唤醒解码线程使其退出
+        if self.worker:
+            self.worker.join(timeout=1.0)
+            if self.worker.is_alive():
+                print("[警告] 解码线程未能在1秒内退出（仍在解码）")
+            else:
+                self.worker = None
+        
+        print(f"[信息] 解码线程已停止（已解码{self.processed_chunks}块，丢弃{self.audio_buffer.dropped}块）")
+        if self.pipeline is not None:
+            print(f"[信息] 音频预处理耗时：{self.pipeline.format_stats()}")
+    
+    def feed(self, audio_data):
+        """
+        放入一块音频（录音线程调用，永不阻塞）
+        
+        数据被复制进预分配的缓冲块，调用返回后audio_data即可复用；
+        缓冲区已满时覆盖最旧的音频块，保证识别的是最新的语音
+        
+        参数：
+            audio_data: 16位PCM音频数据（bytes/bytearray/memoryview）
+        """
+        self.audio_buffer.write(audio_data)
+    
+    @property
+    def queue_depth(self):
+        """当前排队等待解码的音频块数"""
+        return self.audio_buffer.depth
+    
+    def get_stats(self):
+        """
+        获取解码统计信息
+        
+        返回：
+            {"queue_depth", "max_queue_depth", "processed", "dropped",
+             "skipped_silence", "speech_onsets", "pipeline"}
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.audio_buffer.max_depth,
+            'processed': self.processed_chunks,
+            'dropped': self.audio_buffer.dropped,
+            'skipped_silence': self.skipped_chunks,
+            'speech_onsets': self.speech_onsets,
+            'pipeline': self.pipeline.get_stats() if self.pipeline else None,
+        }
+    
+    def _decode_loop(self, stop_event):
+        """
+        解码循环（后台线程）
+        
+        参数：
+            stop_event: 本线程专属的停止信号（不与之后启动的线程共用）
+        """
+        buffer = self.audio_buffer
+        while not stop_event.is_set():
+            slot = buffer.get()
+            if slot is None:
+                break
+            
+            self._chunk_capture = buffer.stamp(slot)
+            self._chunk_start = time.monotonic()
+            
+            # 直接把缓冲块交给Vosk，处理完立即归还
+            try:
+                self.decode_chunk(buffer.view(slot))
+            finally:
+                buffer.release(slot)
+            
+            tracer = self.tracer
+            if tracer is not None:
+                tracer.decoded(self._chunk_capture, self._chunk_start, time.monotonic())
+    
+    def decode_chunk(self, audio_data):
+        """
+        解码一块音频（先经过预处理和静音检测），结果放入result_queue
+        
+        解码线程逐块调用；离线回放时也可不启动线程、直接同步调用
+        """
+        if self.pipeline is not None:
+            audio_data = self.pipeline.process(audio_data)
+        
+        if self.vad is None:
+            self._post(self.process_audio(audio_data))
+            self.processed_chunks += 1
+            return
+        
+        state = self.vad.process(audio_data)
+        if state == VoiceActivityDetector.SILENCE:
+            if self._in_speech:
+                # 语音结束：立即结束本句，不再等待Vosk自己检测到静音
+                self._in_speech = False
+                self._post(self.flush())
+            
+            # 保存为前导音频（只保留末尾部分），静音本身不送入解码器
+            size = min(len(audio_data), len(self._preroll))
+            self._preroll_view[:size] = memoryview(audio_data)[len(audio_data) - size:]
+            self._preroll_size = size
+            self.skipped_chunks += 1
+            return
+        
+        if self.vad.onset:
+            # 语音起点：先补送前一块静音，保留第一个词的开头
+            self.speech_onsets += 1
+            if self.on_speech_start:
+                self.on_speech_start()
+            if self._preroll_size:
+                self._post(self.process_audio(self._preroll_view[:self._preroll_size]))
+                self._preroll_size = 0
+        
+        self._in_speech = True
+        self._post(self.process_audio(audio_data))
+        self.processed_chunks += 1
+    
+    def _post(self, result):
+        """发布一条识别结果"""
+        if result:
+            tracer = self.tracer
+            if tracer is not None:
+                tracer.result_posted(self._chunk_capture, self._chunk_start)
+            self.result_queue.put(result)
+            if self.on_result:
+                # 立即通知UI，无需等待轮询
+                self.on_result()
+    
+    def flush(self):
+        """
+        结束当前这句话，返回最终识别结果
+        
+        返回：
+            识别到的文本（如果有），否则返回None
+        """
+        if self.recognizer is None:
+            return None
+        
+        try:
+            self._last_partial = ''
+            result = json.loads(self.recognizer.FinalResult())
+            self._collect_words(result)
+            text = result.get('text', '').strip()
+            if text:
+                return text
+        except Exception as e:
+            print(f"[错误] 结束语句失败: {e}")
+        
+        return None
+    
+    def process_audio(self, audio_data):
+        """
+        处理音频数据并返回识别结果
+        
+        参数：
+            audio_data: 16位PCM音频数据（bytes/bytearray/memoryview）
+        
+        返回：
+            识别到的文本（如果有），否则返回None
+        """
+        if self.recognizer is None:
+            return None
+        
+        try:
+            # 将音频数据送入识别器
+            if self._accept_waveform(audio_data):
+                # 获取完整识别结果
+                self._last_partial = ''
+                result = json.loads(self.recognizer.Result())
+                self._collect_words(result)
+                text = result.get('text', '').strip()
+                if text:
+                    return text
+            else:
+                # 获取部分识别结果（实时反馈），与上次相同时不重复返回
+                partial = json.loads(self.recognizer.PartialResult())
+                text = partial.get('partial', '').strip()
+                if text and text != self._last_partial:
+                    self._last_partial = text
+                    return f"{self.PARTIAL_PREFIX} {text}"
+        except Exception as e:
+            print(f"[错误] 音频处理失败: {e}")
+        
+        return None
+    
+    def _collect_words(self, result):
+        """
+        收集最终结果中的单词时间戳（SetWords启用后Vosk在result字段给出）
+        
+        每项为{"word", "start", "end", "conf"}，时间是从识别器创建起送入音频的秒数
+        """
+        if self.word_timings is not None:
+            self.word_timings.extend(result.get('result', ()))
+    
+    def _accept_waveform(self, audio_data):
+        """
+        把音频送入Vosk
+        
+        优先直接传入缓冲区（不复制）；某些Vosk版本只接受bytes，
+        遇到类型错误后改为复制成bytes，之后不再尝试
+        """
+        if self._accepts_buffers or isinstance(audio_data, bytes):
+            try:
+                return self.recognizer.AcceptWaveform(audio_data)
+            except TypeError:
+                self._accepts_buffers = False
+        return self.recognizer.AcceptWaveform(bytes(audio_data))
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共设置：把仓库根目录加入导入路径（与benchmarks/下的脚本相同）
+
+运行方式（在仓库根目录）：
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
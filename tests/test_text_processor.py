@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+text_processor 的回归测试（纯Python，不需要Kivy和Vosk）
+
+- CompiledScript.reparse()：随机编辑后的结果必须与compile()完全一致
+- bounded_edit_distance()：在上限以内与完整的_edit_distance()一致
+- 发音键相同（rate/right/route）只作为候选，不直接判定为匹配
+"""
+
+import random
+
+import pytest
+
+from text_processor import TextProcessor, CompiledScript, ScriptAligner
+
+
+WORDS = ['teleprompter', 'speech', 'quarterly', 'revenue', 'growth', 'the', 'and',
+         'engineering', 'customer', 'satisfaction', 'plans', 'next', 'year', 'a',
+         "don't", 'northern', 'markets', 'shipped', 'features', 'improved']
+BREAKS = ['. ', '? ', '! ', '.\n', '.  ', ' ']
+
+
+def make_text(rng, sentences):
+    """生成随机文案（句末标点和空白随机）"""
+    parts = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(1, 12))]
+        parts.append(' '.join(words).capitalize() + rng.choice(BREAKS))
+    return ''.join(parts)
+
+
+def edit(rng, text):
+    """对文案做一次随机编辑：插入、删除或替换一段文字"""
+    position = rng.randint(0, len(text))
+    kind = rng.randrange(3)
+    if kind == 0:
+        insert = rng.choice([rng.choice(WORDS), '. ', ' ', '\n', 'zq' * rng.randint(1, 3)])
+        return text[:position] + insert + text[position:]
+    length = rng.randint(1, 40)
+    if kind == 1:
+        return text[:position] + text[position + length:]
+    return text[:position] + rng.choice(WORDS) + text[position + length:]
+
+
+def snapshot(script):
+    """比较用：每句的原文和关键词"""
+    return [(sentence['text'], list(sentence['keywords'])) for sentence in script]
+
+
+# =============================================================================
+# CompiledScript.reparse
+# =============================================================================
+@pytest.mark.parametrize('seed', range(5))
+def test_reparse_matches_compile(seed):
+    """连续随机编辑，每一步增量重新解析的结果都与整篇重新编译相同"""
+    rng = random.Random(seed)
+    text = make_text(rng, 30)
+    script = CompiledScript.compile(text)
+    for _ in range(400):
+        text = edit(rng, text)
+        script = script.reparse(text)
+        expected = CompiledScript.compile(text)
+        assert script.text == text
+        assert snapshot(script) == snapshot(expected)
+        assert list(script.char_offsets) == list(expected.char_offsets)
+        assert list(script.token_offsets) == list(expected.token_offsets)
+
+
+def test_reparse_keeps_references_and_bounds_vocabulary():
+    """引用计数与实际关键词一致，未被引用的单词不超过ORPHAN_RATIO"""
+    rng = random.Random(42)
+    text = make_text(rng, 20)
+    script = CompiledScript.compile(text)
+    for step in range(1000):
+        # 反复输入不同的错拼单词再删掉，模拟实时编辑中的打字错误
+        position = rng.randint(0, len(text))
+        typo = f' typo{step} '
+        script = script.reparse(text[:position] + typo + text[position:])
+        script = script.reparse(text)
+        
+        counts = [0] * len(script.vocabulary)
+        for token in script.tokens:
+            counts[token] += 1
+        assert list(script.references) == counts
+        assert script.references.count(0) <= len(script.vocabulary) * CompiledScript.ORPHAN_RATIO
+    assert snapshot(script) == snapshot(CompiledScript.compile(text))
+
+
+@pytest.mark.parametrize('old, new', [
+    ('', 'Hello world.'),
+    ('Hello world.', ''),
+    ('Hello world.', 'Hello world.'),
+    ('  One. Two. Three.  ', 'One. Two.Three.'),
+    ('One. Two. Three.', 'One. Two. Three. Four.'),
+    ('One. Two. Three.', 'Zero. One. Two. Three.'),
+])
+def test_reparse_edge_cases(old, new):
+    """空文案、首尾空白、句首句尾的增删"""
+    script = CompiledScript.compile(old).reparse(new)
+    assert snapshot(script) == snapshot(CompiledScript.compile(new))
+
+
+def test_common_prefix_and_suffix_across_blocks(monkeypatch):
+    """分块比较后的二分只比较未确认的部分，结果与逐字符比较一致"""
+    monkeypatch.setattr(CompiledScript, 'COMPARE_BLOCK', 8)
+    rng = random.Random(3)
+    
+    def naive(a, b):
+        length = 0
+        while length < min(len(a), len(b)) and a[length] == b[length]:
+            length += 1
+        return length
+    
+    for _ in range(2000):
+        a = ''.join(rng.choice('ab') for _ in range(rng.randrange(60)))
+        cut = rng.randint(0, len(a))
+        b = a[:cut] + ''.join(rng.choice('ab') for _ in range(rng.randrange(4))) + a[rng.randint(cut, len(a)):]
+        prefix = naive(a, b)
+        assert CompiledScript._common_prefix(a, b) == prefix
+        limit = min(len(a), len(b)) - prefix
+        assert CompiledScript._common_suffix(a, b, limit) == min(limit, naive(a[::-1], b[::-1]))
+
+
+# =============================================================================
+# 编辑距离
+# =============================================================================
+def test_bounded_edit_distance_matches_full():
+    """距离不超过上限时与完整编辑距离相同，超过时返回上限+1"""
+    rng = random.Random(7)
+    for _ in range(3000):
+        a = ''.join(rng.choice('abcd') for _ in range(rng.randrange(10)))
+        b = ''.join(rng.choice('abcd') for _ in range(rng.randrange(10)))
+        limit = rng.randrange(4)
+        full = TextProcessor._edit_distance(a, b)
+        assert TextProcessor.bounded_edit_distance(a, b, limit) == min(full, limit + 1)
+
+
+@pytest.mark.parametrize('a, b, distance', [
+    ('', '', 0),
+    ('kitten', 'sitting', 3),
+    ('flaw', 'lawn', 2),
+    ('teleprompter', 'teleprompter', 0),
+    ('abc', '', 3),
+])
+def test_edit_distance_known_values(a, b, distance):
+    assert TextProcessor._edit_distance(a, b) == distance
+    assert TextProcessor.bounded_edit_distance(a, b, 5) == distance
+
+
+# =============================================================================
+# 发音键只提供候选，不单独作为匹配依据
+# =============================================================================
+@pytest.mark.parametrize('keyword, heard', [
+    ('right', 'rate'), ('right', 'route'), ('write', 'route'), ('wrote', 'right'),
+    ('night', 'note'), ('knit', 'night'), ('note', 'knit'),
+])
+def test_same_phonetic_key_is_not_a_match(keyword, heard):
+    """发音键相同但拼写相差较远的单词不算匹配"""
+    assert TextProcessor.phonetic_key(keyword) == TextProcessor.phonetic_key(heard)
+    assert not TextProcessor.matcher.match(keyword, heard)
+    assert not TextProcessor.match_keywords(heard, [keyword])
+
+
+def test_aligner_ignores_phonetic_false_hits():
+    """发音键相同的识别词不会把朗读位置带到别的句子"""
+    script = TextProcessor.compile_script(
+        'Welcome to the annual meeting. Please note the schedule tonight. '
+        'The route downtown is closed. We will write the report later.')
+    aligner = ScriptAligner(script)
+    for word in ['welcome', 'annual', 'meeting', 'right', 'rate', 'night', 'knit']:
+        aligner.update([word])
+    assert aligner.sentence_index == 1
+    # 拼写接近的识别错误仍能匹配
+    assert TextProcessor.matcher.match('schedule', 'schedul')
+    assert TextProcessor.matcher.match('write', 'wrote')
@@ -0,0 +1,1428 @@
+# -*- coding: utf-8 -*-
+"""
+===============================================================================
+文本处理与匹配 - English Teleprompter
+===============================================================================
+本模块只包含纯Python的文本处理逻辑，不依赖Kivy，
+可以在后台线程或无界面的环境中直接使用。
+
+- TextProcessor：句子拆分、关键词提取、发音键、模糊匹配
+- CompiledScript：编译后的文案（驻留词表 + 整数单词编号的扁平数组）
+- ScriptAligner：全文流式对齐（跨句子跟踪朗读位置）
+- RecognitionWindow：最近识别单词的定长滑动窗口（增量维护的单词多重集）
+- KeywordIndex：关键词倒排索引（TF-IDF打分，偏离文案后快速重新定位）
+- FuzzyMatcher：带缓存的有界模糊匹配（识别结果容错）
+===============================================================================
+"""
+
+import re
+import math
+from array import array
+from bisect import bisect_left
+from collections import deque, OrderedDict, Counter
+from functools import lru_cache
+
+
+# =============================================================================
+# 模糊匹配器
+# =============================================================================
+class FuzzyMatcher:
+    """
+    带缓存的有界模糊匹配器
+    
+    功能：
+    - 有界编辑距离：只计算带状区域，超过max_distance立即退出
+    - 长度分桶：只和长度相差不超过max_distance的单词比较
+    - 发音键只用于哈希查找候选词（见ScriptAligner._candidates），不单独作为匹配依据：
+      发音键去掉了元音，rate/right/route会得到同一个键，仍须满足编辑距离上限
+    - LRU缓存：(关键词, 识别词) 的比较结果在整个会话中复用
+    
+    同一段文案反复朗读时，绝大多数比较都能直接命中缓存
+    """
+    
+    def __init__(self, max_distance=2, min_length=4, cache_size=50000):
+        """
+        初始化匹配器
+        
+        参数：
+            max_distance: 最大允许编辑距离
+            min_length: 短于该长度的单词要求完全匹配
+            cache_size: LRU缓存的最大条目数
+        """
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.cache_size = cache_size
+        self._cache = OrderedDict()   # (关键词, 识别词) -> 是否匹配
+        self.hits = 0                 # 缓存命中次数
+        self.misses = 0               # 缓存未命中次数
+    
+    @staticmethod
+    def bucket(words):
+        """
+        按单词长度分桶
+        
+        参数：
+            words: 单词集合
+            
+        返回：
+            {长度: [单词]}
+        """
+        buckets = {}
+        for word in words:
+            buckets.setdefault(len(word), []).append(word)
+        return buckets
+    
+    def match(self, keyword, heard):
+        """
+        判断识别词是否与关键词模糊匹配
+        
+        参数：
+            keyword: 文案中的关键词
+            heard: 识别到的单词
+            
+        返回：
+            是否匹配
+        """
+        if keyword == heard:
+            return True
+        if abs(len(keyword) - len(heard)) > self.max_distance:
+            return False
+        if len(keyword) < self.min_length or len(heard) < self.min_length:
+            # 短单词要求完全匹配
+            return False
+        
+        key = (keyword, heard)
+        cache = self._cache
+        result = cache.get(key)
+        if result is not None:
+            self.hits += 1
+            cache.move_to_end(key)
+            return result
+        
+        self.misses += 1
+        result = TextProcessor.bounded_edit_distance(
+            keyword, heard, self.max_distance) <= self.max_distance
+        cache[key] = result
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return result
+    
+    def match_any(self, keyword, buckets):
+        """
+        判断关键词是否与任一识别词模糊匹配
+        
+        参数：
+            keyword: 文案中的关键词
+            buckets: bucket()返回的识别词分桶
+            
+        返回：
+            是否匹配
+        """
+        length = len(keyword)
+        for size in range(length - self.max_distance, length + self.max_distance + 1):
+            for heard in buckets.get(size, ()):
+                if self.match(keyword, heard):
+                    return True
+        return False
+    
+    def clear(self):
+        """清空缓存"""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+# =============================================================================
+# 文本处理工具类
+# =============================================================================
+class TextProcessor:
+    """
+    文本处理工具类
+    
+    功能：
+    - 将文本拆分为句子
+    - 提取每句的关键词（用于匹配）
+    - 容错处理（忽略标点、大小写，容忍拼写错误）
+    """
+    
+    # 会话级共享的模糊匹配器（缓存在整个会话中复用）
+    matcher = FuzzyMatcher()
+    
+    # 句子分隔：句号、问号、感叹号之后的空白
+    SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+    
+    # 单词（只保留字母）
+    WORD = re.compile(r'[a-zA-Z]+')
+    
+    # 语音识别语法中的单词（小写，保留don't这类缩写）
+    GRAMMAR_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+    
+    # 常见英文停用词列表
+    STOP_WORDS = frozenset({
+        'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been',
+        'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+        'would', 'could', 'should', 'may', 'might', 'must', 'shall',
+        'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in',
+        'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into',
+        'through', 'during', 'before', 'after', 'above', 'below',
+        'between', 'under', 'again', 'further', 'then', 'once',
+        'here', 'there', 'when', 'where', 'why', 'how', 'all',
+        'each', 'few', 'more', 'most', 'other', 'some', 'such',
+        'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than',
+        'too', 'very', 'just', 'and', 'but', 'if', 'or', 'because',
+        'until', 'while', 'although', 'though', 'this', 'that',
+        'these', 'those', 'it', 'its', 'i', 'you', 'he', 'she',
+        'we', 'they', 'my', 'your', 'his', 'her', 'our', 'their'
+    })
+    
+    @staticmethod
+    def split_sentences(text):
+        """
+        将文本拆分为句子列表
+        
+        参数：
+            text: 原始文本
+            
+        返回：
+            句子列表 [{"text": "原句", "keywords": ["关键词"], "phonetic": ["发音键"]}]
+        """
+        if not text:
+            return []
+        
+        # 使用正则表达式按句子结束符拆分
+        # 保留句号、问号、感叹号作为分隔
+        sentences = TextProcessor.SENTENCE_BREAK.split(text.strip())
+        
+        result = []
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if sentence:
+                keywords = TextProcessor.extract_keywords(sentence)
+                result.append({
+                    'text': sentence,
+                    'keywords': keywords,
+                    'phonetic': [TextProcessor.phonetic_key(kw) for kw in keywords]
+                })
+        
+        return result
+    
+    @staticmethod
+    def compile_script(text):
+        """
+        将文本编译为CompiledScript（拆分规则与split_sentences()相同）
+        
+        长文案占用的内存只有字典列表的一小部分，匹配时直接使用整数单词编号
+        
+        参数：
+            text: 原始文本
+            
+        返回：
+            CompiledScript对象（可当作句子列表使用）
+        """
+        return CompiledScript.compile(text)
+    
+    @staticmethod
+    def build_index(sentences):
+        """
+        为拆分后的句子建立关键词倒排索引
+        
+        参数：
+            sentences: split_sentences()返回的句子列表，或CompiledScript
+            
+        返回：
+            KeywordIndex对象
+        """
+        return KeywordIndex(sentences)
+    
+    @staticmethod
+    def script_vocabulary(sentences):
+        """
+        提取文案中出现的全部单词（用于构建语音识别语法）
+        
+        参数：
+            sentences: split_sentences()返回的句子列表
+            
+        返回：
+            排序后的小写单词列表（保留don't这类缩写）
+        """
+        if isinstance(sentences, CompiledScript):
+            return sentences.grammar_vocabulary()
+        
+        vocabulary = set()
+        for sentence in sentences:
+            vocabulary.update(TextProcessor.GRAMMAR_WORD.findall(sentence['text'].lower()))
+        return sorted(vocabulary)
+    
+    @staticmethod
+    def extract_keywords(sentence):
+        """
+        从句子中提取关键词
+        
+        规则：
+        - 移除常见停用词（a, the, is, are等）
+        - 提取长度>=3的单词
+        - 转为小写便于匹配
+        
+        参数：
+            sentence: 句子文本
+            
+        返回：
+            关键词列表
+        """
+        stop_words = TextProcessor.STOP_WORDS
+        
+        # 提取单词（只保留字母）
+        words = TextProcessor.WORD.findall(sentence)
+        
+        # 过滤：移除停用词，保留长度>=3的单词
+        keywords = [
+            word
+            for word in map(str.lower, words)
+            if len(word) >= 3 and word not in stop_words
+        ]
+        
+        return keywords
+    
+    @staticmethod
+    def keyword_ends(sentence):
+        """
+        每个关键词在句子中的结束位置（与extract_keywords()的关键词一一对应）
+        
+        用于高亮已读部分：读到第k个关键词时，高亮 sentence[:ends[k - 1]]
+        
+        参数：
+            sentence: 句子文本
+            
+        返回：
+            字符位置列表
+        """
+        stop_words = TextProcessor.STOP_WORDS
+        return [
+            match.end()
+            for match in TextProcessor.WORD.finditer(sentence)
+            if len(match.group()) >= 3 and match.group().lower() not in stop_words
+        ]
+    
+    @staticmethod
+    def match_keywords(recognized_text, target_keywords, threshold=0.5, target_phonetic=None):
+        """
+        检查识别文本是否匹配目标关键词
+        
+        参数：
+            recognized_text: 语音识别结果
+            target_keywords: 目标句子的关键词列表
+            threshold: 匹配阈值（匹配到的关键词比例）
+            target_phonetic: 目标关键词的发音键（句子的'phonetic'字段，解析时已算好）；
+                为None时现场计算
+            
+        返回：
+            是否匹配成功
+        """
+        if not target_keywords:
+            return False
+            
+        # 提取识别文本中的单词
+        recognized_words = set(map(str.lower, TextProcessor.WORD.findall(recognized_text)))
+        
+        # 识别词按发音键分组：发音相同的词优先比较（仍须通过模糊匹配）
+        phonetic_key = TextProcessor.phonetic_key
+        recognized_keys = {}
+        for word in recognized_words:
+            if len(word) >= TextProcessor.matcher.min_length:
+                recognized_keys.setdefault(phonetic_key(word), []).append(word)
+        
+        # 按长度分桶，模糊匹配时只比较长度相近的单词
+        matcher = TextProcessor.matcher
+        buckets = FuzzyMatcher.bucket(recognized_words)
+        
+        if target_phonetic is None:
+            target_phonetic = [phonetic_key(kw) for kw in target_keywords]
+        
+        # 计算匹配的关键词数量
+        matched = sum(
+            1 for kw, key in zip(target_keywords, target_phonetic)
+            if kw in recognized_words
+               or any(matcher.match(kw, heard) for heard in recognized_keys.get(key, ()))
+               or matcher.match_any(kw, buckets)
+        )
+        
+        # 计算匹配率
+        match_ratio = matched / len(target_keywords)
+        
+        return match_ratio >= threshold
+    
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def phonetic_key(word):
+        """
+        计算单词的发音键（简化版Metaphone算法）
+        
+        发音相近的单词得到相同的键，例如：
+        right/write -> RT，night/knight -> NT，phone/fone -> FN
+        
+        参数：
+            word: 小写单词
+            
+        返回：
+            发音键（大写字母串）
+        """
+        word = re.sub(r'[^a-z]', '', word.lower())
+        if not word:
+            return ''
+        
+        # 词首的特殊组合
+        if word[:2] in ('kn', 'gn', 'pn', 'ae', 'wr'):
+            word = word[1:]
+        elif word[0] == 'x':
+            word = 's' + word[1:]
+        elif word[:2] == 'wh':
+            word = 'w' + word[2:]
+        
+        vowels = 'aeiou'
+        key = []
+        length = len(word)
+        for i, c in enumerate(word):
+            prev = word[i - 1] if i > 0 else ''
+            next1 = word[i + 1] if i + 1 < length else ''
+            next2 = word[i + 2] if i + 2 < length else ''
+            
+            # 重复字母只算一次（c除外）
+            if c == prev and c != 'c':
+                continue
+            
+            if c in vowels:
+                if i == 0:
+                    key.append('A')
+            elif c == 'b':
+                if not (prev == 'm' and i == length - 1):
+                    key.append('B')
+            elif c == 'c':
+                if next1 == 'i' and next2 == 'a' or next1 == 'h':
+                    key.append('K' if prev == 's' else 'X')
+                elif next1 in 'iey' and next1:
+                    if prev != 's':
+                        key.append('S')
+                else:
+                    key.append('K')
+            elif c == 'd':
+                if next1 == 'g' and next2 and next2 in 'eiy':
+                    key.append('J')
+                else:
+                    key.append('T')
+            elif c == 'g':
+                if next1 == 'h' and not (next2 and next2 in vowels):
+                    continue                        # night, though
+                if next1 == 'n' and (i + 2 == length or word[i + 2:] == 'ed'):
+                    continue                        # sign, signed
+                if prev == 'd' and next1 and next1 in 'eiy':
+                    continue                        # edge（已记为J）
+                key.append('J' if next1 and next1 in 'eiy' else 'K')
+            elif c == 'h':
+                if prev and prev in 'cgpst':
+                    continue                        # ch/gh/ph/sh/th已处理
+                if next1 and next1 in vowels:
+                    key.append('H')
+            elif c == 'k':
+                if prev != 'c':
+                    key.append('K')
+            elif c == 'p':
+                key.append('F' if next1 == 'h' else 'P')
+            elif c == 'q':
+                key.append('K')
+            elif c == 's':
+                if next1 == 'h' or (next1 == 'i' and next2 in ('o', 'a')):
+                    key.append('X')
+                else:
+                    key.append('S')
+            elif c == 't':
+                if next1 == 'i' and next2 in ('o', 'a'):
+                    key.append('X')
+                elif next1 == 'h':
+                    key.append('0')                 # th
+                elif not (next1 == 'c' and next2 == 'h'):
+                    key.append('T')
+            elif c == 'v':
+                key.append('F')
+            elif c in 'wy':
+                if next1 and next1 in vowels:
+                    key.append(c.upper())
+            elif c == 'x':
+                key.append('KS')
+            elif c == 'z':
+                key.append('S')
+            else:
+                key.append(c.upper())
+        
+        return ''.join(key)
+    
+    @staticmethod
+    def fuzzy_match(word1, word2, max_distance=2):
+        """
+        模糊匹配两个单词（容忍拼写错误）
+        
+        使用有界编辑距离算法，允许最多max_distance个字符的差异
+        
+        参数：
+            word1, word2: 待比较的单词
+            max_distance: 最大允许编辑距离
+            
+        返回：
+            是否匹配
+        """
+        if abs(len(word1) - len(word2)) > max_distance:
+            return False
+            
+        # 简化的编辑距离计算
+        if len(word1) < 4 or len(word2) < 4:
+            # 短单词要求完全匹配
+            return word1 == word2
+        
+        # 计算有界编辑距离（超过max_distance立即退出）
+        distance = TextProcessor.bounded_edit_distance(word1, word2, max_distance)
+        return distance <= max_distance
+    
+    @staticmethod
+    def bounded_edit_distance(s1, s2, max_distance):
+        """
+        计算有界编辑距离
+        
+        只计算DP表中对角线附近宽度为max_distance的带状区域，
+        某一行的最小值超过max_distance时提前退出
+        
+        参数：
+            s1, s2: 待比较的字符串
+            max_distance: 距离上限
+            
+        返回：
+            编辑距离；超过上限时返回max_distance + 1
+        """
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+        
+        too_far = max_distance + 1
+        len1, len2 = len(s1), len(s2)
+        if len1 - len2 > max_distance:
+            return too_far
+        if len2 == 0:
+            return len1
+        
+        previous_row = [min(j, too_far) for j in range(len2 + 1)]
+        for i in range(1, len1 + 1):
+            low = max(1, i - max_distance)
+            high = min(len2, i + max_distance)
+            current_row = [too_far] * (len2 + 1)
+            current_row[0] = min(i, too_far)
+            row_min = current_row[0] if low == 1 else too_far
+            c1 = s1[i - 1]
+            for j in range(low, high + 1):
+                distance = min(
+                    previous_row[j] + 1,                        # 插入
+                    current_row[j - 1] + 1,                     # 删除
+                    previous_row[j - 1] + (c1 != s2[j - 1])     # 替换
+                )
+                current_row[j] = distance
+                if distance < row_min:
+                    row_min = distance
+            if row_min > max_distance:
+                return too_far
+            previous_row = current_row
+        
+        return min(previous_row[len2], too_far)
+    
+    @staticmethod
+    def _edit_distance(s1, s2):
+        """计算两个字符串的编辑距离（Levenshtein距离）"""
+        if len(s1) < len(s2):
+            return TextProcessor._edit_distance(s2, s1)
+        
+        if len(s2) == 0:
+            return len(s1)
+        
+        previous_row = range(len(s2) + 1)
+        for i, c1 in enumerate(s1):
+            current_row = [i + 1]
+            for j, c2 in enumerate(s2):
+                insertions = previous_row[j + 1] + 1
+                deletions = current_row[j] + 1
+                substitutions = previous_row[j] + (c1 != c2)
+                current_row.append(min(insertions, deletions, substitutions))
+            previous_row = current_row
+        
+        return previous_row[-1]
+
+# =============================================================================
+# 编译后的文案
+# =============================================================================
+class SentenceRecord:
+    """
+    编译后文案中的一句（只保存所属文案和句子序号）
+    
+    文本、关键词、发音键都从CompiledScript的扁平数组中按偏移量取出；
+    兼容旧的字典写法：record['text']、record['keywords']、record.get('phonetic')
+    """
+    
+    __slots__ = ('script', 'index')
+    
+    FIELDS = ('text', 'keywords', 'phonetic')
+    
+    def __init__(self, script, index):
+        self.script = script
+        self.index = index
+    
+    @property
+    def text(self):
+        """句子原文"""
+        offsets = self.script.char_offsets
+        return self.script.text[offsets[2 * self.index]:offsets[2 * self.index + 1]]
+    
+    @property
+    def token_ids(self):
+        """关键词的单词编号（array切片）"""
+        return self.script.sentence_tokens(self.index)
+    
+    @property
+    def keywords(self):
+        """关键词列表（驻留后的字符串，与其他句子共用同一对象）"""
+        vocabulary = self.script.vocabulary
+        return [vocabulary[token] for token in self.token_ids]
+    
+    @property
+    def phonetic(self):
+        """关键词的发音键列表"""
+        phonetic = self.script.phonetic
+        return [phonetic[token] for token in self.token_ids]
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key, default=None):
+        """兼容dict.get()"""
+        return getattr(self, key) if key in self.FIELDS else default
+    
+    def __repr__(self):
+        return f'SentenceRecord({self.index}, {self.text[:40]!r})'
+
+
+class CompiledScript:
+    """
+    编译后的文案
+    
+    与split_sentences()的字典列表相比：
+    - 词表驻留：每个不同的关键词只保存一份字符串，发音键按单词编号只算一次
+    - 每句的关键词存为整数单词编号，全部句子连成一个扁平的array('i')，
+      token_offsets[i]:token_offsets[i + 1] 即第i句的关键词
+    - 句子原文不单独保存，用char_offsets记录在全文中的起止位置
+    - 句子记录使用__slots__，只有两个字段
+    
+    可以像句子列表一样使用：len()、下标、遍历，句子记录兼容 ['text'] 写法；
+    ScriptAligner和KeywordIndex直接在单词编号上工作
+    """
+    
+    # 实时编辑后没有句子引用的单词超过词表的这个比例时，整篇重新编译以压缩词表
+    ORPHAN_RATIO = 0.25
+    
+    def __init__(self, text, char_offsets, tokens, token_offsets, vocabulary, phonetic=None,
+                 references=None):
+        """
+        参数：
+            text: 文案全文
+            char_offsets: 每句在全文中的 [起点, 终点] 依次排列（array('i')，长度为句子数×2）
+            tokens: 所有句子的关键词编号（array('i')）
+            token_offsets: 每句关键词在tokens中的起点，末尾多一项总长度（array('i')）
+            vocabulary: 单词编号 -> 关键词
+            phonetic: 单词编号 -> 发音键（省略时按词表计算）
+            references: 单词编号 -> 在tokens中出现的次数（array('i')，省略时统计）
+        """
+        self.text = text
+        self.char_offsets = char_offsets
+        self.tokens = tokens
+        self.token_offsets = token_offsets
+        self.vocabulary = vocabulary
+        if phonetic is None:
+            phonetic_key = TextProcessor.phonetic_key
+            phonetic = [phonetic_key(word) for word in vocabulary]
+        self.phonetic = phonetic
+        if references is None:
+            references = array('i', [0]) * len(vocabulary)
+            for token in tokens:
+                references[token] += 1
+        self.references = references
+        self._grammar_vocabulary = None
+        self._build_lookups()
+    
+    def _build_lookups(self):
+        """建立单词编号查找表和句子记录（可由其余字段重建，不参与序列化）"""
+        self.word_ids = {word: token for token, word in enumerate(self.vocabulary)}
+        self.sentences = [SentenceRecord(self, i) for i in range(len(self.token_offsets) - 1)]
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['word_ids']
+        del state['sentences']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_lookups()
+    
+    @classmethod
+    def compile(cls, text):
+        """
+        编译文案（拆分规则与split_sentences()完全一致）
+        
+        参数：
+            text: 原始文本
+            
+        返回：
+            CompiledScript对象
+        """
+        text = text or ''
+        start = len(text) - len(text.lstrip())
+        end = len(text.rstrip())
+        
+        char_offsets = array('i')
+        tokens = array('i')
+        token_offsets = array('i', [0])
+        vocabulary = []
+        cls._compile_range(text, start, end, char_offsets, tokens, token_offsets,
+                           vocabulary, {})
+        return cls(text, char_offsets, tokens, token_offsets, vocabulary)
+    
+    @staticmethod
+    def _compile_range(text, start, end, char_offsets, tokens, token_offsets, vocabulary, word_ids):
+        """
+        拆分text[start:end]中的句子并提取关键词，追加到各数组末尾
+        
+        start/end须位于句子边界上（start处不是空白）；新出现的关键词追加到词表
+        """
+        # 句子在全文中的位置：按句末标点后的空白切开
+        spans = []
+        if start < end:
+            for boundary in TextProcessor.SENTENCE_BREAK.finditer(text, start, end):
+                spans.append((start, boundary.start()))
+                start = boundary.end()
+            spans.append((start, end))
+        
+        extract = TextProcessor.extract_keywords
+        for begin, finish in spans:
+            char_offsets.append(begin)
+            char_offsets.append(finish)
+            for word in extract(text[begin:finish]):
+                token = word_ids.get(word)
+                if token is None:
+                    token = word_ids[word] = len(vocabulary)
+                    vocabulary.append(word)
+                tokens.append(token)
+            token_offsets.append(len(tokens))
+    
+    def reparse(self, text):
+        """
+        按修改后的全文重新编译，只重新拆分编辑位置附近的句子
+        
+        比较新旧全文的公共前缀和后缀，找出被修改的字符范围；
+        与该范围有交集的句子重新拆分、提取关键词，其余句子的位置和
+        关键词编号直接沿用（后面的句子只平移偏移量）。
+        结果与compile(text)的句子完全一致；删除的单词暂时留在词表中
+        （没有句子引用，不影响匹配），这类单词超过词表的ORPHAN_RATIO时
+        改为整篇重新编译，词表不会随着反复编辑无限增长
+        
+        参数：
+            text: 修改后的全文
+            
+        返回：
+            新的CompiledScript（原对象不变，可继续被对齐器等使用）
+        """
+        old = self.text
+        if text == old:
+            return self
+        count = len(self)
+        if not count or not text:
+            return CompiledScript.compile(text)
+        
+        prefix = self._common_prefix(old, text)
+        suffix = self._common_suffix(old, text, min(len(old), len(text)) - prefix)
+        changed_end = len(old) - suffix   # 旧全文中被修改范围的终点
+        delta = len(text) - len(old)
+        char_offsets = self.char_offsets
+        
+        # 第一个需要重新拆分的句子：起点在修改位置之前的最后一句
+        # （起点字符未变，且之前的句子和句间空白都未变）
+        before = bisect_left(char_offsets, prefix, 0, count * 2)  # 小于prefix的偏移量个数
+        first = max(0, (before - 1) // 2)
+        if first == 0:
+            start = len(text) - len(text.lstrip())
+        else:
+            start = char_offsets[2 * first]
+        
+        # 最后一个需要重新拆分的句子：最后一个字符在修改范围之后的第一句
+        # （其后的句间空白及之后的句子都未变，只是整体平移delta）
+        last = first
+        while last < count and char_offsets[2 * last + 1] <= changed_end:
+            last += 1
+        if last >= count - 1:
+            last = count - 1
+            end = len(text.rstrip())
+        else:
+            end = char_offsets[2 * last + 1] + delta
+        
+        tokens = self.tokens
+        token_offsets = self.token_offsets
+        tail_tokens = token_offsets[last + 1]
+        
+        # 编辑位置之前的句子原样保留
+        new_char_offsets = char_offsets[:2 * first]
+        new_tokens = tokens[:token_offsets[first]]
+        new_token_offsets = token_offsets[:first + 1]
+        vocabulary = list(self.vocabulary)
+        self._compile_range(text, start, end, new_char_offsets, new_tokens, new_token_offsets,
+                            vocabulary, dict(self.word_ids))
+        
+        # 更新单词引用计数：减去重新拆分前这几句的关键词，加上拆分后的
+        references = array('i', self.references)
+        references.extend(array('i', [0]) * (len(vocabulary) - len(self.vocabulary)))
+        for token in tokens[token_offsets[first]:tail_tokens]:
+            references[token] -= 1
+        for token in new_tokens[token_offsets[first]:]:
+            references[token] += 1
+        if references.count(0) > len(vocabulary) * self.ORPHAN_RATIO:
+            return CompiledScript.compile(text)
+        
+        # 编辑位置之后的句子：关键词不变，偏移量平移
+        token_shift = len(new_tokens) - tail_tokens
+        new_char_offsets.extend(offset + delta for offset in char_offsets[2 * (last + 1):2 * count])
+        new_tokens.extend(tokens[tail_tokens:])
+        new_token_offsets.extend(offset + token_shift for offset in token_offsets[last + 2:])
+        
+        phonetic_key = TextProcessor.phonetic_key
+        phonetic = self.phonetic + [phonetic_key(word) for word in vocabulary[len(self.vocabulary):]]
+        return CompiledScript(text, new_char_offsets, new_tokens, new_token_offsets,
+                              vocabulary, phonetic, references)
+    
+    @classmethod
+    def from_sentences(cls, sentences):
+        """
+        从句子列表编译（已是CompiledScript时直接返回）
+        
+        参数：
+            sentences: split_sentences()返回的字典列表，或CompiledScript
+        """
+        if isinstance(sentences, cls):
+            return sentences
+        
+        # 句子逐行拼接成全文，关键词沿用字典中已提取好的
+        text = '\n'.join(sentence['text'] for sentence in sentences)
+        char_offsets = array('i')
+        tokens = array('i')
+        token_offsets = array('i', [0])
+        vocabulary = []
+        word_ids = {}
+        position = 0
+        for sentence in sentences:
+            char_offsets.append(position)
+            position += len(sentence['text'])
+            char_offsets.append(position)
+            position += 1
+            for word in sentence['keywords']:
+                token = word_ids.get(word)
+                if token is None:
+                    token = word_ids[word] = len(vocabulary)
+                    vocabulary.append(word)
+                tokens.append(token)
+            token_offsets.append(len(tokens))
+        
+        return cls(text, char_offsets, tokens, token_offsets, vocabulary)
+    
+    COMPARE_BLOCK = 4096  # 求公共前缀/后缀时每次比较的字符数
+    
+    @staticmethod
+    def _common_prefix(a, b):
+        """公共前缀长度（先按块比较，再在不同的块内二分）"""
+        limit = min(len(a), len(b))
+        block = CompiledScript.COMPARE_BLOCK
+        low = 0
+        while low + block <= limit and a[low:low + block] == b[low:low + block]:
+            low += block
+        high = min(limit, low + block)
+        # a[:low]与b[:low]已知相同，每步只比较新增的[low:middle]部分
+        while low < high:
+            middle = (low + high + 1) // 2
+            if a[low:middle] == b[low:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+    
+    @staticmethod
+    def _common_suffix(a, b, limit):
+        """公共后缀长度（不超过limit）"""
+        block = CompiledScript.COMPARE_BLOCK
+        len_a, len_b = len(a), len(b)
+        low = 0
+        while (low + block <= limit
+               and a[len_a - low - block:len_a - low] == b[len_b - low - block:len_b - low]):
+            low += block
+        high = min(limit, low + block)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if a[len_a - middle:len_a - low] == b[len_b - middle:len_b - low]:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+    
+    def grammar_vocabulary(self):
+        """
+        文案中出现的全部单词（用于构建语音识别语法，计算一次后缓存）
+        
+        返回：
+            排序后的小写单词列表（保留don't这类缩写）
+        """
+        if self._grammar_vocabulary is None:
+            words = TextProcessor.GRAMMAR_WORD.findall(self.text.lower())
+            self._grammar_vocabulary = sorted(set(words))
+        return self._grammar_vocabulary
+    
+    def sentence_tokens(self, index):
+        """第index句的关键词编号"""
+        return self.tokens[self.token_offsets[index]:self.token_offsets[index + 1]]
+    
+    def token_id(self, word):
+        """关键词的编号，不在词表中时返回-1"""
+        return self.word_ids.get(word, -1)
+    
+    def __len__(self):
+        return len(self.sentences)
+    
+    def __getitem__(self, index):
+        return self.sentences[index]
+    
+    def __iter__(self):
+        return iter(self.sentences)
+
+# =============================================================================
+# 最近识别单词的滑动窗口
+# =============================================================================
+class RecognitionWindow:
+    """
+    最近识别到的单词（定长滑动窗口）
+    
+    - 单词按extract_keywords()规范化（小写、去停用词）后放入定长deque，
+      超出长度时淘汰最旧的单词，同时增量维护单词计数（多重集）
+    - 另外保留一段定长的原文末尾，供界面显示
+    
+    长时间偏离文案也不会无限增长，每次追加和查询的开销只与窗口大小有关
+    """
+    
+    def __init__(self, max_words=64, max_chars=100):
+        """
+        参数：
+            max_words: 窗口保留的单词数
+            max_chars: 保留的显示文字长度
+        """
+        self.max_chars = max_chars
+        self.words = deque(maxlen=max_words)
+        self.counts = Counter()     # 单词 -> 窗口中的出现次数
+        self.text = ''              # 最近识别原文的末尾（最多max_chars个字符）
+    
+    def append(self, word):
+        """追加一个已规范化的单词（窗口满时淘汰最旧的）"""
+        words = self.words
+        if len(words) == words.maxlen:
+            oldest = words[0]
+            remaining = self.counts[oldest] - 1
+            if remaining:
+                self.counts[oldest] = remaining
+            else:
+                del self.counts[oldest]
+        words.append(word)
+        self.counts[word] += 1
+    
+    def extend(self, words):
+        """追加多个已规范化的单词"""
+        for word in words:
+            self.append(word)
+    
+    def add_text(self, text):
+        """
+        追加一段识别结果
+        
+        返回：
+            新增的单词列表
+        """
+        words = TextProcessor.extract_keywords(text)
+        self.extend(words)
+        self.text = self.preview(text)
+        return words
+    
+    def preview(self, partial):
+        """显示用文字：已有原文末尾加上尚未确认的部分结果（不修改窗口）"""
+        if not partial:
+            return self.text
+        combined = f'{self.text} {partial}' if self.text else partial
+        return combined[-self.max_chars:]
+    
+    def clear(self):
+        """清空窗口"""
+        self.words.clear()
+        self.counts.clear()
+        self.text = ''
+    
+    def __contains__(self, word):
+        return word in self.counts
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def __iter__(self):
+        return iter(self.words)
+
+# =============================================================================
+# 全文流式对齐器
+# =============================================================================
+class ScriptAligner:
+    """
+    全文流式对齐器
+    
+    功能：
+    - 把整篇文案的关键词展开成一个全文序列，跟踪当前朗读到的位置
+    - 每识别到新单词就增量更新位置，只在当前位置附近的窗口内查找
+    - 跳读、漏读、即兴发挥时可以一次前进多句，无需手动翻页
+    
+    原理：
+    - 维护若干条"连续匹配链"：识别到的单词依次命中全文序列中相邻的位置
+    - 命中当前位置附近的单词直接接受；跳到较远位置需要连续命中min_run个词
+    - 每个新单词的处理代价只与窗口大小有关，总耗时与新单词数量成线性关系
+    
+    部分结果（边说边识别）：
+    - feed_partial()基于本句话开始前的已确认状态做试探性对齐
+    - 试探位置连续stable_partials次达到同一句后才前进（迟滞），且一句话内不回退
+    - 最终结果到达时，feed_text()从已确认状态重新对齐，修正部分结果的偏差
+    """
+    
+    def __init__(self, sentences, lookbehind=8, lookahead=40,
+                 min_run=2, max_gap=2, advance_ratio=0.7,
+                 index=None, relocate_after=6, relocate_score=0.35,
+                 stable_partials=2):
+        """
+        初始化对齐器
+        
+        参数：
+            sentences: CompiledScript，或TextProcessor.split_sentences()返回的句子列表
+            lookbehind: 当前位置之前的搜索窗口（关键词个数）
+            lookahead: 当前位置之后的搜索窗口（关键词个数）
+            min_run: 跳转到远处位置所需的最少连续命中词数
+            max_gap: 匹配链允许中断的最多单词数（容忍漏识别/插入词）
+            advance_ratio: 当前句读完多少比例的关键词后切换到下一句
+            index: 关键词倒排索引（KeywordIndex），为None时不做全文重新定位
+            relocate_after: 连续多少个词未能对齐时，用倒排索引重新定位
+            relocate_score: 重新定位所需的最低相似度（0-1）
+            stable_partials: 部分结果需连续几次指向同一句才前进
+        """
+        self.lookbehind = lookbehind
+        self.lookahead = lookahead
+        self.min_run = min_run
+        self.max_gap = max_gap
+        self.advance_ratio = advance_ratio
+        self.index = index
+        self.relocate_after = relocate_after
+        self.relocate_score = relocate_score
+        self.stable_partials = stable_partials
+        
+        script = CompiledScript.from_sentences(sentences)
+        self.script = script
+        self.words = script.tokens                  # 全文关键词序列（单词编号）
+        self.vocabulary = script.vocabulary         # 单词编号 -> 关键词
+        self.sentence_start = script.token_offsets  # 每句第一个关键词在全文序列中的位置
+        self.sentence_total = len(script)
+        self.sentence_count = [                     # 每句的关键词数量
+            self.sentence_start[i + 1] - self.sentence_start[i]
+            for i in range(self.sentence_total)
+        ]
+        self.word_sentence = array('i')             # 每个关键词所属的句子索引
+        for index, count in enumerate(self.sentence_count):
+            self.word_sentence.extend([index] * count)
+        
+        self.positions = [[] for _ in self.vocabulary]  # 单词编号 -> 全文序列中的位置列表（升序）
+        self.phonetic_positions = {}  # 发音键 -> 全文序列中的位置列表（升序）
+        min_length = TextProcessor.matcher.min_length
+        for position, token in enumerate(self.words):
+            self.positions[token].append(position)
+            if len(self.vocabulary[token]) >= min_length:
+                self.phonetic_positions.setdefault(script.phonetic[token], []).append(position)
+        
+        self.reset()
+    
+    def reset(self, sentence_index=0):
+        """重置对齐状态到指定句子开头"""
+        self.sentence_index = 0
+        self.position = 0          # 下一个期望的关键词位置
+        self._runs = {}            # 匹配链：结束位置 -> (链长度, 连续未命中次数)
+        self._misses = 0           # 连续未能对齐的单词数
+        self._recent = RecognitionWindow(self.relocate_after * 2)  # 最近未能对齐的单词
+        self._committed = None     # 本句话开始前的已确认状态（有部分结果时）
+        self.matched = None        # 最近一次接受的全文位置（批量对齐时逐词读取）
+        self.matched_run = 0       # 接受该位置时匹配链的长度
+        if self.sentence_total:
+            self.seek(sentence_index)
+    
+    def seek(self, sentence_index):
+        """
+        跳转到指定句子（手动翻页时调用）
+        
+        参数：
+            sentence_index: 目标句子索引
+        """
+        if not self.sentence_total:
+            return
+        sentence_index = max(0, min(sentence_index, self.sentence_total - 1))
+        self.sentence_index = sentence_index
+        self.position = self.sentence_start[sentence_index]
+        self._runs = {}
+        self._misses = 0
+        self._recent.clear()
+        self._committed = None
+    
+    def spoken_count(self, sentence_index):
+        """
+        按当前朗读位置，第sentence_index句中已读到的关键词个数
+        
+        参数：
+            sentence_index: 句子索引
+        """
+        if not 0 <= sentence_index < self.sentence_total:
+            return 0
+        start = self.sentence_start[sentence_index]
+        end = start + self.sentence_count[sentence_index]
+        return max(0, min(self.position, end) - start)
+    
+    def feed_text(self, text):
+        """
+        输入一段完整识别文本（一句话的最终结果）
+        
+        如果这句话之前送入过部分结果，先回到已确认状态再对齐，
+        避免同一批单词被重复计算
+        
+        参数：
+            text: 语音识别结果
+            
+        返回：
+            当前句子索引
+        """
+        if self._committed is not None:
+            self._restore(self._committed[0])
+            self._committed = None
+        return self.update(TextProcessor.extract_keywords(text))
+    
+    def feed_partial(self, text):
+        """
+        输入一段部分识别结果（一句话尚未说完）
+        
+        部分结果会随着继续说话被改写，因此只做试探性对齐：
+        - 新结果是上次结果的延续时，只处理新增单词
+        - 否则从已确认状态重新对齐整段部分结果
+        - 试探出的句子需连续stable_partials次一致才返回，一句话内只前进不后退
+        
+        参数：
+            text: 部分识别结果
+            
+        返回：
+            应当显示的句子索引
+        """
+        words = TextProcessor.extract_keywords(text)
+        if self._committed is None:
+            # 一句话的第一个部分结果：记下已确认状态
+            # 格式：(已确认状态, 已处理的部分结果单词, 当前显示句子, 候选句子, 候选连续次数)
+            self._committed = [self._snapshot(), [], self.sentence_index, None, 0]
+        
+        committed = self._committed
+        previous = committed[1]
+        if words[:len(previous)] == previous:
+            self.update(words[len(previous):])
+        else:
+            self._restore(committed[0])
+            self.update(words)
+        committed[1] = words
+        
+        # 迟滞：候选句子需连续多次一致才前进，且不回退
+        tentative = self.sentence_index
+        if tentative > committed[2]:
+            if tentative == committed[3]:
+                committed[4] += 1
+            else:
+                committed[3], committed[4] = tentative, 1
+            if committed[4] >= self.stable_partials:
+                committed[2] = tentative
+        else:
+            committed[3], committed[4] = None, 0
+        return committed[2]
+    
+    def _snapshot(self):
+        """保存当前对齐状态"""
+        return (self.sentence_index, self.position, dict(self._runs),
+                self._misses, list(self._recent))
+    
+    def _restore(self, state):
+        """恢复_snapshot()保存的对齐状态"""
+        self.sentence_index, self.position, runs, self._misses, recent = state
+        self._runs = dict(runs)
+        self._recent.clear()
+        self._recent.extend(recent)
+    
+    def update(self, words):
+        """
+        按顺序输入新识别到的关键词，增量更新朗读位置
+        
+        参数：
+            words: 新识别到的关键词列表（小写）
+            
+        返回：
+            当前句子索引
+        """
+        for word in words:
+            self._step(word)
+        return self.sentence_index
+    
+    @staticmethod
+    def _in_window(positions, low, high):
+        """从升序位置列表中取出落在[low, high)内的部分"""
+        if not positions:
+            return []
+        return positions[bisect_left(positions, low):bisect_left(positions, high)]
+    
+    def _candidates(self, word, low, high):
+        """查找窗口[low, high)内与word匹配的全文位置"""
+        # 1. 完全相同（文案词表中的单词直接按编号查找）
+        token = self.script.word_ids.get(word)
+        if token is not None:
+            found = self._in_window(self.positions[token], low, high)
+            if found:
+                return found
+        
+        # 2. 发音相同（哈希查找）的位置作为候选，仍须通过模糊匹配
+        #    （发音键不含元音，rate/right/route的键相同）
+        matcher = TextProcessor.matcher
+        words, vocabulary = self.words, self.vocabulary
+        if len(word) >= matcher.min_length:
+            found = [
+                j for j in self._in_window(
+                    self.phonetic_positions.get(TextProcessor.phonetic_key(word)), low, high)
+                if matcher.match(vocabulary[words[j]], word)
+            ]
+            if found:
+                return found
+        
+        # 3. 都没有时，在窗口内做模糊匹配（结果带缓存）
+        return [
+            j for j in range(low, high)
+            if matcher.match(vocabulary[words[j]], word)
+        ]
+    
+    def _step(self, word):
+        """处理一个识别到的关键词"""
+        if not self.words:
+            return
+        
+        low = max(0, self.position - self.lookbehind)
+        high = min(len(self.words), self.position + self.lookahead)
+        candidates = self._candidates(word, low, high)
+        
+        # 延长已有匹配链或开启新链
+        runs = {}
+        for j in candidates:
+            length = 1
+            for k in range(j - 1 - self.max_gap, j):
+                run = self._runs.get(k)
+                if run and run[0] + 1 > length:
+                    length = run[0] + 1
+            runs[j] = (length, 0)
+        
+        # 未被延长的链记一次未命中，超过max_gap或离开窗口则丢弃
+        for end, (length, misses) in self._runs.items():
+            if end not in runs and misses < self.max_gap and low <= end < high:
+                runs[end] = (length, misses + 1)
+        self._runs = runs
+        
+        # 选出最可信的位置：链越长越好，同等长度取离当前位置最近的
+        best = None
+        for j in candidates:
+            length = runs[j][0]
+            if j < self.position:
+                # 回退（重读）需要更强的证据
+                accepted = length >= self.min_run + 1
+            elif j <= self.position + self.max_gap:
+                # 紧挨当前位置，单个词即可接受
+                accepted = True
+            else:
+                accepted = length >= self.min_run
+            if not accepted:
+                continue
+            key = (length, -abs(j - self.position))
+            if best is None or key > best[0]:
+                best = (key, j)
+        
+        if best is not None:
+            self.matched_run = best[0][0]
+            self._accept(best[1])
+            self._misses = 0
+            self._recent.clear()
+            return
+        
+        # 窗口内持续对不上：可能跳读很远或即兴发挥，用倒排索引全文重新定位
+        self._recent.append(word)
+        self._misses += 1
+        if self.index is not None and self._misses >= self.relocate_after:
+            self._relocate()
+    
+    def _relocate(self):
+        """用最近识别的单词在全文中重新定位"""
+        found = self.index.best(self._recent, min_score=self.relocate_score)
+        self._misses = 0
+        if found is None:
+            return
+        
+        sentence, score = found
+        print(f"[定位] 全文重新定位到第{sentence + 1}句（相似度{score:.2f}）")
+        self.seek(sentence)
+    
+    def _accept(self, j):
+        """接受位置j的匹配，更新朗读位置和当前句子"""
+        backward = j < self.position
+        self.position = j + 1
+        self.matched = j
+        
+        sentence = self.word_sentence[j]
+        done = j - self.sentence_start[sentence] + 1
+        if (done >= self.sentence_count[sentence] * self.advance_ratio
+                and sentence + 1 < self.sentence_total):
+            sentence += 1
+        
+        if backward:
+            self.sentence_index = sentence
+        else:
+            self.sentence_index = max(self.sentence_index, sentence)
+
+# =============================================================================
+# 关键词倒排索引
+# =============================================================================
+class KeywordIndex:
+    """
+    关键词倒排索引
+    
+    功能：
+    - 解析文案时建立 关键词 -> 包含该词的句子 的映射
+    - 按TF-IDF加权：越罕见的词权重越高，"the channel"这类常见词几乎不影响定位
+    - 一次遍历即可给所有句子打分，找出与识别窗口最相似的句子
+    
+    性能：
+    - 打分只遍历识别窗口中单词的倒排表，与句子总数无直接关系
+    - 按倒排表长度从短到长（即从罕见到常见）处理，罕见词负责产生候选句，
+      遍历量超过max_postings后，常见词只给已有候选句加分，不再展开倒排表
+    - 出现在过多句子中的词（超过max_df_ratio）区分度太低，直接跳过
+    """
+    
+    def __init__(self, sentences, max_df_ratio=0.2, max_postings=200):
+        """
+        建立索引
+        
+        参数：
+            sentences: CompiledScript，或split_sentences()返回的句子列表
+            max_df_ratio: 出现在超过该比例句子中的词不参与打分
+            max_postings: 单次打分最多展开的倒排表条目数
+        """
+        script = CompiledScript.from_sentences(sentences)
+        self.script = script
+        self.sentence_total = len(script)
+        self.max_postings = max_postings
+        
+        # 统计每句的词频和每个词的文档频率（均按单词编号）
+        tokens, offsets = script.tokens, script.token_offsets
+        counts = []
+        doc_freq = [0] * len(script.vocabulary)
+        for index in range(self.sentence_total):
+            tf = {}
+            for token in tokens[offsets[index]:offsets[index + 1]]:
+                tf[token] = tf.get(token, 0) + 1
+            counts.append(tf)
+            for token in tf:
+                doc_freq[token] += 1
+        
+        # 平滑IDF：log((N + 1) / (df + 1)) + 1，按单词编号存放
+        total = self.sentence_total
+        self.idf = [math.log((total + 1) / (df + 1)) + 1 for df in doc_freq]
+        
+        # 倒排表：单词编号 -> [(句子索引, 归一化权重)]，权重已按句子向量长度归一化
+        # 正排表：每句的 单词编号 -> 归一化权重，用于给已有候选句快速加分
+        max_df = max(3, int(total * max_df_ratio))
+        self.postings = {}
+        self.forward = []
+        for index, tf in enumerate(counts):
+            weights = {token: n * self.idf[token] for token, n in tf.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            forward = {}
+            for token, weight in weights.items():
+                if doc_freq[token] <= max_df:
+                    forward[token] = weight / norm
+                    self.postings.setdefault(token, []).append((index, weight / norm))
+            self.forward.append(forward)
+    
+    def score(self, words):
+        """
+        给所有包含窗口单词的句子打分（余弦相似度）
+        
+        参数：
+            words: 识别到的关键词序列（小写），或RecognitionWindow
+            
+        返回：
+            {句子索引: 相似度}，只包含得分大于0的句子
+        """
+        # 窗口已维护单词计数时直接使用，不再逐词累加
+        counts = words.counts if isinstance(words, RecognitionWindow) else Counter(words)
+        word_ids = self.script.word_ids
+        query = {}
+        for word, count in counts.items():
+            token = word_ids.get(word)
+            if token in self.postings:
+                query[token] = count * self.idf[token]
+        if not query:
+            return {}
+        
+        norm = math.sqrt(sum(w * w for w in query.values()))
+        scores = {}
+        get = scores.get
+        expanded = 0
+        for token in sorted(query, key=lambda t: len(self.postings[t])):
+            weight = query[token] / norm
+            postings = self.postings[token]
+            if scores and expanded + len(postings) > self.max_postings:
+                # 常见词：只给已有候选句加分
+                forward = self.forward
+                for index in scores:
+                    doc_weight = forward[index].get(token)
+                    if doc_weight:
+                        scores[index] += weight * doc_weight
+                continue
+            
+            expanded += len(postings)
+            for index, doc_weight in postings:
+                scores[index] = get(index, 0.0) + weight * doc_weight
+        return scores
+    
+    def best(self, words, min_score=0.0):
+        """
+        找出与识别窗口最相似的句子
+        
+        参数：
+            words: 识别到的关键词序列（小写），或RecognitionWindow
+            min_score: 最低相似度，低于该值视为未找到
+            
+        返回：
+            (句子索引, 相似度)，未找到时返回None
+        """
+        scores = self.score(words)
+        if not scores:
+            return None
+        index = max(scores, key=scores.get)
+        if scores[index] < min_score:
+            return None
+        return index, scores[index]